@@ -0,0 +1,46 @@
+"""
+Memory taken by tokens and the AST of logo.he scaled up 100 times, traced by tracemalloc.
+Tokens are either a list of (shared) Token objects, or a compact TokenBuffer.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_ast_memory
+"""
+import pkgutil
+import tracemalloc
+
+from helang.lexer import Lexer, LexerBackend
+from helang.parser import Parser
+
+
+SCALE = 100
+
+
+def measure(source: str, lex) -> (int, int, int, int):
+    """
+    :return: count of tokens, bytes of tokens, bytes of the AST and the peak.
+    """
+    lexer = Lexer(source, LexerBackend.REGEX)
+    tracemalloc.start()
+    tokens = lex(lexer)
+    tokens_size, _ = tracemalloc.get_traced_memory()
+    ast = Parser(tokens).parse()
+    total_size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert ast is not None
+    return len(tokens), tokens_size, total_size - tokens_size, peak
+
+
+def main():
+    source = pkgutil.get_data('helang', 'logo.he').decode('utf-8') * SCALE
+    mb = 1024 * 1024
+    print(f'logo.he x {SCALE}: {len(source) / mb:.1f} MB of source')
+    print(f'{"tokens as":<12}{"count":>10}{"tokens":>12}{"ast":>12}{"peak":>12}')
+    for name, lex in (('list', Lexer.lex), ('buffer', Lexer.lex_buffer)):
+        count, tokens_size, ast_size, peak = measure(source, lex)
+        print(f'{name:<12}{count:>10}{tokens_size / mb:>9.1f} MB{ast_size / mb:>9.1f} MB{peak / mb:>9.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
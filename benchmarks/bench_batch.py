@@ -0,0 +1,51 @@
+"""
+Wall time of running many independent scripts by run_batch with more and more workers,
+against running them one by one in this process.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_batch
+"""
+import os
+import time
+import tempfile
+
+from helang.batch import run_batch, run_script
+
+
+SCRIPTS = 64
+# Busy enough to be dominated by running rather than starting the processes.
+CODE = 'u8 a = [2000]; u8 b;\n' + 'a = a + 1; b = a * a;\n' * 100 + 'print b;\n'
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(SCRIPTS):
+            path = os.path.join(directory, f'{i}.he')
+            with open(path, 'w') as f:
+                f.write(CODE)
+            paths.append(path)
+        # Fill the .hec cache first, so every run below parses nothing.
+        for path in paths:
+            run_script(path)
+
+        print(f'{SCRIPTS} scripts, {os.cpu_count()} CPUs')
+        print(f'{"workers":<12}{"wall":>10}{"speedup":>10}')
+        start = time.perf_counter()
+        for path in paths:
+            assert run_script(path).ok
+        serial = time.perf_counter() - start
+        print(f'{"serial":<12}{serial:>9.2f}s{1:>9.2f}x')
+
+        workers = 1
+        while workers <= (os.cpu_count() or 1) * 2:
+            start = time.perf_counter()
+            assert all(result.ok for result in run_batch(paths, workers=workers))
+            wall = time.perf_counter() - start
+            print(f'{workers:<12}{wall:>9.2f}s{serial / wall:>9.2f}x')
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
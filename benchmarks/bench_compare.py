@@ -0,0 +1,57 @@
+"""
+Allocations and time of comparing large u8s in a loop, against the former
+comparison that padded the shorter one with zeroes first.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_compare
+"""
+import timeit
+import tracemalloc
+
+from itertools import chain, repeat
+from typing import Callable
+
+from helang.u8 import U8
+
+
+LENGTH = 100_000
+LOOPS = 20
+
+
+def padded_less(a: U8, b: U8) -> bool:
+    # How it was done before, copying the shorter one with zeroes filled.
+    len2fill = abs(len(a.value) - len(b.value))
+    if len(a.value) > len(b.value):
+        b = U8(list(chain(b.value, repeat(0, len2fill))))
+    else:
+        a = U8(list(chain(a.value, repeat(0, len2fill))))
+    return all(a.value[i] < b.value[i] for i in range(len(a.value)))
+
+
+def measure(compare: Callable[[U8, U8], bool], a: U8, b: U8):
+    """
+    :return: peak bytes allocated and seconds per comparison.
+    """
+    tracemalloc.start()
+    for _ in range(LOOPS):
+        compare(a, b)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seconds = min(timeit.repeat(lambda: compare(a, b), repeat=3, number=LOOPS)) / LOOPS
+    return peak, seconds
+
+
+def main():
+    longer = U8(list(range(1, LENGTH + 1)))
+    shorter = U8(list(range(LENGTH // 2)))
+    print(f'{LOOPS} comparisons of u8s with {LENGTH // 2} and {LENGTH} elements')
+    print(f'{"comparison":<12}{"peak":>14}{"time":>12}')
+    for name, compare in (('padded', padded_less), ('lazy', U8.__lt__)):
+        assert compare(shorter, longer)
+        peak, seconds = measure(compare, shorter, longer)
+        print(f'{name:<12}{peak / 1024:>11.1f} KB{seconds * 1e3:>9.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
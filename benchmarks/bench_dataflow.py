@@ -0,0 +1,66 @@
+"""
+Time of a wide program, whose chains of vector statements are independent of each other,
+run statement by statement against the dataflow executor with more and more workers.
+NumPy releases the GIL on large vectors, so the chains run in parallel with NumPy storage only,
+and only on several CPUs. With one CPU, or the list storage, no speedup can show.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_dataflow
+"""
+import os
+import timeit
+
+from helang.u8 import U8Storage, use_storage
+from helang.storage import NumpyStorage
+from helang.dataflow import DataflowExecutor
+from helang.environment import Environment
+from helang.resolver import resolve
+from helang.output import output_to, CaptureSink
+from helang.lexer import Lexer
+from helang.parser import Parser
+
+
+CHAINS = 8
+LENGTH = 500_000
+STEPS = 10
+WORKERS = (1, 2, 4)
+
+
+def wide_program() -> str:
+    statements = [f'u8 v{i} = [{LENGTH}];' for i in range(CHAINS)]
+    for step in range(STEPS):
+        statements += [f'v{i} = v{i} + {step + i};' for i in range(CHAINS)]
+        statements += [f'u8 w{i} = v{i} - 1;' for i in range(CHAINS)]
+    statements += [f'print v{i}[1 | 2 | 3];' for i in range(CHAINS)]
+    return '\n'.join(statements)
+
+
+def measure(run) -> float:
+    with output_to(CaptureSink()):
+        return min(timeit.repeat(run, repeat=3, number=1))
+
+
+def main():
+    ast = Parser(Lexer(wide_program()).lex()).parse()
+    cpus = os.cpu_count() or 1
+    print(f'{CHAINS} chains of {STEPS * 2} statements on {LENGTH} elements, {cpus} CPUs')
+    if cpus == 1:
+        print('Only one CPU, so the dataflow engine cannot run anything in parallel here.')
+    print(f'{"storage":<10}{"workers":>8}{"sequential":>12}{"dataflow":>12}{"speedup":>10}')
+    storages = [U8Storage.LIST] + ([U8Storage.NUMPY] if NumpyStorage.available() else [])
+    for storage in storages:
+        use_storage(storage)
+        env = Environment()
+        resolve(ast, env)
+        sequential = measure(lambda: ast.evaluate(env))
+        for workers in WORKERS:
+            executor = DataflowExecutor(workers)
+            dataflow = measure(lambda: executor.run(ast, env))
+            executor.shutdown()
+            print(f'{storage.name:<10}{workers:>8}{sequential:>11.3f}s{dataflow:>11.3f}s{sequential / dataflow:>9.2f}x')
+    use_storage(U8Storage.LIST)
+
+
+if __name__ == '__main__':
+    main()
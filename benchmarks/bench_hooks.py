@@ -0,0 +1,61 @@
+"""
+Time of the hot OperationAST and VarAssignAST paths run plainly, through the global registry
+with no hooks registered, through a HookRegistry holding no hooks, and with hooks watching every statement.
+The evaluator never looks at hooks, so the global registry costs a check per run while it is empty,
+and a registry walking the statements itself costs a loop over them even without hooks.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_hooks
+"""
+import timeit
+
+from helang.he_ast import OperationAST, VarAssignAST
+from functools import partial
+from helang.hooks import Hook, HookRegistry, hooks
+from helang.quick_runner import parse_cache, _run_parsed, _watching_runner
+
+
+CODE = 'u8 a = [64]; u8 b = [64]; u8 c = [64];\n' + 'a = a + 1; b = a - 1; c = a + b - c;\n' * 2000
+STATEMENTS = 3 + 3 * 2000
+REPEAT = 7
+
+
+class StatementCounter(Hook):
+    def __init__(self):
+        self.count = 0
+
+    def on_statement_start(self, index: int, statement):
+        self.count += 1
+
+
+def hooks_in_evaluator() -> list:
+    # Names the hot paths look up, which would show any check of hooks.
+    names = OperationAST.evaluate.__code__.co_names + VarAssignAST.evaluate.__code__.co_names
+    return [name for name in names if 'hook' in name.lower()]
+
+
+def main():
+    parsed = parse_cache.get(CODE)
+    cases = [
+        ('plain run', lambda: _run_parsed(parsed, None)),
+        ('nothing hooked', lambda: _run_parsed(parsed, None, runner=_watching_runner(None, CODE))),
+        ('empty registry', lambda: _run_parsed(parsed, None, runner=partial(HookRegistry().run, source=CODE))),
+    ]
+    seconds = {name: min(timeit.repeat(run, repeat=REPEAT, number=1)) for name, run in cases}
+    for name, hook in (('no-op hook', Hook()), ('statement hook', StatementCounter())):
+        with hooks.registered(hook):
+            seconds[name] = min(timeit.repeat(
+                lambda: _run_parsed(parsed, None, runner=_watching_runner(None, CODE)), repeat=REPEAT, number=1
+            ))
+
+    print(f'{STATEMENTS} statements of OperationAST and VarAssignAST, best of {REPEAT}')
+    print(f'hooks referenced by the evaluator: {", ".join(hooks_in_evaluator()) or "none"}')
+    print(f'{"case":<16}{"time":>12}{"per statement":>16}{"overhead":>10}')
+    base = seconds['plain run']
+    for name, value in seconds.items():
+        print(f'{name:<16}{value * 1e3:>9.2f} ms{value / STATEMENTS * 1e9:>13.0f} ns{(value / base - 1) * 100:>9.1f}%')
+
+
+if __name__ == '__main__':
+    main()
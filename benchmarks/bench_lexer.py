@@ -0,0 +1,76 @@
+"""
+Lexer throughput, in MB of source per second,
+and the peak memory of lexing a file as a stream.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_lexer
+"""
+import os
+import time
+import pkgutil
+import tempfile
+import tracemalloc
+
+from helang.lexer import Lexer, LexerBackend
+
+
+SOURCES = {
+    'great.he': pkgutil.get_data('helang', 'great.he').decode('utf-8'),
+    'logo.he': pkgutil.get_data('helang', 'logo.he').decode('utf-8'),
+}
+SOURCES['logo.he x10'] = SOURCES['logo.he'] * 10
+
+REPEAT = 5
+
+
+def measure(code: str, backend: LexerBackend) -> float:
+    """
+    Lexes the code several times and keeps the best run.
+    :return: throughput in MB/s.
+    """
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        Lexer(code, backend).lex()
+        best = min(best, time.perf_counter() - start)
+    return len(code.encode('utf-8')) / best / 1024 / 1024
+
+
+def measure_stream_peak(code: str) -> int:
+    """
+    Lexes the code from a file with iter_tokens, without keeping the tokens.
+    :return: peak traced memory in bytes.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.he', delete=False) as f:
+        f.write(code)
+    try:
+        with open(f.name, 'r') as stream:
+            tracemalloc.start()
+            for _ in Lexer(stream).iter_tokens():
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        os.remove(f.name)
+    return peak
+
+
+def main():
+    print(f'{"source":<14}{"size":>10}{"state machine":>16}{"regex":>12}{"speedup":>10}')
+    for name, code in SOURCES.items():
+        old = measure(code, LexerBackend.STATE_MACHINE)
+        new = measure(code, LexerBackend.REGEX)
+        size = f'{len(code) // 1024}KB'
+        print(f'{name:<14}{size:>10}{old:>11.2f}MB/s{new:>7.2f}MB/s{new / old:>9.1f}x')
+
+    print()
+    print(f'{"streamed source":<20}{"size":>10}{"peak memory":>14}')
+    for scale in (1, 10, 50):
+        code = SOURCES['logo.he'] * scale
+        peak = measure_stream_peak(code)
+        print(f'{f"logo.he x{scale}":<20}{len(code) // 1024:>8}KB{peak // 1024:>12}KB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Evaluation time of the | literals in logo.he,
+folded into one buffer versus the former chain of nested nodes.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_literal
+"""
+import time
+import pkgutil
+
+from typing import List, Optional
+from helang.he_ast import OrU8InitAST
+from helang.u8 import U8
+
+
+class NestedOrU8InitAST:
+    """
+    The former literal node, one per element, copying its tail on every evaluation.
+    """
+
+    def __init__(self, first: int, second: Optional['NestedOrU8InitAST'] = None):
+        self._first = first
+        self._second = second
+
+    def evaluate(self, env) -> U8:
+        if self._second is None:
+            return U8([self._first])
+        second = self._second.evaluate(env).value
+        elements = [self._first]
+        elements.extend(second)
+        return U8(elements)
+
+
+def nest(elements: List[int]) -> NestedOrU8InitAST:
+    node = None
+    for element in reversed(elements):
+        node = NestedOrU8InitAST(element, node)
+    return node
+
+
+def sprint_literals() -> List[List[int]]:
+    code = pkgutil.get_data('helang', 'logo.he').decode('utf-8')
+    lines = [line for line in code.splitlines() if line.startswith('sprint')]
+    return [[int(n) for n in line[len('sprint'):].strip(' ;').split('|')] for line in lines]
+
+
+def measure(nodes, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for node in nodes:
+            node.evaluate({})
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    literals = sprint_literals()
+    elements = sum(len(literal) for literal in literals)
+    print(f'{len(literals)} sprint lines in logo.he, {elements} elements')
+
+    old = measure([nest(literal) for literal in literals])
+    new = measure([OrU8InitAST(literal) for literal in literals])
+    print(f'{"nested":<10}{old * 1000:>10.2f}ms')
+    print(f'{"folded":<10}{new * 1000:>10.2f}ms{old / new:>10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
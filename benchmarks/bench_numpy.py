@@ -0,0 +1,69 @@
+"""
+U8 operators under the list and NumPy storages, over sizes from 1 to 10^7.
+Times are the best of a few runs, per operation.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_numpy [max exponent, 7 by default]
+"""
+import sys
+import timeit
+
+from helang.u8 import U8, U8Storage, use_storage
+from helang.storage import NumpyStorage
+
+
+# Subscripts are limited, as selecting with the list storage costs O(n*k).
+SUBSCRIPTS = 16
+
+OPERATIONS = {
+    'add': lambda a, b, s, one: a + b,
+    'add 1': lambda a, b, s, one: a + one,
+    'sub': lambda a, b, s, one: a - b,
+    'dot': lambda a, b, s, one: a * b,
+    'less': lambda a, b, s, one: a < b,
+    'equal': lambda a, b, s, one: a == b,
+    'get': lambda a, b, s, one: a[s],
+    'set': lambda a, b, s, one: a.__setitem__(s, one),
+    'increment': lambda a, b, s, one: a.increment(),
+}
+
+
+def measure(storage: U8Storage, size: int) -> dict:
+    """
+    :return: seconds per run of each operation.
+    """
+    use_storage(storage)
+    try:
+        a = U8(i for i in range(size))
+        b = U8(i + 1 for i in range(size))
+        s = U8(i * size // SUBSCRIPTS + 1 for i in range(min(size, SUBSCRIPTS)))
+        one = U8(1)
+        number = max(1, 100_000 // size)
+        times = dict()
+        for name, operation in OPERATIONS.items():
+            timer = timeit.Timer(lambda: operation(a, b, s, one))
+            times[name] = min(timer.repeat(repeat=3, number=number)) / number
+        return times
+    finally:
+        use_storage(U8Storage.LIST)
+
+
+def main():
+    max_exponent = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    if not NumpyStorage.available():
+        print('NumPy is not installed, the numpy column runs on lists.')
+
+    print(f'{"operation":<12}{"size":>10}{"list":>14}{"numpy":>14}{"speedup":>10}')
+    for exponent in range(max_exponent + 1):
+        size = 10 ** exponent
+        list_times = measure(U8Storage.LIST, size)
+        numpy_times = measure(U8Storage.NUMPY, size)
+        for name in OPERATIONS.keys():
+            list_time, numpy_time = list_times[name], numpy_times[name]
+            print(f'{name:<12}{size:>10}{list_time * 1e6:>11.2f} us{numpy_time * 1e6:>11.2f} us'
+                  f'{list_time / numpy_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
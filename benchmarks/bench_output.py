@@ -0,0 +1,49 @@
+"""
+Writes and time of printing logo.he to a stream with a costly write, like the Redirector
+of the editor, line by line against the buffered sink.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_output
+"""
+import io
+import time
+import pkgutil
+import timeit
+
+from helang.output import StreamSink
+from helang.quick_runner import quick_run_string
+
+
+# The logo statement prints by itself, so only the sprints are kept.
+CODE = '\n'.join(
+    line for line in pkgutil.get_data('helang', 'logo.he').decode('utf-8').splitlines() if line.startswith('sprint')
+)
+LOOPS = 20
+
+
+class SlowStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        # Like inserting the text into a widget.
+        time.sleep(1e-5)
+        return super().write(s)
+
+
+def main():
+    print(f'{LOOPS} runs of the sprints of logo.he')
+    print(f'{"output":<12}{"writes":>10}{"time":>12}')
+    for name, buffer_size in (('per line', 0), ('buffered', 64 * 1024)):
+        stream = SlowStream()
+        seconds = min(timeit.repeat(
+            lambda: quick_run_string(CODE, output=StreamSink(stream, buffer_size)), repeat=3, number=LOOPS
+        )) / LOOPS
+        print(f'{name:<12}{stream.writes // (3 * LOOPS):>10}{seconds * 1e3:>9.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
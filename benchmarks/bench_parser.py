@@ -0,0 +1,54 @@
+"""
+Parse time of the backtracking and the predictive strategies,
+and how many backtracks the predictive one avoids.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_parser
+"""
+import time
+import pkgutil
+
+from typing import List
+from helang.lexer import Lexer, LexerBackend
+from helang.parser import Parser, ParseStrategy
+from helang.tokens import Token
+from .workload import generate
+
+
+SOURCES = {
+    'great.he': pkgutil.get_data('helang', 'great.he').decode('utf-8'),
+    'logo.he': pkgutil.get_data('helang', 'logo.he').decode('utf-8'),
+    'synthetic 100k': generate(100_000),
+}
+
+REPEAT = 3
+
+
+def measure(tokens: List[Token], strategy: ParseStrategy) -> (float, int):
+    """
+    Parses the tokens several times and keeps the best run.
+    :return: seconds taken and backtracks of the parser.
+    """
+    best = float('inf')
+    backtracks = 0
+    for _ in range(REPEAT):
+        parser = Parser(tokens, strategy)
+        start = time.perf_counter()
+        parser.parse()
+        best = min(best, time.perf_counter() - start)
+        backtracks = parser.backtracks
+    return best, backtracks
+
+
+def main():
+    print(f'{"source":<16}{"tokens":>9}{"backtracking":>14}{"predictive":>12}{"speedup":>9}{"backtracks avoided":>20}')
+    for name, code in SOURCES.items():
+        tokens = Lexer(code, LexerBackend.REGEX).lex()
+        old, backtracks = measure(tokens, ParseStrategy.BACKTRACKING)
+        new, _ = measure(tokens, ParseStrategy.PREDICTIVE)
+        print(f'{name:<16}{len(tokens):>9}{old * 1000:>12.1f}ms{new * 1000:>10.1f}ms{old / new:>8.1f}x{backtracks:>20}')
+
+
+if __name__ == '__main__':
+    main()
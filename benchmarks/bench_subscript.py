@@ -0,0 +1,38 @@
+"""
+Selecting k subscripts from an n-element u8, against the former O(n*k) scan.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_subscript
+"""
+import random
+import timeit
+
+from helang.u8 import U8
+
+
+CASES = [(1_000, 100), (10_000, 1_000), (100_000, 1_000)]
+
+
+def scan(u8: U8, subscripts: U8) -> U8:
+    # How it was done before, scanning subscripts for every element.
+    return U8(u8.value[i-1] for i in range(1, len(u8.value) + 1) if i in subscripts.value)
+
+
+def main():
+    rand = random.Random(0)
+    print(f'{"elements":>10}{"subscripts":>12}{"order":>12}{"scan":>12}{"select":>12}{"speedup":>10}')
+    for length, count in CASES:
+        u8 = U8(list(range(length)))
+        ascending = sorted(rand.sample(range(1, length + 1), count))
+        shuffled = rand.sample(ascending, count)
+        for order, subscripts in (('ascending', U8(ascending)), ('shuffled', U8(shuffled))):
+            assert scan(u8, subscripts) == u8[subscripts]
+            scan_time = min(timeit.repeat(lambda: scan(u8, subscripts), repeat=3, number=1))
+            select_time = min(timeit.repeat(lambda: u8[subscripts], repeat=3, number=10)) / 10
+            print(f'{length:>10}{count:>12}{order:>12}{scan_time * 1e3:>9.2f} ms{select_time * 1e3:>9.2f} ms'
+                  f'{scan_time / select_time:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
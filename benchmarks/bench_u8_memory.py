@@ -0,0 +1,48 @@
+"""
+Memory taken by u8 elements under each storage, in bytes per element.
+
+Run it from the repository root:
+
+    python -m benchmarks.bench_u8_memory
+"""
+import random
+import tracemalloc
+
+from helang.u8 import U8, U8Storage, use_storage
+
+
+COUNT = 100
+LENGTH = 10_000
+
+
+def measure(storage: U8Storage, high: int) -> float:
+    """
+    Creates COUNT u8s of LENGTH random elements in [0, high].
+    :return: traced bytes per element.
+    """
+    rand = random.Random(0)
+    use_storage(storage)
+    try:
+        tracemalloc.start()
+        # Integers are created while tracing, so boxed ones are counted as well.
+        u8s = [U8(rand.randint(0, high) for _ in range(LENGTH)) for _ in range(COUNT)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        use_storage(U8Storage.LIST)
+
+    assert len(u8s) == COUNT
+    return size / COUNT / LENGTH
+
+
+def main():
+    print(f'{COUNT} u8s of {LENGTH} elements')
+    print(f'{"storage":<10}{"values 0..255":>16}{"values 0..65535":>18}')
+    for storage in U8Storage:
+        small = measure(storage, 255)
+        large = measure(storage, 65535)
+        print(f'{storage.name.lower():<10}{small:>12.1f} B/e{large:>14.1f} B/e')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+The benchmark suite, timing each stage of running HeLang apart:
+Lexer.lex, Parser.parse and evaluating the AST, of great.he, logo.he and synthetic programs,
+along with each U8 operator. Results are written as JSON, and two result files can be compared
+to flag regressions, like before and after a change.
+
+Run it from the repository root:
+
+    python -m benchmarks.suite run --output before.json
+    python -m benchmarks.suite run --output after.json --quick
+    python -m benchmarks.suite compare before.json after.json --threshold 0.1
+"""
+import sys
+import json
+import time
+import timeit
+import pkgutil
+import platform
+import argparse
+import statistics
+
+from typing import Callable, Dict, List, Optional, Tuple
+from helang import __version__
+from helang.u8 import U8, U8Storage, use_storage
+from helang.lexer import Lexer
+from helang.parser import Parser
+from helang.optimizer import optimize
+from helang.cache import ParsedProgram
+from helang.output import output_to, CaptureSink
+from .workload import generate, ADD_SUB, SET, DOT, COMPARE, INCREMENT, GET
+
+
+# Bumped when results are no longer comparable with older files.
+FORMAT = 1
+
+# Statements which sleep, draw or ask the system, which are left out when evaluating.
+_SLOW_STATEMENTS = ('test5g', 'logo', 'cyberspaces')
+
+
+def _package_source(name: str) -> str:
+    return pkgutil.get_data('helang', name).decode('utf-8')
+
+
+def sources(quick: bool) -> Dict[str, str]:
+    """
+    Programs of the suite, by their names.
+    :param quick: whether to make the synthetic programs smaller.
+    """
+    statements, length = (500, 16) if quick else (5000, 64)
+    return {
+        'great.he': _package_source('great.he'),
+        'logo.he': _package_source('logo.he'),
+        f'synthetic-{statements}x{length}': generate(statements, length),
+        # Vectors are operated on more than they are indexed.
+        f'arithmetic-{statements}x{length}': generate(
+            statements, length, seed=1, mix={ADD_SUB: 2, DOT: 2, COMPARE: 1, INCREMENT: 2, SET: 1, GET: 1}
+        ),
+    }
+
+
+def _evaluated(source: str) -> str:
+    return '\n'.join(
+        line for line in source.splitlines() if not line.lstrip().startswith(_SLOW_STATEMENTS)
+    )
+
+
+def stage_cases(name: str, source: str) -> Dict[str, Callable[[], object]]:
+    """
+    Cases timing the stages of running the program apart.
+    """
+    tokens = Lexer(source).lex()
+    parsed = ParsedProgram(optimize(Parser(Lexer(_evaluated(source)).lex()).parse()))
+
+    def evaluate():
+        # A fresh environment each time, as the program defines its variables.
+        with output_to(CaptureSink()):
+            parsed.ast.evaluate(parsed.environment())
+
+    return {
+        f'lex/{name}': lambda: Lexer(source).lex(),
+        f'parse/{name}': lambda: Parser(tokens).parse(),
+        f'evaluate/{name}': evaluate,
+    }
+
+
+def u8_cases(length: int) -> Dict[str, Callable[[], object]]:
+    """
+    Cases timing each U8 operator on u8s of the length.
+    """
+    a = U8(list(range(length)))
+    b = U8(list(range(length, 0, -1)))
+    # Comparisons stop at the first failure, so these hold for every element.
+    greater = U8(list(range(1, length + 1)))
+    twin = U8(list(range(length)))
+    one = U8(3)
+    subscripts = U8(list(range(1, length + 1, 2)))
+    zero = U8(0)
+    # Written in place, so the others keep their elements.
+    target = U8(list(range(length)))
+
+    def increment():
+        target.increment()
+
+    def set_item():
+        target[subscripts] = one
+
+    def fill():
+        target[zero] = one
+
+    return {f'u8/{name}/{length}': case for name, case in (
+        ('neg', lambda: -a),
+        ('add', lambda: a + b),
+        ('add_scalar', lambda: a + one),
+        ('sub', lambda: a - b),
+        ('sub_scalar', lambda: a - one),
+        ('mul', lambda: a * b),
+        ('getitem', lambda: a[subscripts]),
+        ('setitem', set_item),
+        ('fill', fill),
+        ('increment', increment),
+        ('lt', lambda: a < greater),
+        ('eq', lambda: a == twin),
+        ('share', lambda: a.share()),
+    )}
+
+
+def measure(case: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """
+    Time the case, calling it enough times in each of the repeats to take at least min_time.
+    :return: seconds per call of the best, the median and the worst repeat, and the counts.
+    """
+    timer = timeit.Timer(case)
+    number = 1
+    while True:
+        seconds = timer.timeit(number)
+        if seconds >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(seconds, 1e-9) * 1.2))
+    times = [seconds / number] + [t / number for t in timer.repeat(repeat - 1, number)]
+    return dict(min=min(times), median=statistics.median(times), max=max(times), repeat=repeat, number=number)
+
+
+def run(quick: bool = False, repeat: int = 5, min_time: float = 0.05, pattern: str = '') -> Dict:
+    """
+    Run the suite.
+    :param quick: whether to run smaller programs and u8s, for a quick look.
+    :param repeat: how many times to repeat each case.
+    :param min_time: the least seconds of each repeat.
+    :param pattern: only run cases whose names contain it.
+    :return: the results, as saved to JSON.
+    """
+    cases: Dict[str, Callable[[], object]] = dict()
+    for name, source in sources(quick).items():
+        cases.update(stage_cases(name, source))
+    for length in ((1, 100) if quick else (1, 100, 10_000)):
+        cases.update(u8_cases(length))
+
+    results = dict()
+    for name, case in cases.items():
+        if pattern in name:
+            results[name] = measure(case, repeat, min_time)
+            print(f'{name:<40}{_format_seconds(results[name]["min"]):>12}', file=sys.stderr)
+    return dict(
+        format=FORMAT,
+        helang=__version__,
+        python=f'{platform.python_implementation()} {platform.python_version()}',
+        machine=platform.machine(),
+        created=time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        quick=quick,
+        results=results,
+    )
+
+
+def compare(base: Dict, head: Dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """
+    Compare the best times of cases in both results.
+    :param threshold: the relative change to flag, like 0.1 for 10%.
+    :return: lines of the report, and names of the regressed cases.
+    """
+    if base.get('format') != head.get('format'):
+        raise ValueError(f'results of formats {base.get("format")} and {head.get("format")} are not comparable')
+    lines = []
+    for key in ('python', 'machine', 'storage', 'quick'):
+        if base.get(key) != head.get(key):
+            lines.append(f'Warning: {key} differs, {base.get(key)} against {head.get(key)}.')
+    lines.append(f'{"case":<40}{"base":>12}{"head":>12}{"change":>10}')
+    regressions = []
+    for name in sorted(base['results'].keys() | head['results'].keys()):
+        if name not in head['results']:
+            lines.append(f'{name:<40}{"":>12}{"":>12}  removed')
+            continue
+        if name not in base['results']:
+            lines.append(f'{name:<40}{"":>12}{"":>12}  added')
+            continue
+        before, after = base['results'][name]['min'], head['results'][name]['min']
+        change = after / before - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  improved'
+        lines.append(f'{name:<40}{_format_seconds(before):>12}{_format_seconds(after):>12}{change:>+10.1%}{flag}')
+    return lines, regressions
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+    return f'{seconds / 1e-9:.0f} ns'
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description='The HeLang benchmark suite.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the suite, writing the results as JSON')
+    run_parser.add_argument('--output', help='the file of results, stdout by default')
+    run_parser.add_argument('--quick', action='store_true', help='run smaller programs and u8s')
+    run_parser.add_argument('--repeat', type=int, default=5, help='repeats of each case')
+    run_parser.add_argument('--min-time', type=float, default=0.05, help='the least seconds of each repeat')
+    run_parser.add_argument('--filter', default='', help='only run cases whose names contain it')
+    run_parser.add_argument('--storage', choices=[storage.name.lower() for storage in U8Storage], default='list',
+                            help='the storage of u8 elements')
+    compare_parser = commands.add_parser('compare', help='compare two result files, failing on regressions')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='the relative slowdown to flag, 0.1 for 10%% by default')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        use_storage(U8Storage[args.storage.upper()])
+        results = run(args.quick, args.repeat, args.min_time, args.filter)
+        results['storage'] = args.storage
+        text = json.dumps(results, indent=2) + '\n'
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(text)
+        else:
+            sys.stdout.write(text)
+        return
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    lines, regressions = compare(base, head, args.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print(f'{len(regressions)} regressions over {args.threshold:.0%}.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
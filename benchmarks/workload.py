@@ -0,0 +1,68 @@
+"""
+Synthetic HeLang programs for benchmarks.
+"""
+import random
+
+from typing import Callable, Dict, List, Optional
+
+
+# Kinds of statements operating on vectors, like `a = a + b - 1;` for ADD_SUB.
+ADD_SUB = 'add_sub'
+SET = 'set'
+DOT = 'dot'
+COMPARE = 'compare'
+INCREMENT = 'increment'
+GET = 'get'
+KINDS = (ADD_SUB, SET, DOT, COMPARE, INCREMENT, GET)
+
+# Statements of each kind, given the random source, two vectors, the index of the statement
+# and a function picking subscripts.
+_TEMPLATES: Dict[str, Callable[[random.Random, str, str, int, Callable[[], str]], str]] = {
+    ADD_SUB: lambda rand, a, b, i, subscripts: f'{a} = {a} + {b} - {rand.randint(0, 9)};',
+    SET: lambda rand, a, b, i, subscripts: f'{a}[{subscripts()}] = {rand.randint(0, 255)};',
+    DOT: lambda rand, a, b, i, subscripts: f'u8 s{i} = {a} * {b} + 1;',
+    COMPARE: lambda rand, a, b, i, subscripts: f'u8 s{i} = {a} < {b};',
+    INCREMENT: lambda rand, a, b, i, subscripts: f'{a}++;',
+    GET: lambda rand, a, b, i, subscripts: f'u8 t{i} = {a}[{subscripts()}];',
+}
+
+
+def generate(statements: int, length: int = 8, seed: int = 0, mix: Optional[Dict[str, float]] = None) -> str:
+    """
+    Generates a valid program without any output.
+    :param statements: how many statements to generate.
+    :param length: the length of vectors in the program.
+    :param seed: random seed, the same seed generates the same program.
+    :param mix: weights of the kinds of statements, like {ADD_SUB: 3, GET: 1}, all kinds equally by default.
+    :return: the HeLang code.
+    """
+    rand = random.Random(seed)
+    vectors: List[str] = []
+    lines = []
+
+    def literal() -> str:
+        return ' | '.join(str(rand.randint(0, 255)) for _ in range(length))
+
+    def subscripts() -> str:
+        picked = sorted(rand.sample(range(1, length + 1), rand.randint(1, length)))
+        return ' | '.join(str(i) for i in picked)
+
+    for i in range(statements):
+        if len(vectors) < 2 or rand.random() < 0.15:
+            vectors.append(f'v{i}')
+            if rand.random() < 0.5:
+                lines.append(f'u8 v{i} = {literal()};')
+            else:
+                lines.append(f'u8 v{i} = [{length}];')
+            continue
+
+        a, b = rand.sample(vectors, 2)
+        if mix is None:
+            kind = KINDS[rand.randrange(len(KINDS))]
+        else:
+            kind = rand.choices(list(mix.keys()), list(mix.values()))[0]
+        if kind not in _TEMPLATES:
+            raise ValueError(f'unknown kind of statements: {kind}')
+        lines.append(_TEMPLATES[kind](rand, a, b, i, subscripts))
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,122 @@
+import os
+import io
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional, Sequence
+from .output import StreamSink
+from .hooks import hooks
+from .quick_runner import quick_run_file, Engine
+from .u8 import U8
+
+
+class ScriptResult:
+    """
+    What running one script in the batch ends with.
+    """
+
+    __slots__ = ('path', 'output', 'output_path', 'seconds', 'error', 'variables')
+
+    def __init__(self, path: str, output: Optional[str], output_path: Optional[str],
+                 seconds: float, error: Optional[str], variables: Optional[Dict[str, U8]]):
+        self.path = path
+        # The output, unless it is written to the output path.
+        self.output = output
+        self.output_path = output_path
+        self.seconds = seconds
+        # The exception raised, as `ExceptionName: message`.
+        self.error = error
+        # Variables the script ends with, if they are asked for.
+        self.variables = variables
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_script(path: str, engine: Engine = Engine.AST, cache: bool = True,
+               output_path: Optional[str] = None, keep_variables: bool = False) -> ScriptResult:
+    """
+    Run a script, capturing its output instead of printing it.
+    :param path: the path to the script.
+    :param engine: the engine to run the script.
+    :param cache: whether to use the .hec cache.
+    :param output_path: the file to write the output to, otherwise it is kept in the result.
+    :param keep_variables: whether to keep the variables in the result, None otherwise.
+    :return: the result.
+    """
+    buffer = io.StringIO()
+    env = dict()
+    error = None
+    start = time.perf_counter()
+    # Logo and others print by themselves, so sys.stdout is captured too.
+    # It only happens in workers, unless run_script is called directly.
+    with redirect_stdout(buffer):
+        try:
+            quick_run_file(path, env, engine, cache=cache, output=StreamSink(buffer))
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+    seconds = time.perf_counter() - start
+
+    output = buffer.getvalue()
+    if output_path is not None:
+        with open(output_path, 'w') as f:
+            f.write(output)
+        output = None
+    return ScriptResult(path, output, output_path, seconds, error, env if keep_variables else None)
+
+
+def output_paths(paths: Sequence[str], output_dir: str) -> List[str]:
+    """
+    Name the output file of each script by its name, numbering the names which repeat.
+    """
+    names = set()
+    result = []
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, number = stem, 1
+        while name in names:
+            number += 1
+            name = f'{stem}-{number}'
+        names.add(name)
+        result.append(os.path.join(output_dir, name + '.out'))
+    return result
+
+
+def _start_worker():
+    # Hooks of the parent are copied into forked workers, where their events would be lost,
+    # and they would make every script walk its AST statement by statement.
+    hooks.clear()
+
+
+def run_batch(paths: Sequence[str], engine: Engine = Engine.AST, workers: Optional[int] = None,
+              output_dir: Optional[str] = None, cache: bool = True, keep_variables: bool = False) -> List[ScriptResult]:
+    """
+    Run independent scripts in parallel processes, which run them without any hooks.
+    :param paths: paths to the scripts.
+    :param engine: the engine to run the scripts.
+    :param workers: how many processes to run, the count of CPUs by default.
+    :param output_dir: the directory to write the output of each script to as <name>.out,
+                       otherwise the output is kept in the results.
+    :param cache: whether to use the .hec cache.
+    :param keep_variables: whether to send the variables of each script back in its result,
+                           which pickles every u8 they hold, so it is off by default.
+    :return: results of the scripts, in the order of the paths.
+    """
+    paths = list(paths)
+    if not paths:
+        return []
+    targets = [None] * len(paths)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        targets = output_paths(paths, output_dir)
+
+    workers = workers or os.cpu_count() or 1
+    # Scripts are sent in chunks, as one is usually much quicker than a round trip.
+    chunk_size = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(workers, initializer=_start_worker) as executor:
+        return list(executor.map(
+            run_script, paths, [engine] * len(paths), [cache] * len(paths), targets, [keep_variables] * len(paths),
+            chunksize=chunk_size
+        ))
@@ -0,0 +1,228 @@
+import os
+import pickle
+import hashlib
+import tempfile
+import threading
+
+from collections import OrderedDict, namedtuple
+from typing import Optional, Tuple
+from . import __version__
+from .he_ast import AST
+from .lexer import Lexer
+from .tokens import offsets_array
+from .parser import Parser
+from .optimizer import optimize
+from .resolver import resolve
+from .environment import Environment
+from .compiler import compile_ast, Program
+
+
+# Directory of cache files next to the sources, like __pycache__.
+CACHE_DIR = '__hecache__'
+CACHE_SUFFIX = '.hec'
+
+# Starts every cache file, changing it makes the old files stale.
+MAGIC = b'HEC3'
+
+
+def source_hash(source: str) -> bytes:
+    """
+    Hash of the source along with the HeLang version, so files written by other versions are stale.
+    """
+    digest = hashlib.sha256(__version__.encode('utf-8') + b'\0')
+    digest.update(source.encode('utf-8'))
+    return digest.digest()
+
+
+def cache_path(path: str) -> str:
+    """
+    Get where the cache of the source file is.
+    :param path: the path to the source file.
+    :return: the path to the cache file.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    stem, _ = os.path.splitext(name)
+    return os.path.join(directory, CACHE_DIR, stem + CACHE_SUFFIX)
+
+
+def load_ast(path: str, key: bytes) -> Optional[AST]:
+    """
+    Load the cached AST if the cache file matches the key.
+    :param path: the path to the cache file.
+    :param key: the source hash.
+    :return: the AST, or None if the cache is missing or stale.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC or f.read(len(key)) != key:
+                return None
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        # Broken caches are only slower than none.
+        return None
+
+
+def store_ast(path: str, key: bytes, ast: AST):
+    """
+    Write the AST to the cache file atomically, so concurrent runs never see a partial one.
+    Failures are ignored, as for a read-only directory.
+    :param path: the path to the cache file.
+    :param key: the source hash.
+    :param ast: the AST parsed from the source.
+    """
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    except OSError:
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(key)
+            pickle.dump(ast, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except (OSError, pickle.PicklingError, RecursionError):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            ...
+
+
+def parse_source(source: str) -> AST:
+    """
+    Parse the source, setting offsets of statements, and optimize the AST.
+    """
+    offsets = offsets_array(len(source))
+    tokens = Lexer(source, offsets=offsets).lex()
+    return optimize(Parser(tokens, offsets=offsets).parse())
+
+
+def parse_cached(source: str, path: Optional[str]) -> AST:
+    """
+    Parse the source, reusing the cache file if it is up to date, otherwise refreshing it.
+    :param source: the HeLang code.
+    :param path: the path to the cache file, or None to parse without the cache.
+    :return: the optimized AST, unresolved.
+    """
+    if path is None:
+        return parse_source(source)
+
+    key = source_hash(source)
+    ast = load_ast(path, key)
+    if ast is None:
+        ast = parse_source(source)
+        store_ast(path, key, ast)
+    return ast
+
+
+class ParsedProgram:
+    """
+    An AST resolved to a layout of slots of its own, which runs in environments laid out the same.
+    It never changes after being built, so runs can share it concurrently.
+    """
+
+    __slots__ = ('ast', 'names', '_program', '_lock')
+
+    def __init__(self, ast: AST):
+        layout = Environment()
+        self.ast = resolve(ast, layout)
+        # Variable name of each slot.
+        self.names: Tuple[str, ...] = tuple(layout.names)
+        self._program: Optional[Program] = None
+        self._lock = threading.Lock()
+
+    def environment(self) -> Environment:
+        """
+        Create an empty environment with the layout of the AST.
+        """
+        env = Environment()
+        for name in self.names:
+            env.slot(name)
+        return env
+
+    def matches(self, env: Environment) -> bool:
+        """
+        Whether the AST can run on slots of the environment directly.
+        """
+        return tuple(env.names[:len(self.names)]) == self.names
+
+    def program(self) -> Program:
+        """
+        Get the bytecode, compiled on first use.
+        """
+        if self._program is None:
+            with self._lock:
+                if self._program is None:
+                    # Resolving it again against the same layout stores the same slots.
+                    self._program = compile_ast(self.ast, self.environment())
+        return self._program
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class ParseCache:
+    """
+    Thread-safe LRU cache of programs parsed from source strings.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        """
+        :param maxsize: how many programs to keep at most, 0 disables the cache.
+        """
+        self._entries: OrderedDict[str, ParsedProgram] = OrderedDict()
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, code: str) -> ParsedProgram:
+        """
+        Get the program parsed from the code, parsing it on a miss.
+        :param code: the HeLang code.
+        :return: the parsed program.
+        """
+        with self._lock:
+            parsed = self._entries.get(code)
+            if parsed is not None:
+                self._entries.move_to_end(code)
+                self._hits += 1
+                return parsed
+            self._misses += 1
+
+        # Parsed without the lock, so a long source never blocks others.
+        parsed = ParsedProgram(parse_source(code))
+        with self._lock:
+            if self._maxsize > 0:
+                self._entries[code] = parsed
+                self._entries.move_to_end(code)
+                self._evict()
+        return parsed
+
+    def resize(self, maxsize: int):
+        """
+        Change the size, evicting the least recently used programs if it shrinks.
+        """
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """
+        Drop every program and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, self._maxsize, len(self._entries))
+
+    def _evict(self):
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
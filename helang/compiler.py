@@ -0,0 +1,414 @@
+import enum
+
+from functools import partial
+from typing import Dict, List, Tuple, Any, Callable, Type, Optional, Union
+from .u8 import U8
+from .environment import Environment, UNDEFINED
+from .resolver import resolve
+from .check_cyberspaces import check_cyberspaces
+from .speed_tester import run_speed_test_music, run_speed_test_app
+from .logo import print_logo
+from .output import emit, flush_output
+from .exceptions import CyberNameException, CyberNotSupportedException
+from .he_ast import (
+    AST, VoidAST, ListAST, VarDefAST, VarAssignAST, VarExprAST,
+    PrintAST, SprintAST, VarIncrementAST, U8SetAST, U8GetAST,
+    Test5GMusicAST, Test5GAppAST, EmptyU8InitAST, OrU8InitAST,
+    CyberspacesAST, OperationAST, LogoAST, PrintTextAST
+)
+
+
+class OpCode(enum.IntEnum):
+    # Push a fresh u8 copied from the constant elements.
+    PUSH_U8 = 1
+    # Push a u8 of zeroes, the argument is the length.
+    PUSH_EMPTY = 2
+    # Push the empty u8.
+    PUSH_VOID = 3
+    # Push the variable in the slot.
+    LOAD = 4
+    # Pop the value and define the variable in the slot with it.
+    DEFINE = 5
+    # Make sure the variable in the slot is defined.
+    CHECK = 6
+    # Store the value on the top to the slot, keeping it on the stack.
+    STORE = 7
+    # Increment the variable in the slot, then push it.
+    INCREMENT = 8
+    # Pop subscripts and the list, push the sublist.
+    GET_ITEM = 9
+    # Pop the value, subscripts and the list, set the list and push the empty u8.
+    SET_ITEM = 10
+    # Pop the operands, push the result of the operators in postfix notation.
+    OPERATE = 11
+    # Print the value on the top.
+    PRINT = 12
+    # Print the value on the top as a string.
+    SPRINT = 13
+    # Call the function for its side effect, then push the empty u8.
+    CALL = 14
+    # Discard the value on the top.
+    POP = 15
+    # Pop the operand, operate the variable in the slot with it in place, and push it.
+    OPERATE_INPLACE = 16
+    # Replace the value on the top with a u8 sharing its elements.
+    SHARE = 17
+    # Print the text, the argument, keeping the value on the top.
+    PRINT_TEXT = 18
+
+
+# The opcode is stored as a plain int to be compared quickly.
+Instruction = Tuple[int, Any]
+
+
+class Program:
+    """
+    Linear bytecode lowered from an AST, with its variables resolved to slots.
+    """
+
+    def __init__(self, code: List[Instruction], names: List[str]):
+        self.code = code
+        # Variable name of each slot.
+        self.names = names
+
+    def __str__(self) -> str:
+        lines = []
+        for i, (value, arg) in enumerate(self.code):
+            opcode = OpCode(value)
+            if opcode in (OpCode.LOAD, OpCode.DEFINE, OpCode.CHECK, OpCode.STORE, OpCode.INCREMENT):
+                arg = f'{arg} ({self.names[arg]})'
+            elif opcode == OpCode.OPERATE_INPLACE:
+                arg = f'{arg[0]} ({self.names[arg[0]]}) {arg[1].name}'
+            elif opcode == OpCode.PRINT_TEXT:
+                arg = repr(arg)
+            lines.append(f'{i:>6} {opcode.name:<12} {"" if arg is None else arg}')
+        return '\n'.join(lines)
+
+
+class TypedMethods:
+    """
+    Bind methods with AST types, dispatching by the type of nodes.
+    """
+
+    def __init__(self):
+        self._methods = dict()
+
+    def bind(self, ast_type: Type[AST]):
+        def bind_method(method: Callable):
+            self._methods[ast_type] = method
+            return method
+        return bind_method
+
+    def __contains__(self, ast_type: Type[AST]) -> bool:
+        return ast_type in self._methods.keys()
+
+    def apply(self, ast_type: Type[AST], *args, **kwargs):
+        if ast_type not in self._methods.keys():
+            raise CyberNotSupportedException(f'cannot compile {ast_type.__name__}')
+        return self._methods[ast_type](*args, **kwargs)
+
+
+class Compiler:
+    _lowerings = TypedMethods()
+
+    def __init__(self):
+        self._code: List[Instruction] = []
+
+    def compile(self, ast: AST, env: Environment) -> Program:
+        # Identifiers are lowered to slots of the environment.
+        resolve(ast, env)
+        self._lower(ast)
+        return Program(self._code, list(env.names))
+
+    def _lower(self, ast: AST):
+        Compiler._lowerings.apply(type(ast), self, ast)
+
+    def _emit(self, opcode: OpCode, arg: Any = None):
+        self._code.append((opcode.value, arg))
+
+    def _lower_value(self, ast: AST):
+        # Lower a value to store, which must not be the u8 held by another variable.
+        self._lower(ast)
+        if isinstance(ast, VarExprAST):
+            self._emit(OpCode.SHARE)
+
+    @_lowerings.bind(ListAST)
+    def _lower_list(self, ast: ListAST):
+        for child in ast.asts:
+            self._lower(child)
+            self._emit(OpCode.POP)
+        self._emit(OpCode.PUSH_VOID)
+
+    @_lowerings.bind(VoidAST)
+    def _lower_void(self, _: VoidAST):
+        self._emit(OpCode.PUSH_VOID)
+
+    @_lowerings.bind(VarDefAST)
+    def _lower_var_def(self, ast: VarDefAST):
+        self._lower_value(ast.val)
+        self._emit(OpCode.DEFINE, ast.slot)
+        self._emit(OpCode.PUSH_VOID)
+
+    @_lowerings.bind(VarAssignAST)
+    def _lower_var_assign(self, ast: VarAssignAST):
+        slot = ast.slot
+        self._emit(OpCode.CHECK, slot)
+        if ast.inplace is None:
+            self._lower_value(ast.val)
+            self._emit(OpCode.STORE, slot)
+        else:
+            self._lower(ast.val.operands[1])
+            self._emit(OpCode.OPERATE_INPLACE, (slot, ast.inplace))
+
+    @_lowerings.bind(VarIncrementAST)
+    def _lower_var_increment(self, ast: VarIncrementAST):
+        self._emit(OpCode.INCREMENT, ast.slot)
+
+    @_lowerings.bind(VarExprAST)
+    def _lower_var_expr(self, ast: VarExprAST):
+        self._emit(OpCode.LOAD, ast.slot)
+
+    @_lowerings.bind(EmptyU8InitAST)
+    def _lower_empty_u8(self, ast: EmptyU8InitAST):
+        self._emit(OpCode.PUSH_EMPTY, ast.length)
+
+    @_lowerings.bind(OrU8InitAST)
+    def _lower_or_u8(self, ast: OrU8InitAST):
+        self._emit(OpCode.PUSH_U8, ast.elements)
+
+    @_lowerings.bind(U8SetAST)
+    def _lower_u8_set(self, ast: U8SetAST):
+        self._lower(ast.list_expr)
+        self._lower(ast.subscript_expr)
+        self._lower(ast.value_expr)
+        self._emit(OpCode.SET_ITEM)
+
+    @_lowerings.bind(U8GetAST)
+    def _lower_u8_get(self, ast: U8GetAST):
+        self._lower(ast.list_expr)
+        self._lower(ast.subscript_expr)
+        self._emit(OpCode.GET_ITEM)
+
+    @_lowerings.bind(OperationAST)
+    def _lower_operation(self, ast: OperationAST):
+        # Operands are evaluated before any operator, the same as the tree-walker does.
+        for operand in ast.operands:
+            self._lower(operand)
+        self._emit(OpCode.OPERATE, (len(ast.operands), ast.postfix))
+
+    @_lowerings.bind(PrintAST)
+    def _lower_print(self, ast: PrintAST):
+        self._lower(ast.expr)
+        self._emit(OpCode.PRINT)
+
+    @_lowerings.bind(SprintAST)
+    def _lower_sprint(self, ast: SprintAST):
+        self._lower(ast.expr)
+        self._emit(OpCode.SPRINT)
+
+    @_lowerings.bind(PrintTextAST)
+    def _lower_print_text(self, ast: PrintTextAST):
+        self._emit(OpCode.PUSH_U8, ast.elements)
+        self._emit(OpCode.PRINT_TEXT, ast.text)
+
+    @_lowerings.bind(Test5GMusicAST)
+    def _lower_test_5g_music(self, _: Test5GMusicAST):
+        self._emit(OpCode.CALL, run_speed_test_music)
+
+    @_lowerings.bind(Test5GAppAST)
+    def _lower_test_5g_app(self, _: Test5GAppAST):
+        self._emit(OpCode.CALL, run_speed_test_app)
+
+    @_lowerings.bind(LogoAST)
+    def _lower_logo(self, ast: LogoAST):
+        self._emit(OpCode.CALL, partial(print_logo, ast.size))
+
+    @_lowerings.bind(CyberspacesAST)
+    def _lower_cyberspaces(self, _: CyberspacesAST):
+        self._emit(OpCode.CALL, check_cyberspaces)
+
+
+def compile_ast(ast: AST, env: Optional[Environment] = None) -> Program:
+    """
+    Lowers the AST to bytecode.
+    :param ast: the AST to compile.
+    :param env: the environment to run with, or slots start from 0 for a dict.
+    :return: the compiled program.
+    """
+    return Compiler().compile(ast, env if env is not None else Environment())
+
+
+class VM:
+    """
+    Stack-based virtual machine running compiled programs.
+    """
+
+    @staticmethod
+    def run(program: Program, env: Union[Dict[str, U8], Environment]) -> U8:
+        """
+        Runs the program. It runs on slots of the Environment which it is compiled with.
+        Otherwise, variables are loaded from the dict into slots,
+        and written back when it is finished, even by an exception.
+        :return: the value left by the program.
+        """
+        names = program.names
+        if isinstance(env, Environment):
+            return VM._dispatch(program.code, names, env.slots)
+
+        slots = [env.get(name, UNDEFINED) for name in names]
+        try:
+            return VM._dispatch(program.code, names, slots)
+        finally:
+            for name, val in zip(names, slots):
+                if val is not UNDEFINED:
+                    env[name] = val
+
+    @staticmethod
+    def _dispatch(code: List[Instruction], names: List[str], slots: List[Any]) -> U8:
+        stack = []
+        handlers = _handlers
+        for opcode, arg in code:
+            handlers[opcode](stack, arg, slots, names)
+        return stack[-1] if stack else U8()
+
+
+# Runs an instruction on the stack and the slots, given its argument and the names of the slots.
+Handler = Callable[[List[U8], Any, List[Any], List[str]], None]
+
+
+def _unknown(stack: List[U8], arg: Any, slots: List[Any], names: List[str]):
+    raise CyberNotSupportedException('unknown opcode')
+
+
+# Handlers of instructions, indexed by the values of their opcodes, which is quicker than comparing them.
+_handlers: List[Handler] = [_unknown] * (max(OpCode) + 1)
+
+
+def _handles(opcode: OpCode):
+    def bind_handler(handler: Handler) -> Handler:
+        _handlers[opcode.value] = handler
+        return handler
+    return bind_handler
+
+
+@_handles(OpCode.LOAD)
+def _load(stack: List[U8], arg: int, slots: List[Any], names: List[str]):
+    val = slots[arg]
+    if val is UNDEFINED:
+        raise CyberNameException(f'{names[arg]} is not defined.')
+    stack.append(val)
+
+
+@_handles(OpCode.PUSH_U8)
+def _push_u8(stack: List[U8], arg: Tuple[int, ...], slots: List[Any], names: List[str]):
+    stack.append(U8(arg))
+
+
+@_handles(OpCode.OPERATE)
+def _operate(stack: List[U8], arg: Tuple[int, tuple], slots: List[Any], names: List[str]):
+    count, postfix = arg
+    if count == 2:
+        b = stack.pop()
+        stack.append(postfix[2].operate(stack.pop(), b))
+        return
+    operands = stack[-count:]
+    del stack[-count:]
+    nums = []
+    for item in postfix:
+        if isinstance(item, int):
+            nums.append(operands[item])
+        else:
+            b = nums.pop()
+            nums.append(item.operate(nums.pop(), b))
+    stack.append(nums[-1])
+
+
+@_handles(OpCode.POP)
+def _pop(stack: List[U8], arg: None, slots: List[Any], names: List[str]):
+    stack.pop()
+
+
+@_handles(OpCode.PUSH_VOID)
+def _push_void(stack: List[U8], arg: None, slots: List[Any], names: List[str]):
+    stack.append(U8())
+
+
+@_handles(OpCode.DEFINE)
+def _define(stack: List[U8], arg: int, slots: List[Any], names: List[str]):
+    slots[arg] = stack.pop()
+
+
+@_handles(OpCode.CHECK)
+def _check(stack: List[U8], arg: int, slots: List[Any], names: List[str]):
+    if slots[arg] is UNDEFINED:
+        raise CyberNameException(f'{names[arg]} is not defined.')
+
+
+@_handles(OpCode.STORE)
+def _store(stack: List[U8], arg: int, slots: List[Any], names: List[str]):
+    slots[arg] = stack[-1]
+
+
+@_handles(OpCode.INCREMENT)
+def _increment(stack: List[U8], arg: int, slots: List[Any], names: List[str]):
+    val = slots[arg]
+    if val is UNDEFINED:
+        # The same as looking it up in a dict.
+        raise KeyError(names[arg])
+    val.increment()
+    stack.append(val)
+
+
+@_handles(OpCode.GET_ITEM)
+def _get_item(stack: List[U8], arg: None, slots: List[Any], names: List[str]):
+    subscripts = stack.pop()
+    stack.append(stack.pop()[subscripts])
+
+
+@_handles(OpCode.SET_ITEM)
+def _set_item(stack: List[U8], arg: None, slots: List[Any], names: List[str]):
+    val = stack.pop()
+    subscripts = stack.pop()
+    stack.pop()[subscripts] = val
+    stack.append(U8())
+
+
+@_handles(OpCode.OPERATE_INPLACE)
+def _operate_inplace(stack: List[U8], arg: Tuple[int, Any], slots: List[Any], names: List[str]):
+    slot, operator = arg
+    val = operator.operate_inplace(slots[slot], stack.pop())
+    slots[slot] = val
+    stack.append(val)
+
+
+@_handles(OpCode.SHARE)
+def _share(stack: List[U8], arg: None, slots: List[Any], names: List[str]):
+    stack[-1] = stack[-1].share()
+
+
+@_handles(OpCode.PUSH_EMPTY)
+def _push_empty(stack: List[U8], arg: int, slots: List[Any], names: List[str]):
+    stack.append(U8([0] * arg))
+
+
+@_handles(OpCode.PRINT)
+def _print(stack: List[U8], arg: None, slots: List[Any], names: List[str]):
+    emit(str(stack[-1]))
+
+
+@_handles(OpCode.SPRINT)
+def _sprint(stack: List[U8], arg: None, slots: List[Any], names: List[str]):
+    emit(''.join(map(chr, stack[-1].value)))
+
+
+@_handles(OpCode.PRINT_TEXT)
+def _print_text(stack: List[U8], arg: str, slots: List[Any], names: List[str]):
+    emit(arg)
+
+
+@_handles(OpCode.CALL)
+def _call(stack: List[U8], arg: Callable[[], None], slots: List[Any], names: List[str]):
+    # It prints by itself.
+    flush_output()
+    arg()
+    stack.append(U8())
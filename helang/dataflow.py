@@ -0,0 +1,264 @@
+import os
+import heapq
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional, Set, FrozenSet
+from .u8 import U8
+from .compiler import TypedMethods
+from .he_ast import (
+    AST, ListAST, VarDefAST, VarAssignAST, VarExprAST, VarIncrementAST, U8SetAST, U8GetAST,
+    PrintAST, SprintAST, PrintTextAST, LogoAST, Test5GMusicAST, Test5GAppAST, CyberspacesAST,
+    OperationAST, EmptyU8InitAST
+)
+
+
+# Statements whose effects are observable, which keep their order.
+_EFFECT_ASTS = (PrintAST, SprintAST, PrintTextAST, LogoAST, Test5GMusicAST, Test5GAppAST, CyberspacesAST)
+
+# Nodes worth running on a worker.
+_HEAVY_ASTS = (OperationAST, U8GetAST, U8SetAST, EmptyU8InitAST)
+
+
+class Access:
+    """
+    Variables a statement reads and writes, and how it may be scheduled.
+    """
+
+    __slots__ = ('reads', 'writes', 'effect', 'exclusive', 'heavy')
+
+    def __init__(self, reads: FrozenSet[str], writes: FrozenSet[str], effect: bool, exclusive: bool, heavy: bool):
+        self.reads = reads
+        self.writes = writes
+        # It does something observable, like printing.
+        self.effect = effect
+        # It shares elements of a u8, so nothing may run along with it,
+        # as the share counts of u8s are not updated atomically.
+        self.exclusive = exclusive
+        self.heavy = heavy
+
+
+class AccessAnalyzer:
+    """
+    Finds variables read and written by each node, by names.
+    """
+
+    _rules = TypedMethods()
+
+    def __init__(self):
+        self._reads: Set[str] = set()
+        self._writes: Set[str] = set()
+        self._effect = False
+        self._exclusive = False
+        self._heavy = False
+
+    def analyze(self, ast: AST) -> Access:
+        self._visit(ast)
+        return Access(frozenset(self._reads), frozenset(self._writes), self._effect, self._exclusive, self._heavy)
+
+    def _visit(self, ast: AST):
+        if isinstance(ast, _EFFECT_ASTS):
+            self._effect = True
+        if isinstance(ast, _HEAVY_ASTS):
+            self._heavy = True
+        if type(ast) in AccessAnalyzer._rules:
+            AccessAnalyzer._rules.apply(type(ast), self, ast)
+        for child in ast.children():
+            self._visit(child)
+
+    @_rules.bind(VarExprAST)
+    def _analyze_var_expr(self, ast: VarExprAST):
+        self._reads.add(ast.ident)
+
+    @_rules.bind(VarDefAST)
+    def _analyze_var_def(self, ast: VarDefAST):
+        self._writes.add(ast.ident)
+        if isinstance(ast.val, VarExprAST):
+            self._exclusive = True
+
+    @_rules.bind(VarAssignAST)
+    def _analyze_var_assign(self, ast: VarAssignAST):
+        # It makes sure the variable is defined, and may update it in place.
+        self._reads.add(ast.ident)
+        self._writes.add(ast.ident)
+        if isinstance(ast.val, VarExprAST):
+            self._exclusive = True
+
+    @_rules.bind(VarIncrementAST)
+    def _analyze_var_increment(self, ast: VarIncrementAST):
+        self._reads.add(ast.ident)
+        self._writes.add(ast.ident)
+
+    @_rules.bind(U8SetAST)
+    def _analyze_u8_set(self, ast: U8SetAST):
+        # The list is updated in place.
+        analyzer = AccessAnalyzer()
+        analyzer._visit(ast.list_expr)
+        self._writes.update(analyzer._reads)
+
+
+def analyze(ast: AST) -> Access:
+    """
+    Find variables read and written by the statement.
+    """
+    return AccessAnalyzer().analyze(ast)
+
+
+class DependencyGraph:
+    """
+    The order statements must keep, as edges from each statement to the later ones depending on it.
+    """
+
+    def __init__(self, statements: List[AST]):
+        self.statements = statements
+        self.accesses = [analyze(statement) for statement in statements]
+        self.dependents: List[List[int]] = [[] for _ in statements]
+        self.indegrees = [0] * len(statements)
+
+        last_writers: Dict[str, int] = dict()
+        # Statements reading the variable since it was written last.
+        readers: Dict[str, List[int]] = dict()
+        # Statements since the last effect, and since the last exclusive one.
+        since_effect: List[int] = []
+        since_exclusive: List[int] = []
+        last_exclusive: Optional[int] = None
+
+        for i, access in enumerate(self.accesses):
+            deps = _variable_dependencies(access, last_writers, readers)
+            if last_exclusive is not None:
+                deps.add(last_exclusive)
+            if access.effect:
+                # Effects wait for everything before, so they never happen before an earlier failure.
+                deps.update(since_effect)
+                since_effect.clear()
+            if access.exclusive:
+                deps.update(since_exclusive)
+                since_exclusive.clear()
+                last_exclusive = i
+
+            deps.discard(i)
+            for dep in deps:
+                self.dependents[dep].append(i)
+            self.indegrees[i] = len(deps)
+
+            for name in access.writes:
+                last_writers[name] = i
+            for name in access.reads - access.writes:
+                readers.setdefault(name, []).append(i)
+            since_effect.append(i)
+            since_exclusive.append(i)
+
+
+def _variable_dependencies(access: Access, last_writers: Dict[str, int], readers: Dict[str, List[int]]) -> Set[int]:
+    # The last writers of the variables accessed, and readers since then of those written, whom they are taken from.
+    deps = set()
+    for name in access.reads | access.writes:
+        if name in last_writers:
+            deps.add(last_writers[name])
+    for name in access.writes:
+        deps.update(readers.pop(name, ()))
+    return deps
+
+
+class _Schedule:
+    # Statements of a run of the executor, as they become ready, run and finish.
+    def __init__(self, graph: DependencyGraph):
+        self.graph = graph
+        self.indegrees = list(graph.indegrees)
+        self.ready = [i for i, indegree in enumerate(self.indegrees) if indegree == 0]
+        heapq.heapify(self.ready)
+        self.running: Dict[Future, int] = dict()
+        self.errors: Dict[int, BaseException] = dict()
+        # The first failed statement, those before it still run as they do one by one.
+        self.failed = len(graph.statements)
+
+    def next_ready(self) -> Optional[int]:
+        # Earlier statements first.
+        if self.ready and self.ready[0] < self.failed:
+            return heapq.heappop(self.ready)
+        return None
+
+    def finish(self, i: int):
+        for j in self.graph.dependents[i]:
+            self.indegrees[j] -= 1
+            if self.indegrees[j] == 0:
+                heapq.heappush(self.ready, j)
+
+    def fail(self, i: int, error: BaseException):
+        self.errors[i] = error
+        self.failed = min(self.failed, i)
+
+    def collect(self, done: Set[Future]):
+        for future in done:
+            i = self.running.pop(future)
+            if future.exception() is not None:
+                self.fail(i, future.exception())
+            else:
+                self.finish(i)
+
+
+class DataflowExecutor:
+    """
+    Runs statements as soon as what they depend on is finished, heavy ones on a thread pool.
+    Effects happen in the order of the program, on the calling thread.
+    If a statement fails, everything before it still runs and its exception is raised,
+    though independent statements after it may have run as well.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        :param workers: how many threads to run statements, the count of CPUs by default.
+        """
+        self._workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def run(self, ast: AST, env: Dict[str, U8]) -> U8:
+        """
+        Run the AST in the environment.
+        :param ast: the AST, resolved to slots of the environment if it is an Environment.
+        :param env: the environment.
+        :return: the empty u8, as a list of statements does.
+        """
+        if not isinstance(ast, ListAST):
+            return ast.evaluate(env)
+
+        schedule = _Schedule(DependencyGraph(ast.asts))
+        while True:
+            self._start_ready(schedule, env)
+            if not schedule.running:
+                break
+            done, _ = wait(schedule.running, return_when=FIRST_COMPLETED)
+            schedule.collect(done)
+
+        if schedule.errors:
+            raise schedule.errors[schedule.failed]
+        return U8()
+
+    def _start_ready(self, schedule: _Schedule, env: Dict[str, U8]):
+        # Heavy statements go to the pool, unless nothing else would run meanwhile.
+        i = schedule.next_ready()
+        while i is not None:
+            statement, access = schedule.graph.statements[i], schedule.graph.accesses[i]
+            if access.heavy and not access.effect and (schedule.ready or schedule.running):
+                schedule.running[self._get_pool().submit(statement.evaluate, env)] = i
+            else:
+                try:
+                    statement.evaluate(env)
+                except Exception as e:
+                    schedule.fail(i, e)
+                else:
+                    schedule.finish(i)
+            i = schedule.next_ready()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self._workers, thread_name_prefix='helang-dataflow')
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
@@ -0,0 +1,58 @@
+from typing import Dict, List, Any, Iterator, Mapping, Optional, MutableMapping
+from .u8 import U8
+
+
+# Marks slots of undefined variables.
+UNDEFINED = object()
+
+
+class Environment(MutableMapping[str, U8]):
+    """
+    Variables kept in a list of slots, as identifiers are resolved to slots before running.
+    It works as a dict of the defined variables as well.
+    """
+
+    def __init__(self, variables: Optional[Mapping[str, U8]] = None):
+        # Name of each slot.
+        self.names: List[str] = []
+        self.slots: List[Any] = []
+        self._index: Dict[str, int] = dict()
+        if variables is not None:
+            self.update(variables)
+
+    def slot(self, name: str) -> int:
+        """
+        Get the slot of the name, adding an undefined one if it is new.
+        :param name: the variable name.
+        :return: the slot.
+        """
+        slot = self._index.get(name)
+        if slot is None:
+            slot = len(self.names)
+            self._index[name] = slot
+            self.names.append(name)
+            self.slots.append(UNDEFINED)
+        return slot
+
+    def __getitem__(self, name: str) -> U8:
+        slot = self._index.get(name)
+        if slot is None or self.slots[slot] is UNDEFINED:
+            raise KeyError(name)
+        return self.slots[slot]
+
+    def __setitem__(self, name: str, val: U8):
+        self.slots[self.slot(name)] = val
+
+    def __delitem__(self, name: str):
+        # Raises KeyError for undefined ones.
+        self[name]
+        self.slots[self._index[name]] = UNDEFINED
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name, val in zip(self.names, self.slots) if val is not UNDEFINED)
+
+    def __len__(self) -> int:
+        return sum(1 for val in self.slots if val is not UNDEFINED)
+
+    def __repr__(self):
+        return f'Environment({dict(self)})'
@@ -1,90 +1,160 @@
 import enum
 
-from typing import Dict, Optional, List, Union
+from typing import Dict, List, Union, Iterable, Iterator, Tuple, Optional
 from .u8 import U8
+from .environment import UNDEFINED
 from .check_cyberspaces import check_cyberspaces
 from .speed_tester import run_speed_test_music, run_speed_test_app
 from .logo import print_logo
 from .exceptions import CyberNameException
 from .tokens import Token, TokenKind
+from .output import emit, flush_output
 
 
 class AST:
+    # Offset of a statement in the source, set by the parser on statements only.
+    # Read it by getattr(ast, 'offset', None), as it is unset on the others.
+    __slots__ = ('offset', )
+
     def evaluate(self, env: Dict[str, U8]) -> U8:
         raise NotImplementedError()
 
+    def children(self) -> Iterator['AST']:
+        """
+        Child nodes, found in fields of the node and lists of them.
+        """
+        for name in self.__slots__:
+            field = getattr(self, name)
+            if isinstance(field, AST):
+                yield field
+            elif isinstance(field, list):
+                yield from (item for item in field if isinstance(item, AST))
+
+
+# Variables are looked up by names in env, unless they are resolved to slots of an Environment.
+# Then env must be the Environment.
 
 class VarDefAST(AST):
+    __slots__ = ('ident', 'val', 'slot')
+
     def __init__(self, ident: str, val: AST):
-        self._ident = ident
-        self._val = val
+        self.ident = ident
+        self.val = val
+        self.slot: Optional[int] = None
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        val = self._val.evaluate(env)
-        env[self._ident] = val
+        val = self.val.evaluate(env)
+        if isinstance(self.val, VarExprAST):
+            # Variables never hold the same u8, but may share its elements until written.
+            val = val.share()
+        if self.slot is None:
+            env[self.ident] = val
+        else:
+            env.slots[self.slot] = val
         return U8()
 
 
 class VarAssignAST(AST):
+    __slots__ = ('ident', 'val', 'slot', 'inplace')
+
     def __init__(self, ident: str, val: AST):
-        self._ident = ident
-        self._val = val
+        self.ident = ident
+        self.val = val
+        self.slot: Optional[int] = None
+        # The operator of `a = a + b;` and `a = a - b;`, which may update a in place.
+        self.inplace = _inplace_operator(ident, val)
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        if self._ident not in env.keys():
-            raise CyberNameException(f'{self._ident} is not defined.')
-        val = self._val.evaluate(env)
-        env[self._ident] = val
+        if self.slot is None:
+            if self.ident not in env.keys():
+                raise CyberNameException(f'{self.ident} is not defined.')
+            var = env[self.ident]
+        else:
+            var = env.slots[self.slot]
+            if var is UNDEFINED:
+                raise CyberNameException(f'{self.ident} is not defined.')
+
+        if self.inplace is None:
+            val = self.val.evaluate(env)
+            if isinstance(self.val, VarExprAST):
+                val = val.share()
+        else:
+            other = self.val.operands[1].evaluate(env)
+            val = self.inplace.operate_inplace(var, other)
+
+        if self.slot is None:
+            env[self.ident] = val
+        else:
+            env.slots[self.slot] = val
         return val
 
 
 class VarIncrementAST(AST):
+    __slots__ = ('ident', 'slot')
+
     def __init__(self, ident: str):
-        self._ident = ident
+        self.ident = ident
+        self.slot: Optional[int] = None
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        var = env[self._ident]
+        if self.slot is None:
+            var = env[self.ident]
+        else:
+            var = env.slots[self.slot]
+            if var is UNDEFINED:
+                # The same as looking it up by the name.
+                raise KeyError(self.ident)
         var.increment()
         return var
 
 
 class VarExprAST(AST):
+    __slots__ = ('ident', 'slot')
+
     def __init__(self, ident: str):
-        self._ident = ident
+        self.ident = ident
+        self.slot: Optional[int] = None
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        if self._ident not in env.keys():
-            raise CyberNameException(f'{self._ident} is not defined.')
-        return env[self._ident]
+        if self.slot is None:
+            if self.ident not in env.keys():
+                raise CyberNameException(f'{self.ident} is not defined.')
+            return env[self.ident]
+        var = env.slots[self.slot]
+        if var is UNDEFINED:
+            raise CyberNameException(f'{self.ident} is not defined.')
+        return var
 
 
 class EmptyU8InitAST(AST):
+    __slots__ = ('length', )
+
     def __init__(self, length: int):
-        self._length = length
+        self.length = length
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        return U8([0] * self._length)
+        return U8([0] * self.length)
 
 
 class OrU8InitAST(AST):
     """
     How the King He defines uint8 list: by | operator.
+    The whole chain is folded into one immutable buffer when parsing.
     """
 
-    def __init__(self, first: int, second: Optional['OrU8InitAST'] = None):
-        self._first = first
-        self._second = second
+    __slots__ = ('elements', )
+
+    def __init__(self, elements: Iterable[int]):
+        self.elements = tuple(elements)
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        if self._second is None:
-            return U8([self._first])
-        second = self._second.evaluate(env).value
-        elements = [self._first]
-        elements.extend(second)
-        return U8(elements)
+        # A single copy, so the buffer stays untouched whatever happens to the result.
+        return U8(self.elements)
 
 
 class ListAST(AST):
+    __slots__ = ('asts', )
+
     def __init__(self, asts: List[AST]):
         self.asts = asts
 
@@ -95,53 +165,69 @@ class ListAST(AST):
 
 
 class VoidAST(AST):
+    __slots__ = ()
+
     def evaluate(self, env: Dict[str, U8]) -> U8:
         return U8()
 
 
 class U8SetAST(AST):
+    __slots__ = ('list_expr', 'subscript_expr', 'value_expr')
+
     def __init__(self, list_expr: AST, subscript_expr: AST, value_expr: AST):
-        self._list = list_expr
-        self._subscript = subscript_expr
-        self._value = value_expr
+        self.list_expr = list_expr
+        self.subscript_expr = subscript_expr
+        self.value_expr = value_expr
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        lst = self._list.evaluate(env)
-        subscripts = self._subscript.evaluate(env)
-        val = self._value.evaluate(env)
+        lst = self.list_expr.evaluate(env)
+        subscripts = self.subscript_expr.evaluate(env)
+        val = self.value_expr.evaluate(env)
         lst[subscripts] = val
         return U8()
 
 
 class U8GetAST(AST):
+    __slots__ = ('list_expr', 'subscript_expr')
+
     def __init__(self, list_expr: AST, subscript_expr: AST):
-        self._list = list_expr
-        self._subscript = subscript_expr
+        self.list_expr = list_expr
+        self.subscript_expr = subscript_expr
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        lst = self._list.evaluate(env)
-        subscripts = self._subscript.evaluate(env)
+        lst = self.list_expr.evaluate(env)
+        subscripts = self.subscript_expr.evaluate(env)
         return lst[subscripts]
 
 
 class PrintAST(AST):
+    __slots__ = ('expr', )
+
     def __init__(self, expr: AST):
-        self._expr = expr
+        self.expr = expr
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        val = self._expr.evaluate(env)
-        print(str(val))
+        val = self.expr.evaluate(env)
+        emit(str(val))
         return val
 
 
 class Test5GMusicAST(AST):
+    __slots__ = ()
+
     def evaluate(self, env: Dict[str, U8]) -> U8:
+        # It prints by itself.
+        flush_output()
         run_speed_test_music()
         return U8()
 
 
 class Test5GAppAST(AST):
+    __slots__ = ()
+
     def evaluate(self, env: Dict[str, U8]) -> U8:
+        # It prints by itself.
+        flush_output()
         run_speed_test_app()
         return U8()
 
@@ -153,36 +239,65 @@ class LogoSize(enum.Enum):
 
     @classmethod
     def from_token(cls, token: Token):
+        return cls.from_kind(token.kind)
+
+    @classmethod
+    def from_kind(cls, kind: TokenKind):
         operators = {
             TokenKind.LOGO_TINY: cls.TINY,
             TokenKind.LOGO_MEDIUM: cls.MEDIUM,
             TokenKind.LOGO_LARGE: cls.LARGE,
         }
-        return operators[token.kind]
+        return operators[kind]
 
 
 class LogoAST(AST):
+    __slots__ = ('size', )
+
     def __init__(self, size: LogoSize):
-        self._size = size
+        self.size = size
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        print_logo(self._size)
+        # It prints by itself.
+        flush_output()
+        print_logo(self.size)
         return U8()
 
 
 class SprintAST(AST):
+    __slots__ = ('expr', )
+
     def __init__(self, expr: AST):
-        self._expr = expr
+        self.expr = expr
 
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        chars = self._expr.evaluate(env)
-        val = ''.join(chr(char) for char in chars.value)
-        print(val)
+        chars = self.expr.evaluate(env)
+        emit(''.join(map(chr, chars.value)))
         return chars
 
 
+class PrintTextAST(AST):
+    """
+    Print or sprint of a constant, rendered to the text when optimizing.
+    """
+
+    __slots__ = ('text', 'elements')
+
+    def __init__(self, text: str, elements: Iterable[int]):
+        self.text = text
+        self.elements = tuple(elements)
+
+    def evaluate(self, env: Dict[str, U8]) -> U8:
+        emit(self.text)
+        return U8(self.elements)
+
+
 class CyberspacesAST(AST):
+    __slots__ = ()
+
     def evaluate(self, env: Dict[str, U8]) -> U8:
+        # It prints by itself.
+        flush_output()
         check_cyberspaces()
         return U8()
 
@@ -200,36 +315,29 @@ class Operator(enum.Enum):
 
     @property
     def priority(self):
-        mapping = {
-            Operator.LT: 0,
-            Operator.LEQ: 0,
-            Operator.GT: 0,
-            Operator.GEQ: 0,
-            Operator.EQ: 0,
-            Operator.NEQ: 0,
-            Operator.ADD: 1,
-            Operator.SUB: 1,
-            Operator.MUL: 2,
-        }
-        return mapping[self]
+        return _PRIORITIES[self]
 
     def operate(self, a: U8, b: U8) -> U8:
-        operation = {
-            Operator.LT: a.__lt__,
-            Operator.LEQ: a.__le__,
-            Operator.GT: a.__gt__,
-            Operator.GEQ: a.__ge__,
-            Operator.EQ: a.__eq__,
-            Operator.NEQ: lambda n: not a.__eq__(n),
-            Operator.ADD: a.__add__,
-            Operator.SUB: a.__sub__,
-            Operator.MUL: a.__mul__,
-        }
-        result = operation[self](b)
+        result = _OPERATIONS[self](a, b)
         return result if not isinstance(result, bool) else U8(int(result))
 
+    @property
+    def supports_inplace(self) -> bool:
+        return self in _INPLACE_OPERATIONS
+
+    def operate_inplace(self, a: U8, b: U8) -> U8:
+        """
+        Operate on a in place, copying its elements first if they are shared.
+        :return: a with the result.
+        """
+        return _INPLACE_OPERATIONS[self](a, b)
+
     @classmethod
     def from_token(cls, token: Token):
+        return cls.from_kind(token.kind)
+
+    @classmethod
+    def from_kind(cls, kind: TokenKind):
         operators = {
             TokenKind.ADD: cls.ADD,
             TokenKind.SUB: cls.SUB,
@@ -241,61 +349,99 @@ class Operator(enum.Enum):
             TokenKind.EQ: cls.EQ,
             TokenKind.NEQ: cls.NEQ,
         }
-        return operators[token.kind]
+        return operators[kind]
+
+
+_PRIORITIES = {
+    Operator.LT: 0,
+    Operator.LEQ: 0,
+    Operator.GT: 0,
+    Operator.GEQ: 0,
+    Operator.EQ: 0,
+    Operator.NEQ: 0,
+    Operator.ADD: 1,
+    Operator.SUB: 1,
+    Operator.MUL: 2,
+}
+
+_OPERATIONS = {
+    Operator.LT: U8.__lt__,
+    Operator.LEQ: U8.__le__,
+    Operator.GT: U8.__gt__,
+    Operator.GEQ: U8.__ge__,
+    Operator.EQ: U8.__eq__,
+    Operator.NEQ: lambda a, b: not a.__eq__(b),
+    Operator.ADD: U8.__add__,
+    Operator.SUB: U8.__sub__,
+    Operator.MUL: U8.__mul__,
+}
+
+_INPLACE_OPERATIONS = {
+    Operator.ADD: U8.iadd,
+    Operator.SUB: U8.isub,
+}
+
+
+# https://leetcode.cn/problems/basic-calculator-ii/solution/dai-ma-jian-ji-yi-chong-huan-bu-cuo-de-j-nhrq/
+def _to_postfix(operators: List[Operator]) -> Tuple[Union[int, Operator], ...]:
+    """
+    Reorder a flat operation chain to postfix notation by the priorities.
+    Operators of the same priority are left-associative.
+    :param operators: operators between operands.
+    :return: indices of operands and operators in postfix notation.
+    """
+    items = [0]
+    ops = []
+    for i, op in enumerate(operators, 1):
+        while ops and ops[-1].priority >= op.priority:
+            items.append(ops.pop())
+        ops.append(op)
+        items.append(i)
+    while ops:
+        items.append(ops.pop())
+    return tuple(items)
 
 
-def _calc(nums: List[U8], ops: List[Operator]):
-    if len(nums) < 2:
-        return
-    if not ops:
-        return
-    b = nums.pop()
-    a = nums.pop()
-    op = ops.pop()
-    nums.append(op.operate(a, b))
+class OperationAST(AST):
+    """
+    A flat chain of operations, like a + b * c < d.
+    The priorities are resolved once here, instead of every evaluation.
+    """
 
+    __slots__ = ('operands', 'operators', 'postfix')
 
-class OperationAST(AST):
-    def __init__(self, first: AST, second: AST, op: Operator):
-        self._first = first
-        self._second = second
-        self._op = op
+    def __init__(self, operands: List[AST], operators: List[Operator]):
+        self.operands = operands
+        self.operators = operators
+        self.postfix = _to_postfix(operators)
 
-    # https://leetcode.cn/problems/basic-calculator-ii/solution/dai-ma-jian-ji-yi-chong-huan-bu-cuo-de-j-nhrq/
     def evaluate(self, env: Dict[str, U8]) -> U8:
-        expr = self._to_expression(env)
+        # Evaluate all operands before any operator.
+        operands = [operand.evaluate(env) for operand in self.operands]
+        if len(operands) == 2:
+            return self.operators[0].operate(operands[0], operands[1])
+
         nums = []
-        ops = []
-        for item in expr:
-            if isinstance(item, U8):
-                nums.append(item)
-                continue
-
-            while ops:
-                prev = ops[-1]
-                if prev.priority >= item.priority:
-                    _calc(nums, ops)
-                else:
-                    break
-            ops.append(item)
-
-        while ops:
-            _calc(nums, ops)
+        for item in self.postfix:
+            if isinstance(item, int):
+                nums.append(operands[item])
+            else:
+                b = nums.pop()
+                nums.append(item.operate(nums.pop(), b))
         return nums[-1]
 
-    def _to_expression(self, env: Dict[str, U8]) -> List[Union[U8, Operator]]:
-        expr = []
 
-        if isinstance(self._first, OperationAST):
-            expr.extend(self._first._to_expression(env))
-        else:
-            expr.append(self._first.evaluate(env))
-
-        expr.append(self._op)
-
-        if isinstance(self._second, OperationAST):
-            expr.extend(self._second._to_expression(env))
-        else:
-            expr.append(self._second.evaluate(env))
-
-        return expr
+def _inplace_operator(ident: str, val: AST) -> Optional[Operator]:
+    """
+    Find the operator if the value is the variable itself operated with another operand,
+    by an operator which supports operating in place.
+    :param ident: the variable assigned to.
+    :param val: the value assigned.
+    :return: the operator, or None.
+    """
+    if not isinstance(val, OperationAST) or len(val.operators) != 1:
+        return None
+    left, op = val.operands[0], val.operators[0]
+    if not isinstance(left, VarExprAST) or left.ident != ident or not op.supports_inplace:
+        return None
+    return op
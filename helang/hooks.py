@@ -0,0 +1,286 @@
+import re
+import threading
+
+from bisect import bisect_right
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from . import u8
+from .u8 import U8
+from .he_ast import AST, ListAST
+from .dataflow import analyze
+from .output import OutputSink, current_sink, output_to
+
+
+# Kernels taking new buffers of u8 elements.
+# Results of the other kernels become u8s through new, and copies are taken on write.
+_ALLOCATING_KERNELS = ('new', 'copy')
+
+# How many characters of a statement are shown.
+_TEXT_LIMIT = 48
+
+
+class Hook:
+    """
+    Watches running code, by overriding the events it cares about.
+    Events nobody overrides are never sent, so they cost nothing.
+    """
+
+    def on_run_start(self, source: str, path: str):
+        """
+        :param source: the source of the AST, to locate statements by their offsets, maybe empty.
+        :param path: the name of the source.
+        """
+
+    def on_run_end(self):
+        ...
+
+    def on_statement_start(self, index: int, statement: AST):
+        """
+        :param index: the index of the statement in the program.
+        :param statement: the statement, whose offset is in getattr(statement, 'offset', None).
+        """
+
+    def on_statement_end(self, index: int, statement: AST, error: Optional[BaseException]):
+        """
+        :param error: the exception the statement raised, or None if it finished.
+        """
+
+    def on_var_write(self, name: str, value: U8):
+        """
+        A variable is written, sent after the statement writing it finishes.
+        """
+
+    def on_alloc(self, length: int):
+        """
+        A new buffer of u8 elements is taken, which is not empty.
+        """
+
+    def on_print(self, line: str):
+        """
+        A line is printed by print or sprint.
+        """
+
+
+def _overrides(hook: Hook, event: str) -> bool:
+    return getattr(type(hook), event) is not getattr(Hook, event)
+
+
+class _HookedSink(OutputSink):
+    # Sends lines to the hooks before the sink.
+    def __init__(self, sink: Optional[OutputSink], listeners: List[Callable[[str], None]]):
+        self._sink = sink
+        self._listeners = listeners
+
+    def write_line(self, line: str):
+        for listener in self._listeners:
+            listener(line)
+        if self._sink is None:
+            print(line)
+        else:
+            self._sink.write_line(line)
+
+    def flush(self):
+        if self._sink is not None:
+            self._sink.flush()
+
+
+# Listeners of allocations of the code running in the context, like output sinks,
+# so hooked runs in other threads never count each other's.
+_alloc_listeners: ContextVar[Optional[List[Callable[[int], None]]]] = ContextVar('helang_alloc', default=None)
+
+
+def _hooked_storage(storage: type) -> type:
+    # A subclass of the storage sending lengths of new buffers to the listeners of the context, except empty ones.
+    # Every kernel runs bound to the original class, so those calling new are not sent twice.
+    def send(kernel: Callable):
+        def sent(*args):
+            values = kernel(*args)
+            length = len(values)
+            listeners = _alloc_listeners.get()
+            if length and listeners is not None:
+                for listener in listeners:
+                    listener(length)
+            return values
+        return staticmethod(sent)
+
+    namespace = dict()
+    for name in dir(storage):
+        kernel = getattr(storage, name)
+        if not name.startswith('_') and callable(kernel):
+            namespace[name] = send(kernel) if name in _ALLOCATING_KERNELS else staticmethod(kernel)
+    return type('Hooked' + storage.__name__, (storage, ), namespace)
+
+
+class _AllocWatch:
+    # Keeps the hooked storage in place while any run watches allocations, in whichever thread.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._former: Optional[type] = None
+
+    @contextmanager
+    def watching(self, listeners: List[Callable[[int], None]]) -> Iterator[None]:
+        with self._lock:
+            if self._runs == 0:
+                self._former = u8.swap_storage(_hooked_storage(u8._storage))
+            self._runs += 1
+        token = _alloc_listeners.set(listeners)
+        try:
+            yield
+        finally:
+            _alloc_listeners.reset(token)
+            with self._lock:
+                self._runs -= 1
+                if self._runs == 0:
+                    u8.swap_storage(self._former)
+                    self._former = None
+
+
+_alloc_watch = _AllocWatch()
+
+
+class HookRegistry:
+    """
+    Hooks watching runs of code.
+    While it is empty, code runs by its engine untouched, so the evaluator pays nothing for hooks.
+    Otherwise, the AST is walked statement by statement whatever the engine is,
+    and allocations and output are watched only if any hook asks for them.
+    """
+
+    def __init__(self, hooks: Tuple[Hook, ...] = ()):
+        self._hooks = list(hooks)
+
+    def register(self, hook: Hook) -> Hook:
+        self._hooks.append(hook)
+        return hook
+
+    def unregister(self, hook: Hook):
+        self._hooks.remove(hook)
+
+    def clear(self):
+        self._hooks.clear()
+
+    @contextmanager
+    def registered(self, hook: Hook) -> Iterator[Hook]:
+        """
+        Register the hook for runs in the context.
+        """
+        self.register(hook)
+        try:
+            yield hook
+        finally:
+            self.unregister(hook)
+
+    def with_hook(self, hook: Hook) -> 'HookRegistry':
+        """
+        :return: a new registry of these hooks and the other one.
+        """
+        return HookRegistry(tuple(self._hooks) + (hook, ))
+
+    def __bool__(self) -> bool:
+        return bool(self._hooks)
+
+    def __len__(self) -> int:
+        return len(self._hooks)
+
+    def _listeners(self, hooks: List[Hook], event: str) -> list:
+        return [getattr(hook, event) for hook in hooks if _overrides(hook, event)]
+
+    def run(self, ast: AST, env: Dict[str, U8], source: str = '', path: str = '<string>') -> U8:
+        """
+        Run the AST in the environment statement by statement, sending events to the hooks.
+        :param ast: the AST, resolved to slots of the environment if it is an Environment.
+        :param env: the environment.
+        :param source: the source of the AST, for hooks to locate statements.
+        :param path: the name of the source.
+        :return: the empty u8, as a list of statements does.
+        """
+        # Hooks registered while running wait for the next run.
+        hooks = list(self._hooks)
+        starts = self._listeners(hooks, 'on_statement_start')
+        ends = self._listeners(hooks, 'on_statement_end')
+        writes = self._listeners(hooks, 'on_var_write')
+
+        statements = ast.asts if isinstance(ast, ListAST) else [ast]
+        with self._watching(hooks, source, path):
+            for i, statement in enumerate(statements):
+                _run_statement(i, statement, env, starts, ends)
+                if writes:
+                    for name in analyze(statement).writes:
+                        for listener in writes:
+                            listener(name, env[name])
+        return U8()
+
+    @contextmanager
+    def _watching(self, hooks: List[Hook], source: str, path: str) -> Iterator[None]:
+        # Starts and ends the run for the hooks, watching allocations and output while it runs if they ask.
+        allocs = self._listeners(hooks, 'on_alloc')
+        prints = self._listeners(hooks, 'on_print')
+        with ExitStack() as stack:
+            for hook in hooks:
+                hook.on_run_start(source, path)
+                stack.callback(hook.on_run_end)
+            if allocs:
+                stack.enter_context(_alloc_watch.watching(allocs))
+            if prints:
+                stack.enter_context(output_to(_HookedSink(current_sink(), prints)))
+            yield
+
+
+def _run_statement(index: int, statement: AST, env: Dict[str, U8], starts: list, ends: list):
+    for listener in starts:
+        listener(index, statement)
+    try:
+        statement.evaluate(env)
+    except BaseException as e:
+        for listener in ends:
+            listener(index, statement, e)
+        raise
+    for listener in ends:
+        listener(index, statement, None)
+
+
+# Hooks watching every run of quick_run_string, quick_run_file and the shell.
+hooks = HookRegistry()
+
+
+class SourceMap:
+    """
+    Locates offsets in the source by lines and columns, both starting from 1.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._line_starts = [0] + [m.end() for m in re.finditer('\n', source)]
+
+    def locate(self, offset: int) -> Tuple[int, int]:
+        """
+        :return: the line and the column.
+        """
+        line = bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1] + 1
+
+    def statement_text(self, offset: int) -> str:
+        """
+        :return: the statement starting from the offset, shortened to a line.
+        """
+        line_end = self.source.find('\n', offset)
+        line_end = len(self.source) if line_end < 0 else line_end
+        # Statements end with semicolons, and there are no strings holding them.
+        end = self.source.find(';', offset, line_end)
+        return shorten(self.source[offset:line_end if end < 0 else end + 1].strip())
+
+
+def shorten(text: str, limit: int = _TEXT_LIMIT) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+def describe(statement: AST, source_map: SourceMap) -> str:
+    """
+    Name the statement by its text, or its type if the offset is unknown.
+    """
+    offset = getattr(statement, 'offset', None)
+    if offset is None:
+        return type(statement).__name__
+    return source_map.statement_text(offset)
@@ -1,12 +1,27 @@
+import os
 import sys
 import pkgutil
+import atexit
 import traceback
 import platform
+import time
 
-from typing import Dict
-from .quick_runner import quick_run_string
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from .quick_runner import quick_run_string, quick_run_file, Engine, dataflow_executor
+from .batch import run_batch
 from .lexer import Lexer
+from .tokens import offsets_array
 from .parser import Parser
+from .compiler import compile_ast, VM
+from .environment import Environment
+from .resolver import resolve
+from .optimizer import optimize, counting_nodes
+from .output import output_to
+from .profiler import Profiler
+from .hooks import hooks
+from .trace import ChromeTraceHook
+from .he_ast import AST
 from .exceptions import HeLangException
 from .u8 import U8
 
@@ -17,6 +32,13 @@ SHELL_HELP = """
 .env   Print current environments
 """.strip()
 
+ENGINE_HELP = """
+--engine=ast       Walk the AST node by node, the default
+--engine=vm        Compile the AST to bytecode and run it on the VM
+--engine=dataflow  Run independent statements concurrently, which is only faster
+                   with a storage releasing the GIL, like NumPy, never the default list storage
+""".strip()
+
 
 def process_shell_keywords(text: str, env: Dict[str, U8]):
     if text == 'help':
@@ -31,8 +53,9 @@ def process_shell_keywords(text: str, env: Dict[str, U8]):
         print(f'Invalid shell keyword: {text}')
 
 
-def launch_shell():
-    env = dict()
+def launch_shell(options: Dict[str, str], _: List[str]):
+    engine = get_engine(options)
+    env = Environment()
     while True:
         text = ''
         try:
@@ -49,10 +72,10 @@ def launch_shell():
 
         if not text.endswith(';'):
             text += ';'
-        lexer = Lexer(text)
-        parser = Parser(lexer.lex())
+        offsets = offsets_array(len(text))
+        parser = Parser(Lexer(text, offsets=offsets).lex(), offsets=offsets)
         try:
-            parser.parse().evaluate(env)
+            run_shell_line(optimize_ast(parser.parse(), options), text, env, engine)
         except HeLangException:
             traceback.print_exc()
         except Exception as e:
@@ -60,7 +83,23 @@ def launch_shell():
             raise e
 
 
-def launch_editor():
+def run_shell_line(ast: AST, text: str, env: Environment, engine: Engine):
+    """
+    Run the AST of a line typed in the shell, by the hooks if any, otherwise by the engine.
+    Identifiers of every line are resolved to slots of the same environment.
+    """
+    with output_to():
+        if hooks:
+            hooks.run(resolve(ast, env), env, text, '<shell>')
+        elif engine == Engine.VM:
+            VM.run(compile_ast(ast, env), env)
+        elif engine == Engine.DATAFLOW:
+            dataflow_executor.run(resolve(ast, env), env)
+        else:
+            resolve(ast, env).evaluate(env)
+
+
+def launch_editor(*_):
     from helang.lt_code.window import LTCodeWindow
     from PySide6.QtWidgets import QApplication
     app = QApplication()
@@ -69,12 +108,98 @@ def launch_editor():
     sys.exit(app.exec_())
 
 
-def launch_great_script():
-    quick_run_string(pkgutil.get_data(__name__, 'great.he').decode('utf-8'))
+@contextmanager
+def dumping_nodes(options: Dict[str, str]) -> Iterator[None]:
+    """
+    Print node counts of ASTs optimized in the context to stderr, before and after, if --dump-nodes is given.
+    """
+    if 'dump-nodes' not in options:
+        yield
+        return
+    with counting_nodes() as counts:
+        try:
+            yield
+        finally:
+            for before, after in counts:
+                print(f'Nodes: {before} before optimizing, {after} after.', file=sys.stderr)
+
+
+def optimize_ast(ast: AST, options: Dict[str, str]) -> AST:
+    """
+    Optimize the AST, printing the node counts before and after to stderr if --dump-nodes is given.
+    """
+    with dumping_nodes(options):
+        return optimize(ast)
+
+
+def run_package_script(name: str, options: Dict[str, str]):
+    """
+    Run a script shipped with the package, through the .hec cache unless --no-cache is given,
+    which reads the whole script to hash it, where --no-cache streams it instead.
+    --dump-nodes skips the cache too, as nodes are counted while the AST to run is optimized.
+    """
+    engine = get_engine(options)
+    profiler = Profiler() if 'profile' in options else None
+    cache = 'no-cache' not in options and 'dump-nodes' not in options
+    path = os.path.join(os.path.dirname(__file__), name)
+    try:
+        with dumping_nodes(options):
+            if os.path.isfile(path):
+                quick_run_file(path, engine=engine, cache=cache, profiler=profiler)
+            else:
+                # Not a plain directory, like a zipped package.
+                quick_run_string(pkgutil.get_data(__name__, name).decode('utf-8'), engine=engine, profiler=profiler)
+    finally:
+        if profiler is not None:
+            report_profile(profiler, options['profile'])
+
+
+def report_profile(profiler: Profiler, collapsed_path: str):
+    """
+    Print the profile to stderr, writing collapsed stacks for flamegraphs to the path if it is not empty,
+    like --profile=great.folded.
+    """
+    print(profiler.table(), file=sys.stderr)
+    if collapsed_path:
+        with open(collapsed_path, 'w') as f:
+            f.write(profiler.collapsed())
+        print(f'Collapsed stacks written to {collapsed_path}.', file=sys.stderr)
+
+
+def launch_great_script(options: Dict[str, str], _: List[str]):
+    run_package_script('great.he', options)
+
 
+def launch_logo_script(options: Dict[str, str], _: List[str]):
+    run_package_script('logo.he', options)
 
-def launch_logo_script():
-    quick_run_string(pkgutil.get_data(__name__, 'logo.he').decode('utf-8'))
+
+def launch_batch(options: Dict[str, str], paths: List[str]):
+    """
+    Run scripts in parallel processes, like `helang batch a.he b.he --workers=4 --output-dir=out`.
+    Without --output-dir, the output of each script is printed after its name.
+    The report goes to stderr, and it exits with 1 if any script fails.
+    """
+    if not paths:
+        print('No scripts to run, expected: helang batch <file>... [--workers=N] [--output-dir=DIR]')
+        sys.exit(1)
+    start = time.perf_counter()
+    results = run_batch(paths, get_engine(options), get_workers(options), options.get('output-dir') or None,
+                        cache='no-cache' not in options)
+    wall = time.perf_counter() - start
+
+    for result in results:
+        if result.output is not None:
+            print(f'==> {result.path} <==')
+            print(result.output, end='')
+        status = 'ok' if result.ok else 'FAIL'
+        print(f'{status:<5}{result.seconds:>9.3f}s  {result.path}{"" if result.ok else ": " + result.error}',
+              file=sys.stderr)
+    failures = sum(not result.ok for result in results)
+    total = sum(result.seconds for result in results)
+    print(f'{len(results)} scripts, {failures} failed, {wall:.3f}s wall, {total:.3f}s in scripts', file=sys.stderr)
+    if failures:
+        sys.exit(1)
 
 
 LAUNCHERS = {
@@ -82,21 +207,73 @@ LAUNCHERS = {
     'shell': launch_shell,
     'editor': launch_editor,
     'logo': launch_logo_script,
+    'batch': launch_batch,
 }
 
+# Options which the targets cannot honour, rejected rather than ignored.
+# Scripts of a batch run in other processes without hooks, which never send events or counts back.
+UNSUPPORTED_OPTIONS = {
+    'batch': ('trace', 'profile', 'dump-nodes'),
+}
+
+
+def parse_options(argv: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Split arguments from options like --engine=vm.
+    :return: the arguments and the options, whose values are empty strings if not given.
+    """
+    args = []
+    options = dict()
+    for arg in argv:
+        if arg.startswith('--'):
+            key, _, value = arg[2:].partition('=')
+            options[key] = value
+        else:
+            args.append(arg)
+    return args, options
+
+
+def get_engine(options: Dict[str, str]) -> Engine:
+    name = options.get('engine', Engine.AST.name).upper()
+    if name not in Engine.__members__.keys():
+        legal_engines = ', '.join(engine.name.lower() for engine in Engine)
+        print(f'Invalid engine {name.lower()}, expected engine: {legal_engines}.')
+        print(ENGINE_HELP)
+        sys.exit(1)
+    return Engine[name]
+
+
+def get_workers(options: Dict[str, str]) -> Optional[int]:
+    value = options.get('workers')
+    if not value:
+        return None
+    if not value.isdecimal() or int(value) < 1:
+        print(f'Invalid workers {value}, expected a positive integer.')
+        sys.exit(1)
+    return int(value)
+
 
 def main():
     """
     Main function
     """
-    target = sys.argv[-1]
+    args, options = parse_options(sys.argv[1:])
+    target = args[0] if args else sys.argv[0]
     while target not in LAUNCHERS.keys():
         legal_targets = ', '.join(LAUNCHERS.keys())
         print(f'Invalid launch target {target}, expected target: {legal_targets}.')
         target = input('Enter the name of the target to start: ')
     if platform.system() != "Darwin":
         print("WARNING: It seems like you're using a non-Apple device, which is not cool!")
-    LAUNCHERS[target]()
+    for option in UNSUPPORTED_OPTIONS.get(target, ()):
+        if option in options:
+            print(f'Option --{option} is not supported by {target}.')
+            sys.exit(1)
+    if 'trace' in options:
+        # Like --trace=great.json, appended to while running and closed at exit.
+        trace = hooks.register(ChromeTraceHook(options['trace'] or 'helang-trace.json'))
+        atexit.register(trace.close)
+    LAUNCHERS[target](options, args[1:])
 
 
 if __name__ == '__main__':
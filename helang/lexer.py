@@ -1,11 +1,11 @@
 import re
 
 from enum import Enum
-from typing import List, Callable
+from typing import List, Callable, Iterator, Union, TextIO, Optional, MutableSequence
 from .exceptions import BadTokenException
 from .tokens import (
-    Token, TokenKind, SINGLE_CHAR_TOKEN_KINDS, KEYWORD_KINDS,
-    COMPARATOR_KINDS, COMPARATOR_CHARS
+    Token, TokenKind, TokenBuffer, SINGLE_CHAR_TOKEN_KINDS, KEYWORD_KINDS,
+    COMPARATOR_KINDS, COMPARATOR_CHARS, FIXED_TOKENS
 )
 
 
@@ -38,24 +38,192 @@ class LexerState(Enum):
     COMPARATOR = 6
 
 
+class LexerBackend(Enum):
+    # The original character-by-character state machine.
+    STATE_MACHINE = 1
+    # Single pass driven by one compiled master regex.
+    REGEX = 2
+
+
+# Whitespaces and comments between tokens.
+# The lookaheads keep every run maximal, so a failed match never backtracks into the gap.
+_SKIP_PATTERN = r'(?:\s+(?!\s)|//[^\n]*(?![^\n]))*'
+
+# Skips the gap before a token, then tries one alternative per token family.
+# The character classes mirror the checks of the state machine exactly,
+# so both backends split the source at the same places.
+_TOKEN_REGEX = re.compile(_SKIP_PATTERN + '(?:' + '|'.join([
+    r'(?P<NUMBER>\d+)',
+    f'(?P<SINGLE>[{re.escape("".join(SINGLE_CHAR_TOKEN_KINDS.keys()))}])',
+    r'(?P<IDENT>[a-zA-Z_$][A-Za-z0-9_$]*)',
+    r'(?P<INCREMENT>\+\+?)',
+    f'(?P<COMPARATOR>[{re.escape("".join(sorted(COMPARATOR_CHARS)))}]+)',
+    # Nothing but the gap is left.
+    r'\Z',
+]) + ')')
+
+_SKIP_REGEX = re.compile(_SKIP_PATTERN)
+
+
+def _kind_of(group: str, text: str) -> TokenKind:
+    # Kind of the text matched by the group of the master regex.
+    if group == 'NUMBER':
+        return TokenKind.NUMBER
+    if group == 'SINGLE':
+        return SINGLE_CHAR_TOKEN_KINDS[text]
+    if group == 'IDENT':
+        return KEYWORD_KINDS.get(text, TokenKind.IDENT)
+    if group == 'INCREMENT':
+        return TokenKind.INCREMENT if text == '++' else TokenKind.ADD
+    if len(text) in (1, 2):
+        return COMPARATOR_KINDS[text]
+    raise BadTokenException(text)
+
+
 class Lexer:
     _state_methods = StateSpecificMethods()
 
-    def __init__(self, content: str):
-        # Add a newline to let the methods do some clean-up,
-        # as it will change to the WAIT state when encounters whitespaces.
-        self._content = content + '\n'
+    def __init__(self, content: Union[str, TextIO],
+                 backend: LexerBackend = LexerBackend.STATE_MACHINE,
+                 chunk_size: int = 64 * 1024, offsets: Optional[MutableSequence[int]] = None):
+        """
+        :param content: the source code, or a text stream to read it from.
+        :param backend: the backend lex() uses for string content. Streams are always scanned by regex.
+        :param chunk_size: how many characters to read from the stream at once.
+        :param offsets: optional sequence to record the offset of each token in, like offsets_array(),
+                        cleared whenever lexing starts. Offsets are not kept by default,
+                        so streaming takes the same memory however long the source is.
+        """
+        if isinstance(content, str):
+            # Add a newline to let the methods do some clean-up,
+            # as it will change to the WAIT state when encounters whitespaces.
+            self._content = content + '\n'
+            self._stream = None
+        else:
+            self._content = ''
+            self._stream = content
+        self._backend = backend
+        self._chunk_size = chunk_size
         self._state = LexerState.WAIT
         self._pos = 0
         self._cache = ''
+        # The same content always makes the same token, so tokens are shared by their content.
+        self._interned = dict(FIXED_TOKENS)
+        # Offset of each token lexed in the source, as tokens are shared.
+        self.offsets = offsets
 
     def lex(self) -> List[Token]:
+        if self._backend == LexerBackend.REGEX or self._stream is not None:
+            return list(self.iter_tokens())
+
         self._pos = 0
+        self._interned = dict(FIXED_TOKENS)
+        if self.offsets is not None:
+            del self.offsets[:]
         tokens = []
         while self._pos < len(self._content):
             Lexer._state_methods.apply(self._state, self, tokens)
         return tokens
 
+    def iter_tokens(self) -> Iterator[Token]:
+        """
+        Yields tokens lazily. The stream is read chunk by chunk,
+        so only the unfinished tail of the source stays in memory.
+        """
+        if self.offsets is not None:
+            del self.offsets[:]
+        if self._stream is None:
+            return self._scan(iter((self._content, )), self.offsets)
+        return self._scan(iter(lambda: self._stream.read(self._chunk_size), ''), self.offsets)
+
+    def lex_buffer(self) -> TokenBuffer:
+        """
+        Lexes into a compact TokenBuffer by the master regex, without a Token for each.
+        A stream is read to the end first, as tokens refer to offsets in the source.
+        It raises the same exceptions as lex() does.
+        """
+        source = self._content if self._stream is None else self._stream.read()
+        buffer = TokenBuffer(source)
+        match = _TOKEN_REGEX.match
+        pos = 0
+        while True:
+            m = match(source, pos)
+            if m is None:
+                raise BadTokenException(source[_SKIP_REGEX.match(source, pos).end()])
+
+            group = m.lastgroup
+            if group is None:
+                return buffer
+
+            pos = m.end()
+            buffer.append(_kind_of(group, m.group(group)), m.start(group))
+
+    @staticmethod
+    def _scan(chunks: Iterator[str], offsets: Optional[MutableSequence[int]]) -> Iterator[Token]:
+        """
+        Scans the chunks with the master regex, yielding tokens one by one.
+        It raises the same exceptions as the state machine does.
+        :param offsets: where to append the offset of each token, or None not to keep them.
+        """
+        match = _TOKEN_REGEX.match
+        append_offset = None if offsets is None else offsets.append
+        interned = dict(FIXED_TOKENS)
+        buffer = ''
+        pos = 0
+        # Offset of the buffer in the source.
+        base = 0
+        eof = False
+        while True:
+            m = match(buffer, pos)
+
+            if not eof:
+                # A match reaching the end of the buffer may continue in the next chunk,
+                # and so may a failure on the last character, like a slash before another one.
+                if m is None:
+                    more = _SKIP_REGEX.match(buffer, pos).end() >= len(buffer) - 1
+                else:
+                    more = m.end() == len(buffer)
+                if more:
+                    chunk = next(chunks, '')
+                    eof = chunk == ''
+                    buffer = buffer[pos:] + chunk
+                    base += pos
+                    pos = 0
+                    continue
+
+            if m is None:
+                # Report the first character after the gap, the same as the state machine.
+                # A single slash also ends up here, as it is not a comment.
+                raise BadTokenException(buffer[_SKIP_REGEX.match(buffer, pos).end()])
+
+            group = m.lastgroup
+            if group is None:
+                return
+
+            # The token ends the match, after what is skipped.
+            start, pos = m.span(group)
+            text = buffer[start:pos]
+            token = interned.get(text)
+            if token is None:
+                token = Token(text, _kind_of(group, text))
+                interned[text] = token
+            if append_offset is not None:
+                append_offset(base + start)
+            yield token
+
+    def _intern(self, content: str, kind: TokenKind) -> Token:
+        token = self._interned.get(content)
+        if token is None:
+            token = Token(content, kind)
+            self._interned[content] = token
+        return token
+
+    def _emit(self, tokens: List[Token], token: Token, start: Optional[int] = None):
+        # Tokens of the cache end right before the current character.
+        tokens.append(token)
+        if self.offsets is not None:
+            self.offsets.append(self._pos - len(self._cache) if start is None else start)
+
     @property
     def _curr(self):
         # Current character.
@@ -97,8 +265,7 @@ class Lexer:
 
         if self._curr in SINGLE_CHAR_TOKEN_KINDS.keys():
             # Matched single char token, adding it to the list.
-            kind = SINGLE_CHAR_TOKEN_KINDS[self._curr]
-            tokens.append(Token(self._curr, kind))
+            self._emit(tokens, FIXED_TOKENS[self._curr], self._pos)
             self._pos += 1
             return
 
@@ -108,8 +275,7 @@ class Lexer:
     def _lex_ident(self, tokens: List[Token]):
         if self._cache != '' and not re.match(r'[A-Za-z0-9_$]', self._curr):
             # Current character is not identifier, changing state to WAIT.
-            kind = KEYWORD_KINDS.get(self._cache, TokenKind.IDENT)
-            tokens.append(Token(self._cache, kind))
+            self._emit(tokens, self._intern(self._cache, KEYWORD_KINDS.get(self._cache, TokenKind.IDENT)))
             self._state = LexerState.WAIT
             return
 
@@ -121,7 +287,7 @@ class Lexer:
         # Not support for floats yet, as the King He hasn't written any floats.
         if not re.match(r'\d', self._curr):
             # Current character is not number, changing state to WAIT.
-            tokens.append(Token(self._cache, TokenKind.NUMBER))
+            self._emit(tokens, self._intern(self._cache, TokenKind.NUMBER))
             self._state = LexerState.WAIT
             return
 
@@ -131,13 +297,13 @@ class Lexer:
     @_state_methods.bind(LexerState.INCREMENT)
     def _lex_increment(self, tokens: List[Token]):
         if self._cache == '+' and self._curr != '+':
-            tokens.append(Token('+', TokenKind.ADD))
+            self._emit(tokens, FIXED_TOKENS['+'])
             self._state = LexerState.WAIT
             return
 
         if self._cache == '++':
             # Enough + operator, changing state to WAIT.
-            tokens.append(Token('++', TokenKind.INCREMENT))
+            self._emit(tokens, FIXED_TOKENS['++'])
             self._state = LexerState.WAIT
             return
 
@@ -166,8 +332,7 @@ class Lexer:
             return
 
         if len(self._cache) in (1, 2):
-            token = Token(self._cache, COMPARATOR_KINDS[self._cache])
-            tokens.append(token)
+            self._emit(tokens, self._intern(self._cache, COMPARATOR_KINDS[self._cache]))
             self._state = LexerState.WAIT
             return
 
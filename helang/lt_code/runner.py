@@ -4,6 +4,7 @@ import threading
 from typing import TextIO
 from ..lexer import Lexer
 from ..parser import Parser
+from ..output import output_to, StreamSink
 from ..exceptions import HeLangException
 
 
@@ -18,7 +19,9 @@ class Runner(threading.Thread):
         sys.stdout = self.stdout
 
         try:
-            Parser(Lexer(self.code).lex()).parse().evaluate(dict())
+            # Lines are inserted in blocks, instead of one by one.
+            with output_to(StreamSink(self.stdout)):
+                Parser(Lexer(self.code).lex()).parse().evaluate(dict())
         except HeLangException as e:
             print(f'{type(e).__name__}: {e}')
 
@@ -0,0 +1,147 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+from .u8 import U8
+from .compiler import TypedMethods
+from .exceptions import HeLangException
+from .he_ast import (
+    AST, VoidAST, ListAST, PrintAST, SprintAST, U8GetAST, EmptyU8InitAST,
+    OrU8InitAST, OperationAST, PrintTextAST
+)
+
+
+# Nodes of constant values, which do nothing but make the value.
+_CONSTANT_ASTS = (OrU8InitAST, EmptyU8InitAST)
+
+# The most elements of constants folded or rendered.
+# Larger ones, like [10000000], are made when running, so the AST never holds them.
+_FOLD_LIMIT = 256
+
+# Node counts of ASTs optimized in the context, before and after, while they are asked for.
+_node_counts: ContextVar[Optional[List[Tuple[int, int]]]] = ContextVar('helang_node_counts', default=None)
+
+
+class Optimizer:
+    """
+    Rewrites the AST bottom-up, folding constants and dropping statements doing nothing.
+    Nodes are updated in place, unless a rule replaces them.
+    """
+
+    _rules = TypedMethods()
+
+    def optimize(self, ast: AST) -> AST:
+        for name in ast.__slots__:
+            field = getattr(ast, name)
+            if isinstance(field, AST):
+                setattr(ast, name, self.optimize(field))
+            elif isinstance(field, list):
+                setattr(ast, name, [self.optimize(item) if isinstance(item, AST) else item for item in field])
+
+        if type(ast) not in Optimizer._rules:
+            return ast
+        result = Optimizer._rules.apply(type(ast), self, ast)
+        if result is not ast and hasattr(ast, 'offset'):
+            # The replacement stands for the statement in the source.
+            result.offset = ast.offset
+        return result
+
+    @_rules.bind(ListAST)
+    def _optimize_list(self, ast: ListAST) -> AST:
+        ast.asts = [child for child in ast.asts if not isinstance(child, (VoidAST, ) + _CONSTANT_ASTS)]
+        return ast
+
+    @_rules.bind(OperationAST)
+    def _optimize_operation(self, ast: OperationAST) -> AST:
+        if not all(_foldable(operand) for operand in ast.operands):
+            return ast
+        val = _fold(ast)
+        return ast if val is None else _constant(val)
+
+    @_rules.bind(U8GetAST)
+    def _optimize_u8_get(self, ast: U8GetAST) -> AST:
+        if not _foldable(ast.list_expr) or not _foldable(ast.subscript_expr):
+            return ast
+        val = _fold(ast)
+        return ast if val is None else _constant(val)
+
+    @_rules.bind(PrintAST)
+    def _optimize_print(self, ast: PrintAST) -> AST:
+        val = _fold(ast.expr) if _foldable(ast.expr) else None
+        if val is None:
+            return ast
+        return PrintTextAST(str(val), map(int, val.value))
+
+    @_rules.bind(SprintAST)
+    def _optimize_sprint(self, ast: SprintAST) -> AST:
+        val = _fold(ast.expr) if _foldable(ast.expr) else None
+        if val is None:
+            return ast
+        try:
+            text = ''.join(map(chr, val.value))
+        except (ValueError, OverflowError):
+            # Not characters, like 9999999999, left to fail when running.
+            return ast
+        return PrintTextAST(text, map(int, val.value))
+
+
+def _foldable(ast: AST) -> bool:
+    # A constant small enough to evaluate when optimizing, whose results are never longer than it.
+    if isinstance(ast, EmptyU8InitAST):
+        return ast.length <= _FOLD_LIMIT
+    return isinstance(ast, OrU8InitAST) and len(ast.elements) <= _FOLD_LIMIT
+
+
+def _constant(val: U8) -> OrU8InitAST:
+    return OrU8InitAST(map(int, val.value))
+
+
+def _fold(ast: AST) -> Optional[U8]:
+    # Evaluate the node of constants, or None if it fails, which is left to fail when running.
+    try:
+        return ast.evaluate(dict())
+    except (HeLangException, ValueError):
+        return None
+
+
+def optimize(ast: AST) -> AST:
+    """
+    Fold constant operations and subscripts, render prints of constants, up to _FOLD_LIMIT elements,
+    and drop empty statements and statements of bare constants.
+    :param ast: the AST just parsed, which is changed in place.
+    :return: the optimized AST.
+    """
+    counts = _node_counts.get()
+    if counts is None:
+        return Optimizer().optimize(ast)
+    before = count_nodes(ast)
+    ast = Optimizer().optimize(ast)
+    counts.append((before, count_nodes(ast)))
+    return ast
+
+
+@contextmanager
+def counting_nodes() -> Iterator[List[Tuple[int, int]]]:
+    """
+    Count nodes of every AST optimized in the context, before and after optimizing,
+    so they describe the ASTs which run. ASTs loaded from caches are not optimized again.
+    :return: the counts, added to as ASTs are optimized.
+    """
+    counts = []
+    token = _node_counts.set(counts)
+    try:
+        yield counts
+    finally:
+        _node_counts.reset(token)
+
+
+def count_nodes(ast: AST) -> int:
+    """
+    Count nodes of the AST.
+    """
+    count = 0
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children())
+    return count
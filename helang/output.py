@@ -0,0 +1,112 @@
+import sys
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, TextIO, Iterator
+
+
+class OutputSink:
+    """
+    Where print and sprint write their lines.
+    """
+
+    def write_line(self, line: str):
+        raise NotImplementedError()
+
+    def flush(self):
+        ...
+
+
+class StreamSink(OutputSink):
+    """
+    Buffers lines, writing them to the stream in large blocks.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, buffer_size: int = 64 * 1024):
+        """
+        :param stream: the stream to write to, or sys.stdout at the time of writing if None.
+        :param buffer_size: how many characters to buffer before writing, 0 writes every line at once.
+        """
+        self._stream = stream
+        self._buffer_size = buffer_size
+        self._lines: List[str] = []
+        self._size = 0
+
+    def write_line(self, line: str):
+        self._lines.append(line)
+        self._size += len(line) + 1
+        if self._size >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self._lines:
+            return
+        stream = self._stream if self._stream is not None else sys.stdout
+        self._lines.append('')
+        text = '\n'.join(self._lines)
+        self._lines.clear()
+        self._size = 0
+        stream.write(text)
+        stream.flush()
+
+
+class CaptureSink(OutputSink):
+    """
+    Keeps the lines in memory, for embedding without touching sys.stdout.
+    """
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def write_line(self, line: str):
+        self.lines.append(line)
+
+    def getvalue(self) -> str:
+        return ''.join(line + '\n' for line in self.lines)
+
+
+# The sink of the running code. Each thread starts without one.
+_sink: ContextVar[Optional[OutputSink]] = ContextVar('helang_output', default=None)
+
+
+def current_sink() -> Optional[OutputSink]:
+    return _sink.get()
+
+
+def emit(line: str):
+    """
+    Write the line to the current sink, or print it at once if there is none.
+    """
+    sink = _sink.get()
+    if sink is None:
+        print(line)
+    else:
+        sink.write_line(line)
+
+
+def flush_output():
+    """
+    Flush the current sink, before anything printing to sys.stdout by itself.
+    """
+    sink = _sink.get()
+    if sink is not None:
+        sink.flush()
+
+
+@contextmanager
+def output_to(sink: Optional[OutputSink] = None) -> Iterator[OutputSink]:
+    """
+    Send the output of code running in the context to the sink, flushing it at last.
+    :param sink: the sink, or None to keep the current one,
+                 otherwise to buffer the output to sys.stdout.
+    """
+    if sink is None:
+        sink = _sink.get()
+        if sink is None:
+            sink = StreamSink()
+    token = _sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _sink.reset(token)
+        sink.flush()
@@ -1,6 +1,6 @@
 from enum import Enum
-from typing import List, Optional, Callable, Union
-from .tokens import Token, TokenKind
+from typing import List, Optional, Callable, Union, Tuple, Sequence
+from .tokens import Token, TokenKind, TokenBuffer
 from .exceptions import BadStatementException
 from .he_ast import (
     AST, VoidAST, ListAST, VarDefAST, VarAssignAST, VarExprAST,
@@ -13,9 +13,11 @@ from .he_ast import (
 class RuledMethods:
     """
     Bind a list of methods with specified rules, which are Enums.
+    Methods can also be predicted by the kinds of upcoming tokens.
     """
     def __init__(self):
         self._rules = dict()
+        self._predictions = dict()
 
     def bind(self, rule: Enum):
         def bind_method(method: Callable):
@@ -29,6 +31,40 @@ class RuledMethods:
     def get(self, rule: Enum):
         return self._rules[rule]
 
+    def predict(self, rule: Enum, *lookaheads: Union[TokenKind, Tuple[TokenKind, ...]]):
+        """
+        Predict the method when upcoming tokens match any of the lookaheads.
+        A lookahead is a token kind or a sequence of them, and the longest matched one wins.
+        """
+        def bind_method(method: Callable):
+            if rule not in self._predictions.keys():
+                self._predictions[rule] = dict()
+            table = self._predictions[rule]
+            for lookahead in lookaheads:
+                if not isinstance(lookahead, tuple):
+                    lookahead = (lookahead, )
+                first, rest = lookahead[0], lookahead[1:]
+                if first not in table.keys():
+                    table[first] = []
+                table[first].append((rest, method))
+                table[first].sort(key=lambda candidate: len(candidate[0]), reverse=True)
+            return method
+        return bind_method
+
+    def choose(self, rule: Enum, kinds: List[TokenKind], pos: int) -> Optional[Callable]:
+        """
+        Choose the predicted method for kinds of tokens started from pos.
+        :return: the method, or None if nothing is predicted.
+        """
+        if pos >= len(kinds):
+            return None
+        for rest, method in self._predictions[rule].get(kinds[pos], ()):
+            if len(kinds) - pos - 1 < len(rest):
+                continue
+            if all(kinds[pos + i + 1] == kind for i, kind in enumerate(rest)):
+                return method
+        return None
+
 
 class Rule(Enum):
     ROOT = 1
@@ -37,31 +73,75 @@ class Rule(Enum):
     EXPR_LEFT_RECURSIVE = 3
 
 
+OPERATOR_KINDS = [
+    TokenKind.ADD, TokenKind.SUB,
+    TokenKind.MUL, TokenKind.LT,
+    TokenKind.LEQ, TokenKind.GT,
+    TokenKind.GEQ, TokenKind.NEQ,
+    TokenKind.EQ
+]
+
+
+class ParseStrategy(Enum):
+    # Try the rules one by one, going back when one fails.
+    BACKTRACKING = 1
+    # Choose the rule by upcoming tokens, never going back.
+    PREDICTIVE = 2
+
+
 class Parser:
     _ruled_methods = RuledMethods()
 
-    def __init__(self, tokens: List[Token]):
+    def __init__(self, tokens: Union[List[Token], TokenBuffer], strategy: ParseStrategy = ParseStrategy.PREDICTIVE,
+                 offsets: Optional[Sequence[int]] = None):
+        """
+        :param tokens: a list of tokens, or a TokenBuffer which is parsed without a Token for each.
+        :param strategy: how to choose rules.
+        :param offsets: optional offsets of the tokens in the source, like Lexer.offsets,
+                        to set offsets of statements. Those of a TokenBuffer are used by default.
+        """
         self._tokens = tokens
+        if offsets is None and isinstance(tokens, TokenBuffer):
+            offsets = tokens.starts
+        self._offsets = offsets
+        # Kinds are shared enum members, and contents are asked only for identifiers and numbers.
+        if isinstance(tokens, TokenBuffer):
+            self._kinds = tokens.kinds()
+            self._content = tokens.content
+        else:
+            self._kinds = [token.kind for token in tokens]
+            self._content = lambda pos: tokens[pos].content
+        self._strategy = strategy
         self._pos = 0
+        # How many times the parser went back, always 0 for the predictive strategy.
+        self.backtracks = 0
 
     def _expect(self, expected_kind: Union[TokenKind, List[TokenKind]],
-                validator: Optional[Callable[[Token], bool]] = None) -> Token:
-        if self._pos >= len(self._tokens):
+                validator: Optional[Callable[[Token], bool]] = None) -> int:
+        """
+        :return: position of the expected token.
+        """
+        if self._pos >= len(self._kinds):
             raise BadStatementException('no more tokens')
 
-        token = self._tokens[self._pos]
+        kind = self._kinds[self._pos]
 
         if not isinstance(expected_kind, list):
             expected_kind = [expected_kind]
 
-        if token.kind not in expected_kind:
-            raise BadStatementException(f'expected {expected_kind} at pos {self._pos}, got {token.kind}')
+        if kind not in expected_kind:
+            raise BadStatementException(f'expected {expected_kind} at pos {self._pos}, got {kind}')
 
-        if validator is not None and not validator(token):
+        if validator is not None and not validator(self._tokens[self._pos]):
             raise BadStatementException(f'failed to pass custom validator at offset {self._pos}')
 
         self._pos += 1
-        return token
+        return self._pos - 1
+
+    def _peek(self) -> Optional[TokenKind]:
+        if self._pos >= len(self._kinds):
+            return None
+        return self._kinds[self._pos]
 
     def parse(self) -> AST:
         """
@@ -81,20 +161,37 @@ class Parser:
         :return: parsed abstract syntax tree.
         """
         asts = []
-        while self._pos < len(self._tokens):
-            for parser in Parser._ruled_methods.get(Rule.ROOT):
-                saved_pos = self._pos
-                try:
-                    asts.append(parser(self))
-                    break
-                except BadStatementException:
-                    self._pos = saved_pos
+        while self._pos < len(self._kinds):
+            start = self._pos
+            if self._strategy == ParseStrategy.PREDICTIVE:
+                ast = self._predict_root()
             else:
-                raise BadStatementException(f'failed to parse tokens started from {self._pos}, '
-                                            f'which is {self._tokens[self._pos]}')
+                ast = self._backtrack_root()
+            if self._offsets is not None:
+                ast.offset = self._offsets[start]
+            asts.append(ast)
         # Return the AST itself if there is only one.
         return ListAST(asts) if len(asts) != 1 else asts[0]
 
+    def _backtrack_root(self) -> AST:
+        for parser in Parser._ruled_methods.get(Rule.ROOT):
+            saved_pos = self._pos
+            try:
+                return parser(self)
+            except BadStatementException:
+                self._pos = saved_pos
+                self.backtracks += 1
+        raise BadStatementException(f'failed to parse tokens started from {self._pos}, '
+                                    f'which is {self._tokens[self._pos]}')
+
+    def _predict_root(self) -> AST:
+        parser = Parser._ruled_methods.choose(Rule.ROOT, self._kinds, self._pos)
+        if parser is None:
+            raise BadStatementException(f'failed to parse tokens started from {self._pos}, '
+                                        f'which is {self._tokens[self._pos]}')
+        return parser(self)
+
+    @_ruled_methods.predict(Rule.ROOT, TokenKind.PRINT)
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_print(self) -> PrintAST:
         """
@@ -106,6 +203,7 @@ class Parser:
         self._expect(TokenKind.SEMICOLON)
         return PrintAST(expr)
 
+    @_ruled_methods.predict(Rule.ROOT, TokenKind.SPRINT)
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_sprint(self) -> SprintAST:
         """
@@ -117,6 +215,7 @@ class Parser:
         self._expect(TokenKind.SEMICOLON)
         return SprintAST(expr)
 
+    @_ruled_methods.predict(Rule.ROOT, TokenKind.U8)
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_var_def(self) -> VarDefAST:
         """
@@ -128,8 +227,9 @@ class Parser:
         self._expect(TokenKind.ASSIGN)
         val = self._root_parse_expr()
         self._expect(TokenKind.SEMICOLON)
-        return VarDefAST(var_ident.content, val)
+        return VarDefAST(self._content(var_ident), val)
 
+    @_ruled_methods.predict(Rule.ROOT, (TokenKind.U8, TokenKind.IDENT, TokenKind.SEMICOLON))
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_var_declare(self) -> VarDefAST:
         """
@@ -139,8 +239,9 @@ class Parser:
         self._expect(TokenKind.U8)
         var_ident = self._expect(TokenKind.IDENT)
         self._expect(TokenKind.SEMICOLON)
-        return VarDefAST(var_ident.content, VoidAST())
+        return VarDefAST(self._content(var_ident), VoidAST())
 
+    @_ruled_methods.predict(Rule.ROOT, (TokenKind.IDENT, TokenKind.ASSIGN))
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_var_assign(self) -> VarAssignAST:
         """
@@ -151,8 +252,9 @@ class Parser:
         self._expect(TokenKind.ASSIGN)
         expr = self._root_parse_expr()
         self._expect(TokenKind.SEMICOLON)
-        return VarAssignAST(ident.content, expr)
+        return VarAssignAST(self._content(ident), expr)
 
+    @_ruled_methods.predict(Rule.ROOT, (TokenKind.IDENT, TokenKind.INCREMENT))
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_var_increment(self) -> VarIncrementAST:
         """
@@ -162,7 +264,7 @@ class Parser:
         ident = self._expect(TokenKind.IDENT)
         self._expect(TokenKind.INCREMENT)
         self._expect(TokenKind.SEMICOLON)
-        return VarIncrementAST(ident.content)
+        return VarIncrementAST(self._content(ident))
 
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_expr_statement(self) -> AST:
@@ -174,6 +276,18 @@ class Parser:
         self._expect(TokenKind.SEMICOLON)
         return expr
 
+    @_ruled_methods.predict(Rule.ROOT, TokenKind.LS, TokenKind.NUMBER, TokenKind.IDENT)
+    def _root_parse_expr_optional_semicolon(self) -> AST:
+        """
+        expr_statement | expr, merged as the semicolon is only checked after the expression.
+        :return: the expression.
+        """
+        expr = self._root_parse_expr()
+        if self._peek() == TokenKind.SEMICOLON:
+            self._pos += 1
+        return expr
+
+    @_ruled_methods.predict(Rule.ROOT, (TokenKind.TEST_5G, TokenKind.T5G_MUSIC))
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_test_5g_music(self) -> Test5GMusicAST:
         """
@@ -185,6 +299,7 @@ class Parser:
         self._expect(TokenKind.SEMICOLON)
         return Test5GMusicAST()
 
+    @_ruled_methods.predict(Rule.ROOT, (TokenKind.TEST_5G, TokenKind.T5G_APP))
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_test_5g_app(self) -> Test5GAppAST:
         """
@@ -196,6 +311,7 @@ class Parser:
         self._expect(TokenKind.SEMICOLON)
         return Test5GAppAST()
 
+    @_ruled_methods.predict(Rule.ROOT, TokenKind.CYBERSPACES)
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_cyberspaces(self) -> CyberspacesAST:
         """
@@ -206,6 +322,7 @@ class Parser:
         self._expect(TokenKind.SEMICOLON)
         return CyberspacesAST()
 
+    @_ruled_methods.predict(Rule.ROOT, TokenKind.SEMICOLON)
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_semicolon(self) -> VoidAST:
         """
@@ -218,13 +335,37 @@ class Parser:
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_expr(self) -> AST:
         """
-        expr
+        expr: operand ((ADD | SUB | MUL | CMP) operand)*;
+        Operators are collected in a loop, so long chains never recurse.
+        :return: AST for current expression.
+        """
+        first = self._parse_operand()
+        if self._peek() not in OPERATOR_KINDS:
+            return first
+
+        operands = [first]
+        operators = []
+        while self._peek() in OPERATOR_KINDS:
+            operators.append(Operator.from_kind(self._kinds[self._pos]))
+            self._pos += 1
+            operands.append(self._parse_operand())
+        return OperationAST(operands, operators)
+
+    def _parse_operand(self) -> AST:
+        """
+        operand
           : empty_u8 expr'
           | or_u8 expr'
           | var expr'
           ;
-        :return: AST for current expression.
+        :return: AST for current operand.
         """
+        if self._strategy == ParseStrategy.PREDICTIVE:
+            parser = Parser._ruled_methods.choose(Rule.EXPR, self._kinds, self._pos)
+            if parser is None:
+                raise BadStatementException('cannot parse expressions')
+            return self._left_recur_expr_parse(parser(self))
+
         for parser in Parser._ruled_methods.get(Rule.EXPR):
             saved_pos = self._pos
             try:
@@ -232,8 +373,10 @@ class Parser:
                 return self._left_recur_expr_parse(prev)
             except BadStatementException:
                 self._pos = saved_pos
+                self.backtracks += 1
         raise BadStatementException('cannot parse expressions')
 
+    @_ruled_methods.predict(Rule.ROOT, TokenKind.LOGO)
     @_ruled_methods.bind(Rule.ROOT)
     def _root_parse_logo_big(self) -> LogoAST:
         """
@@ -243,8 +386,9 @@ class Parser:
         self._expect(TokenKind.LOGO)
         size = self._expect([TokenKind.LOGO_TINY, TokenKind.LOGO_MEDIUM, TokenKind.LOGO_LARGE])
         self._expect(TokenKind.SEMICOLON)
-        return LogoAST(LogoSize.from_token(size))
+        return LogoAST(LogoSize.from_kind(self._kinds[size]))
 
+    @_ruled_methods.predict(Rule.EXPR, TokenKind.LS)
     @_ruled_methods.bind(Rule.EXPR)
     def _expr_parse_empty_u8(self) -> EmptyU8InitAST:
         """
@@ -254,26 +398,23 @@ class Parser:
         self._expect(TokenKind.LS)
         length = self._expect(TokenKind.NUMBER)
         self._expect(TokenKind.RS)
-        return EmptyU8InitAST(int(length.content))
+        return EmptyU8InitAST(int(self._content(length)))
 
+    @_ruled_methods.predict(Rule.EXPR, TokenKind.NUMBER)
     @_ruled_methods.bind(Rule.EXPR)
     def _expr_parse_or_u8(self) -> OrU8InitAST:
         """
-        or_u8
-            : NUMBER
-            | NUMBER OR or_u8_expr
-            ;
+        or_u8: NUMBER (OR NUMBER)*;
+        Numbers are collected in a loop, so long literals never recurse.
         :return: or initializer for u8.
         """
-        first = self._expect(TokenKind.NUMBER)
-
-        try:
-            self._expect(TokenKind.OR)
-        except BadStatementException:
-            return OrU8InitAST(int(first.content))
-
-        return OrU8InitAST(int(first.content), self._expr_parse_or_u8())
+        elements = [int(self._content(self._expect(TokenKind.NUMBER)))]
+        while self._peek() == TokenKind.OR:
+            self._pos += 1
+            elements.append(int(self._content(self._expect(TokenKind.NUMBER))))
+        return OrU8InitAST(elements)
 
+    @_ruled_methods.predict(Rule.EXPR, TokenKind.IDENT)
     @_ruled_methods.bind(Rule.EXPR)
     def _expr_parse_var(self) -> VarExprAST:
         """
@@ -281,28 +422,52 @@ class Parser:
         :return: variable expression.
         """
         ident = self._expect(TokenKind.IDENT)
-        return VarExprAST(ident.content)
+        return VarExprAST(self._content(ident))
 
     def _left_recur_expr_parse(self, prev: AST) -> AST:
         """
         expr'
             : LS expr RS ASSIGN expr expr'
             | LS expr RS expr'
-            | (ADD | SUB | MUL | CMP) expr expr'
             | empty
             ;
-        :param prev:
-        :return:
+        :param prev: the expression before.
+        :return: the expression wrapped by all matched rules.
+        """
+        while True:
+            if self._strategy == ParseStrategy.PREDICTIVE:
+                parser = Parser._ruled_methods.choose(Rule.EXPR_LEFT_RECURSIVE, self._kinds, self._pos)
+                if parser is None:
+                    return prev
+                prev = parser(self, prev)
+                continue
+
+            for parser in Parser._ruled_methods.get(Rule.EXPR_LEFT_RECURSIVE):
+                saved_pos = self._pos
+                try:
+                    prev = parser(self, prev)
+                    break
+                except BadStatementException:
+                    self._pos = saved_pos
+                    self.backtracks += 1
+            else:
+                # Tried all left-recursive grammars, none has matched.
+                return prev
+
+    @_ruled_methods.predict(Rule.EXPR_LEFT_RECURSIVE, TokenKind.LS)
+    def _left_recur_expr_parse_subscript(self, list_expr: AST) -> Union[U8SetAST, U8GetAST]:
         """
-        for parser in Parser._ruled_methods.get(Rule.EXPR_LEFT_RECURSIVE):
-            saved_pos = self._pos
-            try:
-                prev_expr = parser(self, prev)
-                return self._left_recur_expr_parse(prev_expr)
-            except BadStatementException:
-                self._pos = saved_pos
-        # Tried all left-recursive grammars, none has matched.
-        return prev
+        u8_set | u8_get, merged as they are told apart by the token after RS.
+        :return: AST for setting or getting elements.
+        """
+        self._expect(TokenKind.LS)
+        subscript_expr = self._root_parse_expr()
+        self._expect(TokenKind.RS)
+        if self._peek() != TokenKind.ASSIGN:
+            return U8GetAST(list_expr, subscript_expr)
+        self._pos += 1
+        value_expr = self._root_parse_expr()
+        return U8SetAST(list_expr, subscript_expr, value_expr)
 
     @_ruled_methods.bind(Rule.EXPR_LEFT_RECURSIVE)
     def _left_recur_expr_parse_u8_set(self, list_expr: AST) -> U8SetAST:
@@ -319,15 +484,3 @@ class Parser:
         subscript_expr = self._root_parse_expr()
         self._expect(TokenKind.RS)
         return U8GetAST(list_expr, subscript_expr)
-
-    @_ruled_methods.bind(Rule.EXPR_LEFT_RECURSIVE)
-    def _left_recur_expr_parse_operation(self, first: AST) -> OperationAST:
-        operator = self._expect([
-            TokenKind.ADD, TokenKind.SUB,
-            TokenKind.MUL, TokenKind.LT,
-            TokenKind.LEQ, TokenKind.GT,
-            TokenKind.GEQ, TokenKind.NEQ,
-            TokenKind.EQ
-        ])
-        second = self._root_parse_expr()
-        return OperationAST(first, second, Operator.from_token(operator))
@@ -0,0 +1,141 @@
+import time
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .u8 import U8
+from .he_ast import AST
+from .hooks import Hook, HookRegistry, SourceMap, describe, shorten
+
+
+class Stats:
+    """
+    What a statement, or a source line, costs in all runs so far.
+    """
+
+    __slots__ = ('path', 'line', 'column', 'text', 'calls', 'seconds', 'elements')
+
+    def __init__(self, path: str, line: int, column: Optional[int], text: str):
+        self.path = path
+        # Starting from 1, or 0 if the offset is unknown.
+        self.line = line
+        # Starting from 1, or None for a line.
+        self.column = column
+        self.text = text
+        self.calls = 0
+        self.seconds = 0.0
+        # U8 elements allocated.
+        self.elements = 0
+
+    @property
+    def location(self) -> str:
+        if self.column is None:
+            return f'{self.path}:{self.line}'
+        return f'{self.path}:{self.line}:{self.column}'
+
+
+class Profiler(Hook):
+    """
+    Records time, calls and u8 elements allocated by each statement.
+    Results add up over runs, so a profiler may watch several programs.
+    """
+
+    def __init__(self):
+        # By the path, the hash of the source and the offset of the statement,
+        # so different programs of the same path never share rows.
+        self._stats: Dict[Tuple[str, int, int], Stats] = OrderedDict()
+        self._path = '<string>'
+        self._source_hash = hash('')
+        self._source_map = SourceMap('')
+        self._current: Optional[Stats] = None
+        self._start = 0.0
+
+    def run(self, ast: AST, env: Dict[str, U8], source: str = '', path: str = '<string>') -> U8:
+        """
+        Run the AST in the environment, walking it statement by statement with only this hook.
+        :param ast: the AST, resolved to slots of the environment if it is an Environment.
+        :param env: the environment.
+        :param source: the source of the AST, to locate statements by their offsets.
+        :param path: the name of the source in reports.
+        :return: the empty u8, as a list of statements does.
+        """
+        return HookRegistry((self, )).run(ast, env, source, path)
+
+    def on_run_start(self, source: str, path: str):
+        self._path = path
+        self._source_hash = hash(source)
+        self._source_map = SourceMap(source)
+
+    def on_statement_start(self, index: int, statement: AST):
+        offset = getattr(statement, 'offset', None)
+        # Statements without offsets are told apart by their indexes.
+        key = (self._path, self._source_hash, ~index if offset is None else offset)
+        stats = self._stats.get(key)
+        if stats is None:
+            line, column = (0, None) if offset is None else self._source_map.locate(offset)
+            stats = self._stats[key] = Stats(
+                self._path, line, column, describe(statement, self._source_map)
+            )
+        self._current = stats
+        self._start = time.perf_counter()
+
+    def on_statement_end(self, index: int, statement: AST, error: Optional[BaseException]):
+        stats = self._current
+        stats.seconds += time.perf_counter() - self._start
+        stats.calls += 1
+        self._current = None
+
+    def on_alloc(self, length: int):
+        if self._current is not None:
+            self._current.elements += length
+
+    def statements(self) -> List[Stats]:
+        """
+        :return: stats of statements, by cumulative time.
+        """
+        return sorted(self._stats.values(), key=lambda stats: stats.seconds, reverse=True)
+
+    def lines(self) -> List[Stats]:
+        """
+        :return: stats of source lines, adding up statements on each, by cumulative time.
+        """
+        lines: Dict[Tuple[str, int, int], Stats] = OrderedDict()
+        for (path, source_hash, _), stats in self._stats.items():
+            key = (path, source_hash, stats.line)
+            line = lines.get(key)
+            if line is None:
+                line = lines[key] = Stats(stats.path, stats.line, None, stats.text)
+            elif stats.text not in line.text:
+                line.text = shorten(f'{line.text} {stats.text}')
+            line.calls += stats.calls
+            line.seconds += stats.seconds
+            line.elements += stats.elements
+        return sorted(lines.values(), key=lambda stats: stats.seconds, reverse=True)
+
+    def table(self, limit: Optional[int] = None) -> str:
+        """
+        Format statements and lines as tables, the most expensive first.
+        :param limit: how many rows to show in each table, all by default.
+        """
+        rows = []
+        for title, entries in (('statement', self.statements()), ('line', self.lines())):
+            rows.append(f'{"seconds":>10} {"calls":>7} {"elements":>10}  {title}')
+            for stats in entries[:limit]:
+                rows.append(f'{stats.seconds:>10.6f} {stats.calls:>7} {stats.elements:>10}  '
+                            f'{stats.location}  {stats.text}')
+            rows.append('')
+        return '\n'.join(rows)
+
+    def collapsed(self) -> str:
+        """
+        Format statements as collapsed stacks, `path;line N;statement microseconds` per line,
+        which flamegraph.pl, speedscope and others take.
+        """
+        rows = []
+        for stats in self._stats.values():
+            # Semicolons separate frames.
+            text = stats.text.rstrip(';').replace(';', ',')
+            rows.append(f'{stats.path};line {stats.line};{text} {round(stats.seconds * 1e6)}')
+        return '\n'.join(rows) + '\n' if rows else ''
+
+    def clear(self):
+        self._stats.clear()
@@ -1,29 +1,152 @@
-from typing import Dict, Optional
+from enum import Enum
+from functools import partial
+from typing import Callable, Dict, Optional, List
 from .lexer import Lexer
+from .tokens import Token
 from .parser import Parser
+from .he_ast import AST
+from .optimizer import optimize
+from .compiler import compile_ast, VM
+from .environment import Environment
+from .resolver import resolve
+from .dataflow import DataflowExecutor
+from .cache import parse_cached, cache_path, ParseCache, ParsedProgram
+from .output import OutputSink, output_to
+from .hooks import hooks
+from .profiler import Profiler
 from .u8 import U8
 
 
-def quick_run_file(path: str, env: Optional[Dict[str, U8]] = None):
+class Engine(Enum):
+    # Walk the AST, evaluating node by node.
+    AST = 1
+    # Compile the AST to bytecode and run it on the VM.
+    VM = 2
+    # Walk the AST, running independent statements concurrently.
+    # Only with a storage releasing the GIL, like U8Storage.NUMPY on large u8s, do they run in parallel,
+    # otherwise it is no faster than AST.
+    DATAFLOW = 3
+
+
+# Programs parsed by quick_run_string, by their code.
+parse_cache = ParseCache()
+
+# Runs programs for Engine.DATAFLOW, with threads started on demand.
+dataflow_executor = DataflowExecutor()
+
+
+# Runs the resolved AST in the environment instead of the engine.
+Runner = Callable[[AST, Environment], U8]
+
+
+def quick_run_file(path: str, env: Optional[Dict[str, U8]] = None, engine: Engine = Engine.AST,
+                   cache: bool = True, output: Optional[OutputSink] = None, profiler: Optional[Profiler] = None):
     """
     Runs HeLang file quickly.
     :param path: the path to file.
-    :param env: optional environment, we will use it if you specify.
+    :param env: optional environment, a dict or an Environment, we will use it if you specify.
+                u8s of a dict are never written in place, the variables are bound to new ones,
+                while those of an Environment, which is the interpreter's own, may be.
+    :param engine: the engine to run the code.
+    :param cache: whether to reuse the parsed AST from the .hec cache next to the file.
+                  The cache is keyed by a hash of the whole source, so the file is read at once,
+                  while without it, and without hooks or a profiler, the file is lexed as it is read.
+                  A cached parse saves more than streaming does for scripts of usual sizes,
+                  so the cache is on by default, and --no-cache streams huge generated scripts.
+    :param output: optional sink of the output, otherwise it is buffered to sys.stdout.
+    :param profiler: optional profiler to record costs of statements,
+                     then the AST is walked statement by statement whatever the engine is.
     """
 
+    if not cache and profiler is None and not hooks:
+        with open(path, 'r') as f:
+            # Streamed without offsets, as nothing watches statements.
+            tokens = Lexer(f).lex()
+        with output_to(output):
+            _run_tokens(tokens, env, engine)
+        return
+
     with open(path, 'r') as f:
-        code = f.read()
-    quick_run_string(code, env)
+        source = f.read()
+    with output_to(output):
+        _run_ast(parse_cached(source, cache_path(path) if cache else None), env, engine,
+                 _watching_runner(profiler, source, path))
 
 
-def quick_run_string(code: str, env: Optional[Dict[str, U8]] = None):
+def quick_run_string(code: str, env: Optional[Dict[str, U8]] = None, engine: Engine = Engine.AST,
+                     output: Optional[OutputSink] = None, profiler: Optional[Profiler] = None):
     """
     Runs HeLang code in string quickly.
     :param code: the HeLang code.
-    :param env: optional environment, we will use it if you specify.
+    :param env: optional environment, a dict or an Environment, we will use it if you specify.
+                u8s of a dict are never written in place, the variables are bound to new ones,
+                while those of an Environment, which is the interpreter's own, may be.
+    :param engine: the engine to run the code.
+    :param output: optional sink of the output, otherwise it is buffered to sys.stdout.
+    :param profiler: optional profiler to record costs of statements,
+                     then the AST is walked statement by statement whatever the engine is.
     """
-    tokens = Lexer(code).lex()
-    ast = Parser(tokens).parse()
+    with output_to(output):
+        _run_parsed(parse_cache.get(code), env, engine, _watching_runner(profiler, code))
+
+
+def _watching_runner(profiler: Optional[Profiler], source: str, path: str = '<string>') -> Optional[Runner]:
+    # Runs watched by hooks walk the AST statement by statement, whatever the engine is.
+    # Without any, they are left to the engine, so nothing is paid for hooks.
+    registry = hooks if profiler is None else hooks.with_hook(profiler)
+    if not registry:
+        return None
+    return partial(registry.run, source=source, path=path)
+
+
+def _run_tokens(tokens: List[Token], env: Optional[Dict[str, U8]] = None, engine: Engine = Engine.AST):
+    _run_ast(optimize(Parser(tokens).parse()), env, engine)
+
+
+def _shared(env: Optional[Dict[str, U8]]) -> Optional[Dict[str, U8]]:
+    # The caller's u8s are shared, so writing them in place, like `a = a + b`, copies them first
+    # and the caller never sees its objects change.
     if env is None:
-        env = dict()
-    ast.evaluate(env)
+        return None
+    return {name: value.share() for name, value in env.items()}
+
+
+def _run_ast(ast: AST, env: Optional[Dict[str, U8]] = None, engine: Engine = Engine.AST,
+             runner: Optional[Runner] = None):
+    # Variables of a dict are moved to slots, and written back when it is finished.
+    scope = env if isinstance(env, Environment) else Environment(_shared(env))
+    try:
+        if runner is not None:
+            runner(resolve(ast, scope), scope)
+        elif engine == Engine.VM:
+            VM.run(compile_ast(ast, scope), scope)
+        elif engine == Engine.DATAFLOW:
+            dataflow_executor.run(resolve(ast, scope), scope)
+        else:
+            resolve(ast, scope).evaluate(scope)
+    finally:
+        if env is not None and env is not scope:
+            env.update(scope)
+
+
+def _run_parsed(parsed: ParsedProgram, env: Optional[Dict[str, U8]] = None, engine: Engine = Engine.AST,
+                runner: Optional[Runner] = None):
+    if isinstance(env, Environment) and parsed.matches(env):
+        scope = env
+    else:
+        # Variables are moved to slots laid out for the AST, and written back when it is finished.
+        scope = parsed.environment()
+        if env is not None:
+            scope.update(_shared(env))
+    try:
+        if runner is not None:
+            runner(parsed.ast, scope)
+        elif engine == Engine.VM:
+            VM.run(parsed.program(), scope)
+        elif engine == Engine.DATAFLOW:
+            dataflow_executor.run(parsed.ast, scope)
+        else:
+            parsed.ast.evaluate(scope)
+    finally:
+        if env is not None and env is not scope:
+            env.update(scope)
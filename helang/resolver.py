@@ -0,0 +1,22 @@
+from .environment import Environment
+from .he_ast import AST, VarDefAST, VarAssignAST, VarIncrementAST, VarExprAST
+
+
+_VAR_ASTS = (VarDefAST, VarAssignAST, VarIncrementAST, VarExprAST)
+
+
+def resolve(ast: AST, env: Environment) -> AST:
+    """
+    Resolve identifiers in the AST to slots of the environment, so it must run with the environment.
+    Slots of new identifiers are added to the environment, undefined yet.
+    :param ast: the AST to resolve.
+    :param env: the environment to run with.
+    :return: the resolved AST.
+    """
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, _VAR_ASTS):
+            node.slot = env.slot(node.ident)
+        stack.extend(node.children())
+    return ast
@@ -0,0 +1,287 @@
+import operator
+
+from array import array
+from itertools import repeat, islice
+from inspect import isgenerator
+from typing import Iterable, MutableSequence, Callable, Any
+from .exceptions import CyberArithmeticException, CyberNotSupportedException
+
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional, u8s are stored in lists without it.
+    numpy = None
+
+
+class ShareCount:
+    """
+    Count of u8s sharing a buffer, which copy it before writing if it is shared.
+    It is taken when a u8 is shared first, and each one leaves it when writing.
+    """
+
+    __slots__ = ('count', )
+
+    def __init__(self):
+        self.count = 1
+
+
+class ListStorage:
+    """
+    Boxed Python integers in a list, the Saint He's original choice.
+    Kernels here are plain loops, and they work for any sequence of integers.
+    """
+
+    # Types U8 accepts as elements, besides generators.
+    accepted_types = (list, tuple, array)
+
+    @classmethod
+    def new(cls, values: Iterable[int]) -> MutableSequence[int]:
+        # Lists are taken as they are, without copying.
+        return values if type(values) is list else list(values)
+
+    @classmethod
+    def copy(cls, values: MutableSequence[int]) -> MutableSequence[int]:
+        return cls.new(values[:])
+
+    @classmethod
+    def filled(cls, value: int, length: int) -> MutableSequence[int]:
+        return cls.new((value, )) * length
+
+    @classmethod
+    def neg(cls, values: MutableSequence[int]) -> MutableSequence[int]:
+        return cls.new(map(operator.neg, values))
+
+    @classmethod
+    def add_scalar(cls, values: MutableSequence[int], n: int) -> MutableSequence[int]:
+        return cls.new(map(operator.add, values, repeat(n)))
+
+    @classmethod
+    def add(cls, a: MutableSequence[int], b: MutableSequence[int]) -> MutableSequence[int]:
+        return cls.new(map(operator.add, a, b))
+
+    @classmethod
+    def sub_scalar(cls, values: MutableSequence[int], n: int) -> MutableSequence[int]:
+        return cls.new(map(operator.sub, values, repeat(n)))
+
+    @classmethod
+    def sub(cls, a: MutableSequence[int], b: MutableSequence[int]) -> MutableSequence[int]:
+        return cls.new(map(operator.sub, a, b))
+
+    @classmethod
+    def update(cls, values: MutableSequence[int], result: MutableSequence[int]) -> MutableSequence[int]:
+        """
+        Replace elements with the result, keeping the buffer.
+        In-place kernels return the buffer they updated, which may be a new one
+        if the values are not in this storage.
+        """
+        values = cls.new(values)
+        values[:] = result
+        return values
+
+    @classmethod
+    def ineg(cls, values: MutableSequence[int]) -> MutableSequence[int]:
+        return cls.update(values, cls.neg(values))
+
+    @classmethod
+    def iadd_scalar(cls, values: MutableSequence[int], n: int) -> MutableSequence[int]:
+        return cls.update(values, cls.add_scalar(values, n))
+
+    @classmethod
+    def iadd(cls, a: MutableSequence[int], b: MutableSequence[int]) -> MutableSequence[int]:
+        return cls.update(a, cls.add(a, b))
+
+    @classmethod
+    def isub_scalar(cls, values: MutableSequence[int], n: int) -> MutableSequence[int]:
+        return cls.update(values, cls.sub_scalar(values, n))
+
+    @classmethod
+    def isub(cls, a: MutableSequence[int], b: MutableSequence[int]) -> MutableSequence[int]:
+        return cls.update(a, cls.sub(a, b))
+
+    @classmethod
+    def fill(cls, values: MutableSequence[int], value: int) -> MutableSequence[int]:
+        return cls.update(values, cls.filled(value, len(values)))
+
+    @classmethod
+    def dot(cls, a: MutableSequence[int], b: MutableSequence[int]) -> int:
+        # Zeroes filled to the shorter one add nothing, so only the common part counts.
+        return sum(map(operator.mul, a, b))
+
+    @classmethod
+    def compare(cls, a: MutableSequence[int], b: MutableSequence[int], op: Callable[[Any, Any], bool]) -> bool:
+        """
+        Compare elements one by one, taking the missing tail of the shorter one as zeroes.
+        Neither one is copied, and it stops at the first failure.
+        """
+        length = min(len(a), len(b))
+        return (all(map(op, a, b))
+                and all(map(op, islice(a, length, None), repeat(0)))
+                and all(map(op, repeat(0), islice(b, length, None))))
+
+    @classmethod
+    def select(cls, values: MutableSequence[int], subscripts: MutableSequence[int]) -> MutableSequence[int]:
+        """
+        Elements whose subscripts, starting from 1, are listed, in their own order.
+        It takes O(n + k) for n elements and k subscripts.
+        """
+        length = len(values)
+        if all(a < b for a, b in zip(subscripts, islice(subscripts, 1, None))):
+            # Strictly ascending subscripts are in the order of elements already.
+            return cls.new(values[i-1] for i in subscripts if 1 <= i <= length)
+        wanted = set(subscripts)
+        return cls.new(values[i-1] for i in range(1, length + 1) if i in wanted)
+
+    @classmethod
+    def scatter(cls, values: MutableSequence[int], subscripts: MutableSequence[int], value: int):
+        """
+        Set elements of subscripts, starting from 1, to the value one by one.
+        """
+        for subscript in subscripts:
+            if subscript == 0:
+                raise CyberNotSupportedException('subscript 0 is designed for setting all elements,'
+                                                 'you should write like array[0] = 10')
+            values[subscript-1] = value
+
+
+class ArrayStorage(ListStorage):
+    """
+    Signed 64-bit integers in a typed and contiguous array, 8 bytes per element.
+    Values out of the range raise CyberArithmeticException, where lists take any integer.
+    """
+
+    @classmethod
+    def new(cls, values: Iterable[int]) -> MutableSequence[int]:
+        if type(values) is array and values.typecode == 'q':
+            return values
+        try:
+            return array('q', values)
+        except OverflowError:
+            raise CyberArithmeticException('u8 elements out of the range of signed 64-bit integers') from None
+
+    @classmethod
+    def scatter(cls, values: MutableSequence[int], subscripts: MutableSequence[int], value: int):
+        try:
+            super().scatter(values, subscripts, value)
+        except OverflowError:
+            raise CyberArithmeticException(f'{value} is out of the range of signed 64-bit integers') from None
+
+
+class NumpyStorage(ListStorage):
+    """
+    Signed 64-bit integers in a NumPy array, with vectorized kernels.
+    Unlike Python integers, results out of the range wrap around,
+    while integers out of it given to u8s raise CyberArithmeticException.
+    """
+
+    accepted_types = ListStorage.accepted_types + ((numpy.ndarray, ) if numpy is not None else ())
+
+    @staticmethod
+    def available() -> bool:
+        return numpy is not None
+
+    @classmethod
+    def new(cls, values: Iterable[int]) -> MutableSequence[int]:
+        if type(values) is numpy.ndarray and values.dtype == numpy.int64:
+            return values
+        try:
+            if isgenerator(values):
+                return numpy.fromiter(values, dtype=numpy.int64)
+            return numpy.array(values, dtype=numpy.int64)
+        except OverflowError:
+            raise CyberArithmeticException('u8 elements out of the range of signed 64-bit integers') from None
+
+    @classmethod
+    def copy(cls, values: MutableSequence[int]) -> MutableSequence[int]:
+        # Slices of arrays are views.
+        return cls.new(values).copy()
+
+    @classmethod
+    def filled(cls, value: int, length: int) -> MutableSequence[int]:
+        return numpy.full(length, value, dtype=numpy.int64)
+
+    @classmethod
+    def neg(cls, values: MutableSequence[int]) -> MutableSequence[int]:
+        return -cls.new(values)
+
+    @classmethod
+    def add_scalar(cls, values: MutableSequence[int], n: int) -> MutableSequence[int]:
+        return cls.new(values) + n
+
+    @classmethod
+    def add(cls, a: MutableSequence[int], b: MutableSequence[int]) -> MutableSequence[int]:
+        return cls.new(a) + cls.new(b)
+
+    @classmethod
+    def sub_scalar(cls, values: MutableSequence[int], n: int) -> MutableSequence[int]:
+        return cls.new(values) - n
+
+    @classmethod
+    def sub(cls, a: MutableSequence[int], b: MutableSequence[int]) -> MutableSequence[int]:
+        return cls.new(a) - cls.new(b)
+
+    @classmethod
+    def ineg(cls, values: MutableSequence[int]) -> MutableSequence[int]:
+        values = cls.new(values)
+        numpy.negative(values, out=values)
+        return values
+
+    @classmethod
+    def iadd_scalar(cls, values: MutableSequence[int], n: int) -> MutableSequence[int]:
+        values = cls.new(values)
+        values += n
+        return values
+
+    @classmethod
+    def iadd(cls, a: MutableSequence[int], b: MutableSequence[int]) -> MutableSequence[int]:
+        a = cls.new(a)
+        a += cls.new(b)
+        return a
+
+    @classmethod
+    def isub_scalar(cls, values: MutableSequence[int], n: int) -> MutableSequence[int]:
+        values = cls.new(values)
+        values -= n
+        return values
+
+    @classmethod
+    def isub(cls, a: MutableSequence[int], b: MutableSequence[int]) -> MutableSequence[int]:
+        a = cls.new(a)
+        a -= cls.new(b)
+        return a
+
+    @classmethod
+    def fill(cls, values: MutableSequence[int], value: int) -> MutableSequence[int]:
+        values = cls.new(values)
+        values.fill(value)
+        return values
+
+    @classmethod
+    def dot(cls, a: MutableSequence[int], b: MutableSequence[int]) -> int:
+        # Zeroes filled to the shorter one add nothing, so only the common part counts.
+        length = min(len(a), len(b))
+        return int(numpy.dot(cls.new(a)[:length], cls.new(b)[:length]))
+
+    @classmethod
+    def compare(cls, a: MutableSequence[int], b: MutableSequence[int], op: Callable[[Any, Any], bool]) -> bool:
+        a, b = cls.new(a), cls.new(b)
+        length = min(len(a), len(b))
+        # The tail of the longer one is compared with zeroes.
+        return bool(op(a[:length], b[:length]).all() and op(a[length:], 0).all() and op(0, b[length:]).all())
+
+    @classmethod
+    def select(cls, values: MutableSequence[int], subscripts: MutableSequence[int]) -> MutableSequence[int]:
+        values, subscripts = cls.new(values), cls.new(subscripts)
+        mask = numpy.zeros(len(values) + 1, dtype=bool)
+        mask[subscripts[(subscripts >= 1) & (subscripts <= len(values))]] = True
+        return values[mask[1:]]
+
+    @classmethod
+    def scatter(cls, values: MutableSequence[int], subscripts: MutableSequence[int], value: int):
+        subscripts = cls.new(subscripts)
+        # 0 and subscripts out of range raise, the valid ones are checked first, as a whole.
+        invalid = numpy.flatnonzero((subscripts == 0) | (subscripts > len(values)) | (subscripts < 1 - len(values)))
+        if invalid.size != 0:
+            # Elements before the first invalid one are set anyway, the same as setting them one by one.
+            values[subscripts[:invalid[0]] - 1] = value
+            super().scatter(values, subscripts[invalid[0]:].tolist(), value)
+        values[subscripts - 1] = value
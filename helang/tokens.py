@@ -1,5 +1,10 @@
+import re
 import enum
 
+from array import array
+from itertools import chain
+from typing import List, Iterator, Optional
+
 
 class TokenKind(enum.Enum):
     # Numbers like 123, 276, etc.
@@ -114,6 +119,8 @@ COMPARATOR_CHARS = {char for op in COMPARATOR_KINDS.keys() for char in op}
 
 
 class Token:
+    __slots__ = ('content', 'kind')
+
     def __init__(self, content: str, kind: TokenKind):
         self.content = content
         self.kind = kind
@@ -123,3 +130,79 @@ class Token:
 
     def __repr__(self):
         return f'Token({self.kind}, {self.content})'
+
+
+# Tokens are never changed after lexing, so tokens of fixed content are shared.
+FIXED_TOKENS = {
+    content: Token(content, kind)
+    for content, kind in chain(
+        SINGLE_CHAR_TOKEN_KINDS.items(), KEYWORD_KINDS.items(), COMPARATOR_KINDS.items(),
+        (('+', TokenKind.ADD), ('++', TokenKind.INCREMENT)),
+    )
+}
+
+_KINDS_BY_CODE = {kind.value: kind for kind in TokenKind}
+
+# Kinds of fixed content have one content each.
+_FIXED_CONTENTS = {token.kind: content for content, token in FIXED_TOKENS.items()}
+
+# Contents of the other kinds, matched from their offsets.
+_CONTENT_REGEXES = {
+    TokenKind.NUMBER: re.compile(r'\d+'),
+    TokenKind.IDENT: re.compile(r'[a-zA-Z_$][A-Za-z0-9_$]*'),
+}
+
+
+def offsets_array(length: Optional[int] = None) -> array:
+    """
+    Make an array for offsets in a source, 4 bytes each unless the source is too long.
+    :param length: length of the source, or None if it is not known yet.
+    """
+    return array('I' if length is not None and length < 2 ** 32 else 'Q')
+
+
+class TokenBuffer:
+    """
+    Tokens kept in parallel arrays of kind codes and offsets in the source, instead of a Token each.
+    Contents are matched from the source only when asked, so numbers are parsed lazily.
+    """
+
+    __slots__ = ('source', 'codes', 'starts')
+
+    def __init__(self, source: str):
+        self.source = source
+        self.codes = array('B')
+        # 4 bytes per offset are enough for sources under 4 GiB.
+        self.starts = offsets_array(len(source))
+
+    def append(self, kind: TokenKind, start: int):
+        self.codes.append(kind.value)
+        self.starts.append(start)
+
+    def kind(self, i: int) -> TokenKind:
+        return _KINDS_BY_CODE[self.codes[i]]
+
+    def kinds(self) -> List[TokenKind]:
+        """
+        :return: kinds of all tokens, which are shared enum members.
+        """
+        return list(map(_KINDS_BY_CODE.__getitem__, self.codes))
+
+    def content(self, i: int) -> str:
+        kind = self.kind(i)
+        if kind in _FIXED_CONTENTS:
+            return _FIXED_CONTENTS[kind]
+        return _CONTENT_REGEXES[kind].match(self.source, self.starts[i]).group()
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> Token:
+        # Makes a token on demand, like for error messages.
+        kind = self.kind(i)
+        if kind in _FIXED_CONTENTS:
+            return FIXED_TOKENS[_FIXED_CONTENTS[kind]]
+        return Token(self.content(i), kind)
+
+    def __iter__(self) -> Iterator[Token]:
+        return (self[i] for i in range(len(self)))
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import threading
+
+from itertools import islice
+from typing import IO, Optional
+from .u8 import U8
+from .he_ast import AST
+from .hooks import Hook, SourceMap, describe
+
+
+# How many elements of a written u8 are kept in the trace.
+_VALUE_LIMIT = 8
+
+
+def _now() -> float:
+    # Microseconds, the unit of the trace.
+    return time.perf_counter() * 1e6
+
+
+class ChromeTraceHook(Hook):
+    """
+    Writes runs as trace events of Chrome, which chrome://tracing and Perfetto open.
+    Runs and statements are spans, prints and writes of variables are instants,
+    and u8 elements allocated are a counter.
+    Events are appended to the file as they come, in the JSON array format, flushed at the end of every run.
+    The array is closed by close, though the viewers open the file without it.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: the path to the JSON file, opened at the first event.
+        """
+        self.path = path
+        self._file: Optional[IO[str]] = None
+        self._closed = False
+        self._pid = os.getpid()
+        self._source_map = SourceMap('')
+        self._run_start = 0.0
+        self._run_path = '<string>'
+        self._statement_start = 0.0
+        self._elements = 0
+
+    def __enter__(self) -> 'ChromeTraceHook':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _event(self, phase: str, name: str, ts: float, **fields):
+        if self._closed:
+            return
+        if self._file is None:
+            self._file = open(self.path, 'w')
+            self._file.write('[\n')
+        else:
+            self._file.write(',\n')
+        json.dump(dict(name=name, ph=phase, ts=ts, pid=self._pid, tid=threading.get_ident(), **fields), self._file)
+
+    def on_run_start(self, source: str, path: str):
+        self._source_map = SourceMap(source)
+        self._run_path = path
+        self._run_start = _now()
+
+    def on_run_end(self):
+        end = _now()
+        self._event('X', self._run_path, self._run_start, dur=end - self._run_start, cat='run')
+        if self._file is not None:
+            self._file.flush()
+
+    def on_statement_start(self, index: int, statement: AST):
+        self._statement_start = _now()
+
+    def on_statement_end(self, index: int, statement: AST, error: Optional[BaseException]):
+        end = _now()
+        args = dict(index=index, type=type(statement).__name__)
+        offset = getattr(statement, 'offset', None)
+        if offset is not None:
+            args['line'], args['column'] = self._source_map.locate(offset)
+        if error is not None:
+            args['error'] = f'{type(error).__name__}: {error}'
+        self._event('X', describe(statement, self._source_map), self._statement_start,
+                    dur=end - self._statement_start, cat='statement', args=args)
+        self._event('C', 'u8 elements', end, args=dict(allocated=self._elements))
+
+    def on_var_write(self, name: str, value: U8):
+        text = ' | '.join(map(str, islice(value.value, _VALUE_LIMIT)))
+        if len(value.value) > _VALUE_LIMIT:
+            text += f' | ... ({len(value.value)} elements)'
+        self._event('i', f'{name} =', _now(), s='t', cat='write', args=dict(value=text))
+
+    def on_alloc(self, length: int):
+        self._elements += length
+
+    def on_print(self, line: str):
+        self._event('i', 'print', _now(), s='t', cat='print', args=dict(line=line))
+
+    def close(self):
+        """
+        Close the array and the file. Later events are dropped.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._file is None:
+            # No run was watched, an empty trace.
+            self._file = open(self.path, 'w')
+            self._file.write('[')
+        self._file.write('\n]\n')
+        self._file.close()
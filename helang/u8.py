@@ -1,48 +1,126 @@
-from typing import List, Union, Tuple, Generator
+import operator
+
+from enum import Enum
+from typing import Union, Iterable
 from inspect import isgenerator
+from .storage import ShareCount, ListStorage, ArrayStorage, NumpyStorage
 from .exceptions import (
     CyberArithmeticException, CyberU8ComparingException,
     CyberNotSupportedException
 )
 
 
+class U8Storage(Enum):
+    LIST = ListStorage
+    ARRAY = ArrayStorage
+    # Falls back to LIST when NumPy is not installed.
+    NUMPY = NumpyStorage
+
+
+_storage = ListStorage
+
+
+def use_storage(storage: U8Storage):
+    """
+    Choose how elements of new u8s are stored.
+    Call it before running any code, as existing u8s keep their storage.
+    :param storage: the storage to use.
+    """
+    global _storage
+    _storage = storage.value
+    if _storage is NumpyStorage and not NumpyStorage.available():
+        _storage = ListStorage
+
+
+def swap_storage(storage: type) -> type:
+    """
+    Replace the storage class of new u8s, like with a subclass watching the kernels.
+    :param storage: the storage class to use.
+    :return: the former one, to swap it back.
+    """
+    global _storage
+    former, _storage = _storage, storage
+    return former
+
+
 class U8:
     """
     The Saint He's specific type.
     """
 
+    __slots__ = ('value', '_share')
+
     _cached_empty = None
 
-    def __new__(cls, value: Union[List[int], Generator[int, None, None], int, None] = None):
+    def __new__(cls, value: Union[Iterable[int], int, None] = None):
         if value is not None:
             return super().__new__(cls)
         if cls._cached_empty is None:
             cls._cached_empty = super().__new__(cls)
         return cls._cached_empty
 
-    def __init__(self, value: Union[List[int], Generator[int, None, None], int, None] = None):
+    def __init__(self, value: Union[Iterable[int], int, None] = None):
         if value is None:
-            self.value = []
+            values = _storage.new(())
         elif isinstance(value, int):
-            self.value = [value]
-        elif isgenerator(value):
-            self.value = list(value)
-        elif isinstance(value, list):
-            self.value = value
+            values = _storage.new((value, ))
+        elif isinstance(value, _storage.accepted_types) or isgenerator(value):
+            values = _storage.new(value)
         else:
             raise CyberNotSupportedException('u8 can only contain integers')
+        # Elements may be shared with other u8s.
+        # Write them by methods of U8 only, which copy them first if they are shared.
+        self.value = values
+        # Taken by share() only, so u8s never shared carry nothing more.
+        self._share = None
+
+    def share(self) -> 'U8':
+        """
+        Make a u8 of the same elements in O(1), which shares the buffer until either one writes it.
+        :return: the new u8.
+        """
+        if self._share is None:
+            self._share = ShareCount()
+        u8 = object.__new__(U8)
+        u8.value = self.value
+        u8._share = self._share
+        self._share.count += 1
+        return u8
+
+    def _own(self):
+        # Copy on write, unless the others sharing the buffer have left it by writing.
+        # Those dropped without writing are still counted, which costs a copy at most.
+        share = self._share
+        if share is not None:
+            if share.count > 1:
+                self._replace(_storage.copy(self.value))
+            else:
+                self._share = None
+
+    def _replace(self, values):
+        # Take another buffer, which is not shared.
+        if values is not self.value:
+            if self._share is not None:
+                self._share.count -= 1
+                self._share = None
+            self.value = values
+
+    def __reduce__(self):
+        # Pickled by the elements, as __new__ without arguments returns the shared empty u8.
+        return U8, (list(map(int, self.value)), )
 
     def __str__(self) -> str:
-        return ' | '.join(str(element) for element in self.value)
+        return ' | '.join(map(str, self.value))
 
     def __repr__(self):
         return str(self)
 
     def __neg__(self):
-        return U8(-v for v in self.value)
+        return U8(_storage.neg(self.value))
 
     def increment(self):
-        self.value = [v+1 for v in self.value]
+        self._own()
+        self._replace(_storage.iadd_scalar(self.value, 1))
 
     def __add__(self, other: 'U8'):
         a, b = self, other
@@ -52,38 +130,90 @@ class U8:
 
         if len(b.value) == 1:
             # Normal addition.
-            return U8(v + b.value[0] for v in a.value)
+            return U8(_storage.add_scalar(a.value, b.value[0]))
 
         if len(a.value) == len(b.value):
             # Vector addition.
-            return U8(a.value[i] + b.value[i] for i in range(len(a.value)))
+            return U8(_storage.add(a.value, b.value))
 
         raise CyberArithmeticException(f'illegal operation: {self} + {other}')
 
     def __sub__(self, other: 'U8'):
         if len(other.value) == 1:
             # Normal subtraction.
-            return U8(v - other.value[0] for v in self.value)
+            return U8(_storage.sub_scalar(self.value, other.value[0]))
 
         if len(other.value) == len(self.value):
             # Vector subtraction.
-            return U8(self.value[i] - other.value[i] for i in range(len(self.value)))
+            return U8(_storage.sub(self.value, other.value))
 
         raise CyberArithmeticException(f'illegal operation: {self} - {other}')
 
+    def ineg(self) -> 'U8':
+        """
+        Negate elements in place.
+        :return: itself.
+        """
+        self._own()
+        self._replace(_storage.ineg(self.value))
+        return self
+
+    def iadd(self, other: 'U8') -> 'U8':
+        """
+        Add the other one to itself in place, broadcasting the same as +.
+        :return: itself.
+        """
+        self._own()
+        if len(other.value) == 1:
+            self._replace(_storage.iadd_scalar(self.value, other.value[0]))
+        elif len(self.value) == 1:
+            # The result takes the length of the other one, so the buffer is replaced.
+            self._replace(_storage.add_scalar(other.value, self.value[0]))
+        elif len(self.value) == len(other.value):
+            self._replace(_storage.iadd(self.value, other.value))
+        else:
+            raise CyberArithmeticException(f'illegal operation: {self} + {other}')
+        return self
+
+    def isub(self, other: 'U8') -> 'U8':
+        """
+        Subtract the other one from itself in place, broadcasting the same as -.
+        :return: itself.
+        """
+        self._own()
+        if len(other.value) == 1:
+            self._replace(_storage.isub_scalar(self.value, other.value[0]))
+        elif len(self.value) == len(other.value):
+            self._replace(_storage.isub(self.value, other.value))
+        else:
+            raise CyberArithmeticException(f'illegal operation: {self} - {other}')
+        return self
+
+    def fill(self, value: int) -> 'U8':
+        """
+        Set all elements to the value in place.
+        :return: itself.
+        """
+        self._own()
+        self._replace(_storage.fill(self.value, value))
+        return self
+
+    def scatter(self, subscripts: 'U8', value: int) -> 'U8':
+        """
+        Set elements of subscripts, starting from 1, to the value in place.
+        :return: itself.
+        """
+        self._own()
+        _storage.scatter(self.value, subscripts.value, value)
+        return self
+
     def __mul__(self, other: 'U8'):
-        a, b = self.value, other.value
-        # Makes a the shorter list
-        if len(a) > len(b):
-            a, b = b, a
-        expected_length = len(b)
-        a += [0] * (expected_length - len(a))
-        return U8(sum(a[i] * b[i] for i in range(expected_length)))
+        return U8(_storage.dot(self.value, other.value))
 
     def __getitem__(self, subscripts: 'U8'):
         # Like the operation of sublist.
         # And Saint He likes arrays whose subscript start from 1.
-        return U8(self.value[i-1] for i in range(1, len(self.value) + 1) if i in subscripts.value)
+        return U8(_storage.select(self.value, subscripts.value))
 
     def __setitem__(self, subscripts: 'U8', value: 'U8'):
         if len(value.value) > 1:
@@ -93,55 +223,34 @@ class U8:
         val = value.value[0]
 
         # Set all elements if subscript is single 0.
-        if subscripts == [0]:
-            self.value = [val] * len(self.value)
+        # Zeroes are filled when comparing, so it is the same as all subscripts are 0.
+        if not any(subscripts.value):
+            self.fill(val)
             return
 
         # Set the elements one by one.
-        for subscript in subscripts.value:
-            if subscript == 0:
-                raise CyberNotSupportedException('subscript 0 is designed for setting all elements,'
-                                                 'you should write like array[0] = 10')
-            self.value[subscript-1] = val
-
-    @staticmethod
-    def _fill_zero(a: 'U8', b: 'U8') -> Tuple['U8', 'U8', int]:
-        """
-        Fill zeroes with shorter u8.
-        :param a: first u8.
-        :param b: second u8.
-        :return: filled u8s and the length of them.
-        """
-        len2fill = abs(len(a.value) - len(b.value))
-        if len(a.value) > len(b.value):
-            return a, U8(b.value + [0] * len2fill), len(a.value)
-        return U8(a.value + [0] * len2fill), b, len(b.value)
+        self.scatter(subscripts, val)
 
     def __lt__(self, other):
-        a, b, u8len = U8._fill_zero(self, other)
-        return all(a.value[i] < b.value[i] for i in range(u8len))
+        return _storage.compare(self.value, other.value, operator.lt)
 
     def __le__(self, other):
-        a, b, u8len = U8._fill_zero(self, other)
-        return all(a.value[i] <= b.value[i] for i in range(u8len))
+        return _storage.compare(self.value, other.value, operator.le)
 
     def __gt__(self, other):
-        a, b, u8len = U8._fill_zero(self, other)
-        return all(a.value[i] > b.value[i] for i in range(u8len))
+        return _storage.compare(self.value, other.value, operator.gt)
 
     def __ge__(self, other):
-        a, b, u8len = U8._fill_zero(self, other)
-        return all(a.value[i] >= b.value[i] for i in range(u8len))
+        return _storage.compare(self.value, other.value, operator.ge)
 
     def __eq__(self, other):
         if isinstance(other, list):
-            return self == U8(other)
+            return _storage.compare(self.value, other, operator.eq)
 
         if not isinstance(other, U8):
             raise CyberU8ComparingException(f'cannot compare u8 with {type(other)}')
 
-        a, b, u8len = U8._fill_zero(self, other)
-        return all(a.value[i] == b.value[i] for i in range(u8len))
+        return _storage.compare(self.value, other.value, operator.eq)
 
     def __bool__(self):
         if len(self.value) != 1:
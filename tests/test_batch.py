@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+
+from helang import launch
+from helang.hooks import Hook, hooks
+from helang.batch import run_batch, run_script
+from helang.quick_runner import Engine
+
+
+def _write(path, code: str) -> str:
+    with open(path, 'w') as f:
+        f.write(code)
+    return str(path)
+
+
+def test_run_batch(tmp_path):
+    paths = [
+        _write(tmp_path / 'a.he', 'u8 a = 1 | 2; print a; sprint 72 | 105;'),
+        _write(tmp_path / 'b.he', 'u8 a = [2] - [3];'),
+        _write(tmp_path / 'c.he', 'u8 c = 3; c++; print c;'),
+    ]
+    for engine in Engine:
+        a, b, c = run_batch(paths, engine, workers=2, keep_variables=True)
+        assert a.ok and a.output == '1 | 2\nHi\n' and a.variables == {'a': [1, 2]}
+        assert not b.ok and b.error.startswith('CyberArithmeticException')
+        assert c.output == '4\n' and c.variables['c'] == [4]
+        assert all(result.seconds >= 0 for result in (a, b, c))
+
+
+def test_output_dir(tmp_path):
+    os.mkdir(tmp_path / 'd')
+    paths = [_write(tmp_path / 'a.he', 'print 1;'), _write(tmp_path / 'd' / 'a.he', 'print 2;')]
+    results = run_batch(paths, workers=1, output_dir=str(tmp_path / 'out'))
+    assert [result.output for result in results] == [None, None]
+    assert [result.variables for result in results] == [None, None]
+    assert sorted(os.listdir(tmp_path / 'out')) == ['a-2.out', 'a.out']
+    with open(results[1].output_path) as f:
+        assert f.read() == '2\n'
+
+
+def test_run_script_captures_stdout(tmp_path, capsys):
+    result = run_script(_write(tmp_path / 'a.he', 'print 1;'), cache=False)
+    assert result.output == '1\n'
+    assert capsys.readouterr().out == ''
+
+
+def test_workers_without_hooks(tmp_path):
+    class Failing(Hook):
+        def on_statement_start(self, index: int, statement):
+            raise RuntimeError('hooked in a worker')
+
+    path = _write(tmp_path / 'a.he', 'print 1;')
+    with hooks.registered(Failing()):
+        [result] = run_batch([path], workers=1)
+    assert result.ok and result.output == '1\n'
+
+
+@pytest.mark.parametrize('option', ['--trace=t.json', '--profile', '--dump-nodes'])
+def test_batch_rejects_options(tmp_path, monkeypatch, capsys, option):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'argv', ['helang', 'batch', _write(tmp_path / 'a.he', 'print 1;'), option])
+    with pytest.raises(SystemExit) as e:
+        launch.main()
+    assert e.value.code == 1
+    out = capsys.readouterr().out
+    assert 'not supported' in out and '1\n' not in out
+    assert not (tmp_path / 't.json').exists() and not hooks
+
+
+@pytest.mark.parametrize('workers', ['abc', '-1', '0'])
+def test_batch_rejects_workers(tmp_path, monkeypatch, capsys, workers):
+    monkeypatch.setattr(sys, 'argv', ['helang', 'batch', _write(tmp_path / 'a.he', 'print 1;'), f'--workers={workers}'])
+    with pytest.raises(SystemExit) as e:
+        launch.main()
+    assert e.value.code == 1
+    assert f'Invalid workers {workers}' in capsys.readouterr().out
@@ -0,0 +1,105 @@
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from helang import cache
+from helang.u8 import U8
+from helang.environment import Environment
+from helang.quick_runner import quick_run_file, quick_run_string, Engine
+
+
+def _write(path, code: str):
+    with open(path, 'w') as f:
+        f.write(code)
+
+
+def test_cache_reused(tmp_path, monkeypatch):
+    source = str(tmp_path / 'a.he')
+    _write(source, 'u8 a = 1 | 2; a++;')
+    quick_run_file(source)
+    path = cache.cache_path(source)
+    assert os.listdir(os.path.dirname(path)) == ['a.hec']
+
+    # Runs from the cache without parsing.
+    monkeypatch.setattr(cache, 'Parser', None)
+    env = dict()
+    quick_run_file(source, env)
+    assert env['a'] == [2, 3]
+
+
+def test_cache_invalidated(tmp_path):
+    source = str(tmp_path / 'a.he')
+    _write(source, 'u8 a = 1;')
+    quick_run_file(source)
+    _write(source, 'u8 a = 2;')
+    env = dict()
+    quick_run_file(source, env)
+    assert env['a'] == [2]
+
+    # Broken files are parsed again and replaced.
+    path = cache.cache_path(source)
+    _write(path, 'broken')
+    env = dict()
+    quick_run_file(source, env)
+    assert env['a'] == [2]
+    assert cache.load_ast(path, cache.source_hash('u8 a = 2;')) is not None
+
+
+def test_no_cache(tmp_path):
+    source = str(tmp_path / 'a.he')
+    _write(source, 'u8 a = 1;')
+    env = dict()
+    quick_run_file(source, env, cache=False)
+    assert env['a'] == [1]
+    assert not os.path.exists(os.path.dirname(cache.cache_path(source)))
+
+
+def test_parse_cache_counters():
+    parse_cache = cache.ParseCache(maxsize=2)
+    a = parse_cache.get('u8 a = 1;')
+    assert parse_cache.get('u8 a = 1;') is a
+    parse_cache.get('u8 b = 1;')
+    parse_cache.get('u8 a = 1;')
+    # The least recently used one is evicted.
+    parse_cache.get('u8 c = 1;')
+    assert parse_cache.info() == cache.CacheInfo(hits=2, misses=3, evictions=1, maxsize=2, currsize=2)
+    assert parse_cache.get('u8 a = 1;') is a
+
+    parse_cache.resize(0)
+    assert parse_cache.info().currsize == 0
+    assert parse_cache.get('u8 a = 1;') is not parse_cache.get('u8 a = 1;')
+    parse_cache.clear()
+    assert parse_cache.info() == cache.CacheInfo(0, 0, 0, 0, 0)
+
+
+def test_parse_cache_environments():
+    code = 'u8 b = a + 1; a = b * 2;'
+    for engine in Engine:
+        env = Environment({'x': U8(5), 'a': U8(1)})
+        quick_run_string(code, env, engine)
+        quick_run_string(code, env, engine)
+        assert env['a'] == [10]
+
+        # Runs with slots laid out differently.
+        env = dict(a=U8(3))
+        quick_run_string(code, env, engine)
+        assert env == {'a': [8], 'b': [4]}
+
+
+def test_parse_cache_concurrent():
+    code = 'u8 b = a; b = b + 1; a = b * 1 | 1; b++;'
+
+    def run(args):
+        i, engine = args
+        env = {'a': U8(i)}
+        for _ in range(20):
+            quick_run_string(code, env, engine)
+        return env
+
+    args = [(i, engine) for i in range(1, 6) for engine in Engine]
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(run, args))
+    for (i, _), env in zip(args, results):
+        expected = {'a': U8(i)}
+        for _ in range(20):
+            quick_run_string(code, expected, Engine.AST)
+        assert env == expected
@@ -0,0 +1,47 @@
+import pytest
+
+from helang.lexer import Lexer
+from helang.parser import Parser
+from helang.compiler import compile_ast, VM, OpCode
+from helang.exceptions import CyberNameException, CyberArithmeticException
+from helang.u8 import U8
+
+
+def compile_code(code: str):
+    return compile_ast(Parser(Lexer(code).lex()).parse())
+
+
+def test_slots():
+    program = compile_code('u8 a = 1 | 2; u8 b = a; a = b + a; print a;')
+    assert program.names == ['a', 'b']
+    assert [opcode for opcode, _ in program.code].count(OpCode.LOAD) == 4
+
+
+def test_precedence_precomputed():
+    program = compile_code('1 + 2 * 3 - 4;')
+    operations = [arg for opcode, arg in program.code if opcode == OpCode.OPERATE]
+    assert len(operations) == 1
+    count, postfix = operations[0]
+    assert count == 4
+    assert [item if isinstance(item, int) else item.name for item in postfix] == [0, 1, 2, 'MUL', 'ADD', 3, 'SUB']
+
+
+def test_env_in_and_out():
+    env = {'a': U8([1, 2])}
+    VM.run(compile_code('u8 b = a + 1; a++;'), env)
+    assert env['a'] == [2, 3]
+    assert env['b'] == [2, 3]
+
+
+def test_env_written_back_on_error():
+    env = dict()
+    with pytest.raises(CyberArithmeticException):
+        VM.run(compile_code('u8 a = 1 | 2; u8 b = 1 | 2 | 3; u8 c = b - a;'), env)
+    assert env['a'] == [1, 2]
+    assert 'c' not in env
+
+
+def test_undefined():
+    with pytest.raises(CyberNameException) as e:
+        VM.run(compile_code('u8 a = b;'), dict())
+    assert str(e.value) == 'b is not defined.'
@@ -0,0 +1,57 @@
+import pytest
+
+from helang.lexer import Lexer
+from helang.parser import Parser
+from helang.dataflow import analyze, DependencyGraph, DataflowExecutor
+from helang.exceptions import CyberArithmeticException
+from helang.output import output_to, CaptureSink
+
+
+def parse(code: str):
+    return Parser(Lexer(code).lex()).parse()
+
+
+def test_analyze():
+    access = analyze(parse('a[b] = c + d[1];'))
+    assert access.reads == {'a', 'b', 'c', 'd'}
+    assert access.writes == {'a'}
+    assert access.heavy and not access.effect and not access.exclusive
+
+    access = analyze(parse('u8 a = b;'))
+    assert access.reads == {'b'} and access.writes == {'a'} and access.exclusive
+    assert analyze(parse('a++;')).writes == {'a'}
+    assert analyze(parse('print a;')).effect
+
+
+def test_dependency_graph():
+    graph = DependencyGraph(parse('u8 a = 1; u8 b = 2; a = a + b; print a; b = 3; u8 c = b; u8 d = 4;').asts)
+    assert graph.indegrees[:2] == [0, 0]
+    # Reads after writes, effects after everything before, and writes after reads.
+    assert sorted(graph.dependents[0]) == [2, 3, 5]
+    assert sorted(graph.dependents[1]) == [2, 3, 4, 5]
+    assert sorted(graph.dependents[2]) == [3, 4, 5]
+    # Sharing waits for everything before, and everything after waits for it.
+    assert graph.indegrees[5] == 5
+    assert graph.dependents[5] == [6]
+
+
+def test_executor():
+    code = ' '.join(f'u8 v{i} = [20]; v{i} = v{i} + {i}; print v{i}[1 | 2];' for i in range(8)) + ' u8 w = v1 + v2;'
+    executor = DataflowExecutor(workers=4)
+    expected_env, env = dict(), dict()
+    with output_to(CaptureSink()) as expected:
+        parse(code).evaluate(expected_env)
+    with output_to(CaptureSink()) as sink:
+        executor.run(parse(code), env)
+    executor.shutdown()
+    assert sink.lines == expected.lines
+    assert env == expected_env
+
+
+def test_executor_failure():
+    executor = DataflowExecutor(workers=2)
+    sink = CaptureSink()
+    with output_to(sink), pytest.raises(CyberArithmeticException):
+        executor.run(parse('u8 a = [3]; print 1; u8 b = [2] - [3]; print a; u8 c = [4] - [5];'), dict())
+    executor.shutdown()
+    assert sink.lines == ['1']
@@ -0,0 +1,43 @@
+import pytest
+
+from helang.lexer import Lexer
+from helang.parser import Parser
+from helang.environment import Environment
+from helang.resolver import resolve
+from helang.quick_runner import quick_run_string, Engine
+from helang.exceptions import CyberNameException
+from helang.u8 import U8
+
+
+def test_resolve_slots():
+    env = Environment({'b': U8(1)})
+    ast = Parser(Lexer('u8 a = b; a = a + b; print a;').lex()).parse()
+    resolve(ast, env)
+    assert env.names == ['b', 'a']
+    assert [child.slot for child in ast.asts[:2]] == [1, 1]
+
+    ast.evaluate(env)
+    assert env['a'] == [2]
+    assert dict(env) == {'b': [1], 'a': [2]}
+
+
+def test_undefined():
+    env = Environment()
+    with pytest.raises(CyberNameException) as e:
+        quick_run_string('u8 a = b;', env)
+    assert str(e.value) == 'b is not defined.'
+    # Slots of undefined names are not variables.
+    assert 'b' not in env
+    assert len(env) == 0
+    with pytest.raises(KeyError):
+        env['b']
+
+
+@pytest.mark.parametrize('engine', list(Engine), ids=lambda engine: engine.name.lower())
+def test_lines_share_environment(engine: Engine):
+    env = Environment()
+    quick_run_string('u8 a = 1 | 2;', env, engine)
+    quick_run_string('u8 b = 3; a++;', env, engine)
+    quick_run_string('a = a - b;', env, engine)
+    assert env['a'] == [-1, 0]
+    assert list(env) == ['a', 'b']
@@ -0,0 +1,141 @@
+import json
+import threading
+
+from functools import partial
+from helang import quick_runner, u8
+from helang.lexer import Lexer
+from helang.parser import Parser
+from helang.u8 import U8
+from helang.hooks import Hook, HookRegistry, hooks
+from helang.trace import ChromeTraceHook
+from helang.output import CaptureSink
+from helang.quick_runner import quick_run_string, Engine
+from helang.exceptions import CyberNameException
+
+
+def parse(code: str):
+    return Parser(Lexer(code).lex()).parse()
+
+
+CODE = 'u8 a = [2]; a[1] = 5; print a; sprint 72 | 105;'
+
+
+class Recorder(Hook):
+    def __init__(self):
+        self.events = []
+
+    def on_run_start(self, source: str, path: str):
+        self.events.append(('run', path))
+
+    def on_run_end(self):
+        self.events.append(('end', ))
+
+    def on_statement_start(self, index: int, statement):
+        self.events.append(('start', index, statement.offset))
+
+    def on_statement_end(self, index: int, statement, error):
+        self.events.append(('stop', index, type(error).__name__ if error else None))
+
+    def on_var_write(self, name: str, value: U8):
+        self.events.append(('write', name, str(value)))
+
+    def on_alloc(self, length: int):
+        self.events.append(('alloc', length))
+
+    def on_print(self, line: str):
+        self.events.append(('print', line))
+
+
+def test_events():
+    recorder = Recorder()
+    sink = CaptureSink()
+    with hooks.registered(recorder):
+        quick_run_string(CODE, engine=Engine.VM, output=sink)
+    assert sink.lines == ['5 | 0', 'Hi']
+    assert recorder.events == [
+        ('run', '<string>'),
+        ('start', 0, 0), ('alloc', 2), ('stop', 0, None), ('write', 'a', '0 | 0'),
+        ('start', 1, 12), ('alloc', 1), ('alloc', 1), ('stop', 1, None), ('write', 'a', '5 | 0'),
+        ('start', 2, 22), ('print', '5 | 0'), ('stop', 2, None),
+        ('start', 3, 31), ('print', 'Hi'), ('alloc', 2), ('stop', 3, None),
+        ('end', ),
+    ]
+    assert not hooks
+
+
+def test_failure():
+    recorder = Recorder()
+    registry = HookRegistry((recorder, ))
+    try:
+        quick_runner._run_parsed(quick_runner.parse_cache.get('print 1; print b;'), None, Engine.AST,
+                                 partial(registry.run, source=''))
+    except CyberNameException:
+        ...
+    assert recorder.events[-2:] == [('stop', 1, 'CyberNameException'), ('end', )]
+    assert type(U8([1]).value) is list
+
+
+def test_only_overridden_events():
+    class Printed(Hook):
+        def __init__(self):
+            self.lines = []
+
+        def on_print(self, line: str):
+            self.lines.append(line)
+
+    hook = Printed()
+    sink = CaptureSink()
+    with hooks.registered(hook):
+        # Nothing watches allocations, so the storage is kept.
+        quick_run_string('u8 a = [1]; print a;', output=sink)
+    assert hook.lines == sink.lines == ['0']
+    assert quick_runner._watching_runner(None, '') is None
+
+
+def test_chrome_trace(tmp_path):
+    path = tmp_path / 'trace.json'
+    with ChromeTraceHook(str(path)) as trace, hooks.registered(trace):
+        quick_run_string('u8 a = [3];\nprint a;', output=CaptureSink())
+        # Readable by the viewers before the array is closed.
+        assert path.read_text().startswith('[\n{')
+        quick_run_string('print 1;', output=CaptureSink())
+    events = json.loads(path.read_text())
+    first_run = next(i for i, event in enumerate(events) if event.get('cat') == 'run')
+    assert [event['name'] for event in events[first_run + 1:] if event['ph'] == 'X'] == ['print 1;', '<string>']
+    events = events[:first_run + 1]
+    spans = [event for event in events if event['ph'] == 'X']
+    assert [span['name'] for span in spans] == ['u8 a = [3];', 'print a;', '<string>']
+    assert spans[1]['args']['line'] == 2
+    assert spans[2]['ts'] <= spans[0]['ts'] and spans[2]['dur'] >= spans[0]['dur'] + spans[1]['dur']
+    assert [event['args'] for event in events if event['ph'] == 'C'][-1] == {'allocated': 3}
+    assert [event['args'] for event in events if event['ph'] == 'i'] == [{'value': '0 | 0 | 0'}, {'line': '0 | 0 | 0'}]
+
+
+def test_threads_count_apart():
+    class Allocs(Hook):
+        def __init__(self, wait=None):
+            self.elements = 0
+            self.started = threading.Event()
+            self._wait = wait
+
+        def on_statement_start(self, index: int, statement):
+            self.started.set()
+            if self._wait is not None:
+                self._wait.wait(5)
+
+        def on_alloc(self, length: int):
+            self.elements += length
+
+    storage = u8._storage
+    done = threading.Event()
+    other = Allocs(wait=done)
+    thread = threading.Thread(target=lambda: HookRegistry((other, )).run(parse('u8 b = [100];'), dict()))
+    thread.start()
+    assert other.started.wait(5)
+    # This run starts after the other one and finishes before it.
+    hook = Allocs()
+    HookRegistry((hook, )).run(parse('u8 a = [5];'), dict())
+    done.set()
+    thread.join()
+    assert hook.elements == 5 and other.elements == 100
+    assert u8._storage is storage
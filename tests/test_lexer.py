@@ -1,5 +1,11 @@
-from helang.lexer import Lexer
-from helang.tokens import Token, TokenKind
+import io
+import pkgutil
+import pytest
+import tracemalloc
+
+from helang.lexer import Lexer, LexerBackend
+from helang.tokens import Token, TokenKind, FIXED_TOKENS, offsets_array
+from helang.exceptions import BadTokenException
 
 
 COMMENTS = """
@@ -71,3 +77,81 @@ def test_eq_ieq():
     ]
 
     assert tokens == expected
+
+
+def test_regex_backend():
+    for code in (COMMENTS, OPERATORS, '= == != >= <= > <', pkgutil.get_data('helang', 'logo.he').decode('utf-8')):
+        expected = Lexer(code).lex()
+        assert Lexer(code, LexerBackend.REGEX).lex() == expected
+
+
+def test_regex_backend_bad_tokens():
+    for code in ('u8 a = 1 / 2;', 'print a; #', 'a === b', '  \n  @'):
+        with pytest.raises(BadTokenException) as expected:
+            Lexer(code).lex()
+        with pytest.raises(BadTokenException) as actual:
+            Lexer(code, LexerBackend.REGEX).lex()
+        assert actual.value.args == expected.value.args
+
+
+def test_iter_tokens_across_chunks():
+    code = COMMENTS + OPERATORS + 'a >= b; c == d; e++;'
+    expected = Lexer(code).lex()
+    for chunk_size in (1, 2, 3, 5, 1024):
+        stream = io.StringIO(code)
+        assert list(Lexer(stream, chunk_size=chunk_size).iter_tokens()) == expected
+
+
+def test_lex_buffer():
+    for code in (COMMENTS, OPERATORS, '= == != >= <= > <', pkgutil.get_data('helang', 'logo.he').decode('utf-8')):
+        expected = Lexer(code).lex()
+        buffer = Lexer(code).lex_buffer()
+        assert len(buffer) == len(expected)
+        assert list(buffer) == expected
+        assert [token.kind for token in expected] == buffer.kinds()
+
+
+def test_lex_offsets():
+    code = 'u8 a = 1 | 23;\n// c\na++; b+ c >= 4;'
+    expected = [0, 3, 5, 7, 9, 11, 13, 20, 21, 23, 25, 26, 28, 30, 33, 34]
+    for content, backend in ((code, LexerBackend.STATE_MACHINE), (code, LexerBackend.REGEX), (io.StringIO(code), None)):
+        offsets = offsets_array()
+        lexer = Lexer(content, backend or LexerBackend.REGEX, chunk_size=4, offsets=offsets)
+        tokens = lexer.lex()
+        assert list(offsets) == expected
+        assert all(code.startswith(token.content, offset) for token, offset in zip(tokens, offsets))
+    assert list(Lexer(code).lex_buffer().starts) == expected
+    assert Lexer(code).offsets is None
+
+
+def test_stream_memory_bounded():
+    # Nothing is kept per token, so the peak of streaming stays the same for a longer source.
+    def peak(lines: int) -> int:
+        stream = io.StringIO('u8 a = 1 | 2 | 3; a = a + 1; print a; // comment\n' * lines)
+        tracemalloc.start()
+        for _ in Lexer(stream, chunk_size=4096).iter_tokens():
+            ...
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    small, large = peak(2_000), peak(20_000)
+    assert large < small * 1.5 + 16 * 1024
+
+
+def test_lex_buffer_bad_tokens():
+    for code in ('u8 a = 1 / 2;', 'print a; #', 'a === b', '  \n  @'):
+        with pytest.raises(BadTokenException) as expected:
+            Lexer(code).lex()
+        with pytest.raises(BadTokenException) as actual:
+            Lexer(code).lex_buffer()
+        assert actual.value.args == expected.value.args
+
+
+def test_tokens_shared():
+    for backend in LexerBackend:
+        tokens = Lexer('u8 abc = 1 | 1; abc = abc + 1;', backend).lex()
+        assert tokens[2] is FIXED_TOKENS['=']
+        assert tokens[4] is FIXED_TOKENS['|']
+        assert tokens[3] is tokens[5] is tokens[11]
+        assert tokens[1] is tokens[7] is tokens[9]
@@ -0,0 +1,83 @@
+import pkgutil
+
+from helang.u8 import U8Storage, use_storage
+from helang.lexer import Lexer
+from helang.parser import Parser
+from helang.compiler import compile_ast, VM, OpCode
+from helang.optimizer import optimize, count_nodes, counting_nodes
+from helang.output import CaptureSink
+from helang.quick_runner import quick_run_file
+from helang.he_ast import ListAST, OrU8InitAST, OperationAST, PrintAST, PrintTextAST, SprintAST, U8SetAST
+
+
+def optimize_code(code: str) -> ListAST:
+    return optimize(Parser(Lexer(code).lex()).parse())
+
+
+def test_fold_constants():
+    ast = optimize_code('u8 a = 1 + 2 * 3 | 4; u8 b = [3][1 | 3] < 1 | 1; a[1 | 2] = 5 - 2; u8 c = a + 1;')
+    a, b, set_a, c = ast.asts
+    assert isinstance(a.val, OrU8InitAST) and a.val.elements == (7, )
+    assert isinstance(b.val, OrU8InitAST) and b.val.elements == (1, )
+    assert isinstance(set_a, U8SetAST) and set_a.value_expr.elements == (3, )
+    assert isinstance(c.val, OperationAST)
+
+
+def test_render_prints(capsys):
+    ast = optimize_code('print 1 | 2 + 1; sprint 72 | 105; sprint 72 | 9999999999;')
+    print_, sprint, bad_sprint = ast.asts
+    assert isinstance(print_, PrintTextAST) and print_.text == '2 | 3'
+    assert isinstance(sprint, PrintTextAST) and sprint.text == 'Hi'
+    # Left to fail when running.
+    assert isinstance(bad_sprint, SprintAST)
+
+    del ast.asts[-1]
+    ast.evaluate(dict())
+    VM.run(compile_ast(ast), dict())
+    assert capsys.readouterr().out == '2 | 3\nHi\n' * 2
+
+
+def test_drop_dead_statements():
+    ast = optimize_code(';; 1 | 2; [3]; 1 + 2; u8 a = 1;;')
+    assert len(ast.asts) == 1
+    program = compile_ast(ast)
+    assert [opcode for opcode, _ in program.code].count(OpCode.POP) == 1
+
+
+def test_failed_fold_kept():
+    ast = optimize_code('u8 a = [2] - [3];')
+    assert isinstance(ast.val, OperationAST)
+    use_storage(U8Storage.ARRAY)
+    try:
+        # Out of the range of the storage, failing only when running.
+        ast = optimize_code('u8 a = 9223372036854775807 + 1; print 9223372036854775808;')
+    finally:
+        use_storage(U8Storage.LIST)
+    assert isinstance(ast.asts[0].val, OperationAST) and isinstance(ast.asts[1], PrintAST)
+
+
+def test_count_nodes():
+    ast = Parser(Lexer(pkgutil.get_data('helang', 'logo.he').decode('utf-8')).lex()).parse()
+    before = count_nodes(ast)
+    assert count_nodes(optimize(ast)) < before
+
+
+def test_large_constants_kept():
+    ast = optimize_code('u8 a = [10000000] + 1; print [100000]; u8 b = [256] + 1;')
+    large, print_, small = ast.asts
+    assert isinstance(large.val, OperationAST)
+    assert isinstance(print_, PrintAST)
+    assert isinstance(small.val, OrU8InitAST) and small.val.elements == (1, ) * 256
+
+
+def test_counting_nodes(tmp_path):
+    code = 'u8 a = 1 + 2; print a;'
+    path = tmp_path / 'a.he'
+    path.write_text(code)
+    with counting_nodes() as counts:
+        quick_run_file(str(path), cache=False, output=CaptureSink())
+    # Counted while the AST which runs is optimized.
+    [(before, after)] = counts
+    assert after == count_nodes(optimize_code(code)) < before
+    optimize_code(code)
+    assert len(counts) == 1
@@ -0,0 +1,49 @@
+import io
+
+from helang.output import StreamSink, CaptureSink, output_to, emit, flush_output
+from helang.quick_runner import quick_run_string, Engine
+
+
+CODE = 'u8 a = 1 | 2; print a; sprint 72 | 105; print a + 1; print 1 | 2;'
+
+
+def test_capture(capsys):
+    for engine in Engine:
+        sink = CaptureSink()
+        quick_run_string(CODE, engine=engine, output=sink)
+        assert sink.lines == ['1 | 2', 'Hi', '2 | 3', '1 | 2']
+    assert capsys.readouterr().out == ''
+
+
+def test_buffered_to_stdout(capsys):
+    quick_run_string(CODE)
+    assert capsys.readouterr().out == '1 | 2\nHi\n2 | 3\n1 | 2\n'
+
+
+def test_stream_sink_blocks():
+    class Stream(io.StringIO):
+        writes = 0
+
+        def write(self, s: str) -> int:
+            Stream.writes += 1
+            return super().write(s)
+
+    stream = Stream()
+    with output_to(StreamSink(stream, buffer_size=10)):
+        for _ in range(3):
+            emit('12345')
+        assert stream.getvalue() == '12345\n12345\n'
+        flush_output()
+        assert stream.getvalue() == '12345\n' * 3
+        emit('1')
+    assert stream.getvalue() == '12345\n' * 3 + '1\n'
+    assert Stream.writes == 3
+
+
+def test_nested_runs_share_sink():
+    sink = CaptureSink()
+    with output_to(sink):
+        quick_run_string('print 1;')
+        quick_run_string('print 2;', output=CaptureSink())
+        emit('3')
+    assert sink.lines == ['1', '3']
@@ -1,10 +1,30 @@
+import sys
+import enum
+import pkgutil
+import pytest
+
+from functools import partial
+from helang import quick_runner
 from helang.u8 import U8
-from helang.quick_runner import quick_run_string
+from helang.he_ast import AST
+from helang.lexer import Lexer
+from helang.environment import Environment
+from helang.tokens import offsets_array
+from helang.parser import Parser, ParseStrategy
+from helang.quick_runner import quick_run_string, Engine
 
 
 env = dict()
 
 
+@pytest.fixture(autouse=True, params=list(Engine), ids=lambda engine: engine.name.lower())
+def engine(request, monkeypatch):
+    # Every test runs under each engine.
+    run = partial(quick_runner.quick_run_string, engine=request.param)
+    monkeypatch.setattr(sys.modules[__name__], 'quick_run_string', run)
+    return request.param
+
+
 def setup():
     env.clear()
 
@@ -143,3 +163,100 @@ def test_cmp():
 def test_cyber_high_tech_expr():
     quick_run_string('u8 a = 1 | 2 | 3 + 2 | 3 | 4 < 2 | 3 | 5 * 2 | 3 + 6 | 76 | 8;', env)
     assert env['a']
+
+
+def _shape(node):
+    # Turns the AST into nested tuples to compare them.
+    if isinstance(node, AST):
+        return type(node).__name__, tuple((k, _shape(getattr(node, k))) for k in node.__slots__)
+    if isinstance(node, list):
+        return tuple(_shape(item) for item in node)
+    if isinstance(node, enum.Enum):
+        return node.name
+    return node
+
+
+def test_predictive_strategy():
+    codes = [
+        pkgutil.get_data('helang', 'great.he').decode('utf-8'),
+        'u8 a; u8 b = [3]; a = 1 | 2; a++; b[1 | 2] = a[1] + 3; print b; sprint 72 | 105;',
+        'u8 c = a + b * c - 1 | 2 < 3; a[1] = b[2] = 3; test5g app; cyberspaces; logo tiny; 1 | 2',
+    ]
+    for code in codes:
+        tokens = Lexer(code).lex()
+        backtracking = Parser(tokens, ParseStrategy.BACKTRACKING)
+        predictive = Parser(tokens, ParseStrategy.PREDICTIVE)
+        assert _shape(predictive.parse()) == _shape(backtracking.parse())
+        assert backtracking.backtracks > 0
+        assert predictive.backtracks == 0
+
+
+def test_parse_token_buffer():
+    for code in (pkgutil.get_data('helang', 'logo.he').decode('utf-8'), 'u8 a = [3]; a[1 | 2] = 1 + 2 * 3; a <= 5'):
+        expected = _shape(Parser(Lexer(code).lex()).parse())
+        for strategy in ParseStrategy:
+            assert _shape(Parser(Lexer(code).lex_buffer(), strategy).parse()) == expected
+
+
+def test_statement_offsets():
+    code = 'u8 a = [3];\n  a[1] = 2; print a;'
+    offsets = offsets_array()
+    tokens = Lexer(code, offsets=offsets).lex()
+    for strategy in ParseStrategy:
+        for parser in (Parser(tokens, strategy, offsets), Parser(Lexer(code).lex_buffer(), strategy)):
+            assert [ast.offset for ast in parser.parse().asts] == [0, 14, 24]
+    assert getattr(Parser(tokens).parse().asts[0], 'offset', None) is None
+
+
+def test_long_literal():
+    quick_run_string('u8 a = ' + ' | '.join(['7'] * 20000) + ';', env)
+    assert env['a'] == [7] * 20000
+
+
+def test_long_operation_chain():
+    quick_run_string('u8 a = 1' + ' + 1 - 1' * 5000 + ' + 1;', env)
+    assert env['a'] == [2]
+
+
+def test_inplace_assign():
+    quick_run_string('''
+        u8 a = 1 | 2 | 3;
+        u8 b = a;
+        a = a + 1;
+        u8 c = 4 | 5 | 6;
+    ''', env)
+    c = env['c']
+    quick_run_string('''
+        c = c - a;
+    ''', env)
+
+    # b shares elements of a, which are copied before a is updated.
+    assert env['b'] == [1, 2, 3]
+    assert env['a'] == [2, 3, 4]
+    # u8s of a dict are never written in place, the caller may still hold them.
+    assert env['c'] == [2, 2, 2]
+    assert env['c'] is not c
+    assert c == [4, 5, 6]
+
+    # Those of an Environment, the interpreter's own, are.
+    scope = Environment({'c': U8([4, 5, 6])})
+    c = scope['c']
+    buffer = c.value
+    quick_run_string('c = c - 1;', scope)
+    assert scope['c'] is c and c.value is buffer
+    assert c == [3, 4, 5]
+
+
+def test_define_copies():
+    quick_run_string('''
+        u8 a = 1 | 2;
+        u8 b = a;
+        u8 c = 0;
+        c = a;
+        a++;
+        b[1] = 5;
+    ''', env)
+
+    assert env['a'] == [2, 3]
+    assert env['b'] == [5, 2]
+    assert env['c'] == [1, 2]
@@ -0,0 +1,65 @@
+from helang.u8 import U8
+from helang.profiler import Profiler
+from helang.output import CaptureSink
+from helang.quick_runner import quick_run_string, quick_run_file, Engine
+
+
+CODE = 'u8 a = [4];\nu8 b = a + 1; print b;\nb[1 | 2] = 3;'
+
+
+def test_statements():
+    profiler = Profiler()
+    env = dict()
+    for engine in Engine:
+        quick_run_string(CODE, env, engine, output=CaptureSink(), profiler=profiler)
+    assert env['b'] == [3, 3, 1, 1]
+
+    stats = sorted(profiler.statements(), key=lambda stats: (stats.line, stats.column))
+    assert [(stats.line, stats.column, stats.text) for stats in stats] == [
+        (1, 1, 'u8 a = [4];'), (2, 1, 'u8 b = a + 1;'), (2, 15, 'print b;'), (3, 1, 'b[1 | 2] = 3;')
+    ]
+    assert all(stats.calls == 3 and stats.seconds > 0 for stats in stats)
+    # Per run: the empty u8 of 4, 1 and the sum of 4, and the subscripts of 2 with 3.
+    assert [stats.elements for stats in stats] == [12, 15, 0, 9]
+
+    lines = {stats.line: stats for stats in profiler.lines()}
+    assert lines[2].calls == 6 and lines[2].elements == 15
+    assert lines[2].text == 'u8 b = a + 1; print b;'
+    assert lines[2].seconds == stats[1].seconds + stats[2].seconds
+
+
+def test_storage_restored():
+    profiler = Profiler()
+    try:
+        quick_run_string('u8 a = [2]; u8 b = a - [3];', profiler=profiler)
+    except Exception:
+        ...
+    assert type(U8([1]).value) is list
+    assert [stats.calls for stats in profiler.statements()] == [1, 1]
+
+
+def test_reports(tmp_path):
+    path = tmp_path / 'a.he'
+    path.write_text(CODE)
+    profiler = Profiler()
+    quick_run_file(str(path), cache=False, output=CaptureSink(), profiler=profiler)
+
+    table = profiler.table()
+    assert f'{path}:2:15  print b;' in table
+    assert f'{path}:2  u8 b = a + 1; print b;' in table
+
+    rows = profiler.collapsed().splitlines()
+    assert rows[1].startswith(f'{path};line 2;u8 b = a + 1 ')
+    assert all(int(row.rsplit(' ', 1)[1]) >= 0 for row in rows)
+
+
+def test_programs_apart():
+    profiler = Profiler()
+    quick_run_string('u8 a = [4];', profiler=profiler)
+    quick_run_string('u8 zzz = [100];', profiler=profiler)
+    quick_run_string('u8 a = [4];', profiler=profiler)
+    rows = {stats.text: stats for stats in profiler.statements()}
+    assert rows.keys() == {'u8 a = [4];', 'u8 zzz = [100];'}
+    assert rows['u8 a = [4];'].calls == 2 and rows['u8 a = [4];'].elements == 8
+    assert rows['u8 zzz = [100];'].calls == 1 and rows['u8 zzz = [100];'].elements == 100
+    assert len(profiler.lines()) == 2
@@ -1,7 +1,9 @@
+import pickle
 import pytest
 
-from helang.u8 import U8
-from helang.exceptions import CyberArithmeticException
+from array import array
+from helang.u8 import U8, U8Storage, use_storage
+from helang.exceptions import CyberArithmeticException, CyberNotSupportedException
 
 
 a = U8([5, 3, 6])
@@ -69,3 +71,154 @@ def test_u8_compare():
 
 def test_u8_empty_cache():
     assert object.__eq__(U8(), U8())
+
+
+def test_u8_array_storage():
+    use_storage(U8Storage.ARRAY)
+    try:
+        u8 = U8([1, 2, 3])
+        assert isinstance(u8.value, array)
+        assert str(u8) == '1 | 2 | 3'
+        assert u8[U8([1, 3])] == [1, 3]
+        assert u8 + U8(1) == [2, 3, 4]
+        assert U8([1, 2]) * u8 == [5]
+        assert U8([0, 1]) < u8
+        u8.increment()
+        assert u8 == [2, 3, 4]
+        u8[U8(0)] = U8(7)
+        assert u8 == [7, 7, 7]
+        assert isinstance(u8.value, array)
+        # Lists take any integer, while arrays fail as HeLang does.
+        big = U8(2 ** 63 - 1)
+        with pytest.raises(CyberArithmeticException):
+            big.increment()
+        with pytest.raises(CyberArithmeticException):
+            u8[U8(2)] = U8(2 ** 63)
+        with pytest.raises(CyberArithmeticException):
+            U8([2 ** 64])
+    finally:
+        use_storage(U8Storage.LIST)
+
+
+def test_u8_numpy_storage():
+    numpy = pytest.importorskip('numpy')
+    use_storage(U8Storage.NUMPY)
+    try:
+        u8 = U8([1, 2, 3])
+        assert isinstance(u8.value, numpy.ndarray)
+        assert str(u8) == '1 | 2 | 3'
+        assert u8[U8([3, 1, 5])] == [1, 3]
+        assert u8 + U8(1) == [2, 3, 4]
+        assert u8 - U8([1, 1, 1]) == [0, 1, 2]
+        assert U8([1, 2]) * u8 == [5]
+        assert U8([1, 2]) == U8([1, 2, 0])
+        assert U8([0, 1]) < u8
+        assert not U8([1, 5]) < U8([3, 4, 2])
+        u8.increment()
+        assert u8 == [2, 3, 4]
+        u8[U8([1, 3])] = U8(7)
+        assert u8 == [7, 3, 7]
+        with pytest.raises(CyberNotSupportedException):
+            u8[U8([2, 0])] = U8(5)
+        # Elements before 0 are set, the same as the list storage does.
+        assert u8 == [7, 5, 7]
+        u8[U8(0)] = U8(9)
+        assert u8 == [9, 9, 9]
+        with pytest.raises(CyberArithmeticException):
+            u8 + U8(2 ** 63)
+        with pytest.raises(CyberArithmeticException):
+            U8(i for i in (1, 2 ** 64))
+    finally:
+        use_storage(U8Storage.LIST)
+
+
+def test_u8_numpy_fallback(monkeypatch):
+    monkeypatch.setattr('helang.storage.numpy', None)
+    use_storage(U8Storage.NUMPY)
+    try:
+        assert isinstance(U8([1, 2]).value, list)
+    finally:
+        use_storage(U8Storage.LIST)
+
+
+def test_u8_get_order():
+    u8 = U8([10, 20, 30, 40])
+    # Elements keep their own order, whatever the order of subscripts is.
+    assert str(u8[U8([4, 2, 2, 9, 0, -1])]) == '20 | 40'
+    assert str(u8[U8([1, 3, 4, 7])]) == '10 | 30 | 40'
+    assert str(u8[U8()]) == ''
+
+
+def test_u8_compare_tail():
+    assert U8([1, 2, 0, 0]) == [1, 2]
+    assert U8([1, 2]) != [1, 2, 3]
+    assert U8() <= U8([0, 1])
+    assert not U8([0, -1]) >= U8()
+
+    # All subscripts of 0 equal to [0], setting all elements.
+    u8 = U8([1, 2, 3])
+    u8[U8([0, 0])] = U8(4)
+    assert u8 == [4, 4, 4]
+
+
+def test_u8_inplace():
+    u8 = U8([1, 2, 3])
+    buffer = u8.value
+    assert u8.iadd(U8(1)) is u8
+    assert u8 == [2, 3, 4]
+    u8.isub(U8([1, 1, 1])).ineg()
+    assert u8 == [-1, -2, -3]
+    u8.scatter(U8([2]), 7).increment()
+    assert u8 == [0, 8, -2]
+    u8.fill(5)
+    assert u8.value is buffer
+    assert u8 == [5, 5, 5]
+
+    # Broadcasting a single element makes it longer.
+    assert U8(1).iadd(U8([1, 2])) == [2, 3]
+    with pytest.raises(CyberArithmeticException):
+        U8([1, 2]).isub(U8([1, 2, 3]))
+
+
+def test_u8_copy_on_write():
+    u8 = U8([1, 2, 3])
+    shared = u8.share()
+    assert shared.value is u8.value
+
+    u8.increment()
+    assert u8 == [2, 3, 4]
+    assert shared == [1, 2, 3]
+    # Not shared any more, written in place.
+    buffer = shared.value
+    shared[U8(2)] = U8(5)
+    assert shared.value is buffer
+    assert shared == [1, 5, 3]
+
+
+def test_u8_share_record():
+    # Only shared u8s take a record of sharing.
+    u8 = U8([1, 2])
+    assert u8._share is None
+    shared = u8.share()
+    del u8
+    # Dropping a sharer is not seen, so the first write still copies, once.
+    buffer = shared.value
+    shared.increment()
+    assert shared.value is not buffer and shared._share is None
+    buffer = shared.value
+    shared.increment()
+    assert shared.value is buffer and shared == [3, 4]
+
+
+def test_u8_mul_keeps_operands():
+    short, long = U8([1, 2]), U8([3, 4, 5])
+    assert short * long == [11]
+    assert len(short.value) == 2
+
+
+def test_u8_pickle():
+    for u8 in (U8([1, 2, 3]), U8([])):
+        loaded = pickle.loads(pickle.dumps(u8))
+        assert loaded == u8 and loaded is not u8
+    # The shared empty u8 stays empty.
+    assert U8() == []